@@ -2,14 +2,23 @@
 import streamlit as st
 import os
 import sys
+import tempfile
+import uuid
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from src.database.db_handler import DBHandler
 from src.llm.mistral_api_llm import MistralAPILLM
-from src.utils.question_manager import QuestionManager
+from src.tts.edge_tts import EdgeTTS
+from src.tts.prerender import get_prerenderer
+from src.utils.question_manager import QuestionManager, IMPORT_FORMATS, parse_questions
 from src.utils.stat_evaluator import StatEvaluator
-from src.database.models import Test, Question, SurveyResult
+from src.utils.model_registry import get_registry
+from src.database.export import export_results
+from src.database.aggregates import rollup_scores, paired_score_counts
+from src.utils.agreement import agreement_frame
 from datetime import datetime, timedelta
+from typing import List
 import plotly.express as px
 
 # Добавляем корневую директорию проекта в PYTHONPATH
@@ -18,10 +27,62 @@ if root_dir not in sys.path:
     sys.path.append(root_dir)
 
 # Инициализация базы данных и менеджера вопросов
-db_handler = DBHandler()
+registry = get_registry()
+db_handler = registry.get(DBHandler)
 question_manager = QuestionManager(db_handler)
 stat_evaluator = StatEvaluator()
 
+# Тот же TTS, что и в пользовательском интерфейсе: аудио вопросов озвучивается заранее в общий кэш
+tts = registry.get(EdgeTTS)
+prerenderer = get_prerenderer(tts)
+
+def refresh_question_audio(test_name: str):
+    """Запускает фоновую озвучку всех вопросов теста"""
+    prerenderer.schedule(test_name, question_manager.get_questions_for_test(test_name))
+
+def add_questions(test_name: str, questions: List[str]) -> bool:
+    """Добавляет вопросы в тест и сообщает, сколько добавлено и сколько пропущено повторов"""
+    added = question_manager.add_questions_to_test(test_name, questions)
+    if added is None:
+        st.error("Не удалось сохранить вопросы в базу данных")
+        return False
+    refresh_question_audio(test_name)
+    # Пустые строки не считаются повторами
+    skipped = sum(1 for question in questions if question.strip()) - added
+    st.success(f"Добавлено {added} вопросов, пропущено повторов: {skipped}")
+    return True
+
+# Колонки вкладки "Просмотр ответов" и их подписи
+RESULT_VIEW_COLUMNS = {
+    'first_name': 'Имя',
+    'last_name': 'Фамилия',
+    'question': 'Вопрос',
+    'answer': 'Ответ',
+    'llm_score': 'Оценка LLM',
+    'feedback': 'Обратная связь',
+    'timestamp': 'Дата',
+}
+
+# Колонки таблицы согласованности оценок LLM и человека
+AGREEMENT_VIEW_COLUMNS = {
+    'group': 'Вопрос',
+    'pairs': 'Пар оценок',
+    'mean_diff': 'LLM − человек',
+    'kappa': 'Каппа Коэна (взв.)',
+    'kappa_ci': '95% ДИ каппы',
+    'icc': 'ICC(2,1)',
+    'icc_ci': '95% ДИ ICC',
+    'spearman': 'Спирмен',
+    'kendall': 'Кендалл',
+    'wilcoxon_p': 'p-value Уилкоксона',
+}
+
+EXPORT_MIME_TYPES = {
+    'csv': 'text/csv',
+    'csv.gz': 'application/gzip',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
 def check_password():
     """Проверяет пароль администратора."""
     def password_entered():
@@ -67,38 +128,26 @@ def admin_app():
         # Выбор теста для просмотра
         selected_test = st.selectbox("Выберите тест", tests)
         
-        # Получаем результаты для выбранного теста
-        session = db_handler.get_session()
-        try:
-            # Добавляем отладочную информацию
-            st.write(f"Выбранный тест: {selected_test}")
-            
-            # Получаем все результаты
-            all_results = session.query(SurveyResult).all()
-            st.write(f"Всего результатов в базе: {len(all_results)}")
-            
-            # Фильтруем результаты по выбранному тесту
-            results = [r for r in all_results if r.test_name == selected_test]
-            st.write(f"Результатов для выбранного теста: {len(results)}")
-            
-            if not results:
-                st.info("Нет результатов для выбранного теста")
-                return
-            
-            # Преобразуем результаты в DataFrame
-            results_data = []
-            for result in results:
-                results_data.append({
-                    'Имя': result.first_name,
-                    'Фамилия': result.last_name,
-                    'Вопрос': result.question,
-                    'Ответ': result.answer,
-                    'Оценка LLM': result.llm_score,
-                    'Обратная связь': result.feedback,
-                    'Дата': result.timestamp.strftime('%Y-%m-%d %H:%M:%S')
-                })
+        # Фильтрация и постраничный вывод выполняются в БД, в память попадает только текущая страница
+        total = db_handler.count_survey_results(selected_test)
+        st.write(f"Результатов для выбранного теста: {total}")
+        
+        if not total:
+            st.info("Нет результатов для выбранного теста")
+        else:
+            page_size = st.selectbox("Строк на странице", [25, 50, 100], key="results_page_size")
+            # Стек курсоров просмотренных страниц: последний - курсор текущей страницы
+            cursors_key = f"results_cursors_{selected_test}_{page_size}"
+            cursors = st.session_state.setdefault(cursors_key, [None])
             
-            df = pd.DataFrame(results_data)
+            page = db_handler.query_survey_results(
+                selected_test,
+                columns=list(RESULT_VIEW_COLUMNS),
+                cursor=cursors[-1],
+                limit=page_size
+            )
+            df = pd.DataFrame(page.rows, columns=list(RESULT_VIEW_COLUMNS)).rename(columns=RESULT_VIEW_COLUMNS)
+            df['Дата'] = pd.to_datetime(df['Дата']).dt.strftime('%Y-%m-%d %H:%M:%S')
             
             # Отображаем результаты в виде таблицы
             st.dataframe(
@@ -107,18 +156,41 @@ def admin_app():
                 hide_index=True
             )
             
-            # Добавляем возможность скачать результаты в CSV
-            csv = df.to_csv(index=False).encode('utf-8')
-            st.download_button(
-                "Скачать результаты",
-                csv,
-                f"results_{selected_test}.csv",
-                "text/csv",
-                key='download-csv'
-            )
+            col1, col2, col3 = st.columns([1, 2, 1])
+            with col1:
+                if st.button("← Назад", disabled=len(cursors) == 1, key="results_prev"):
+                    cursors.pop()
+                    st.rerun()
+            with col2:
+                st.write(f"Страница {len(cursors)} из {(total + page_size - 1) // page_size}")
+            with col3:
+                if st.button("Далее →", disabled=page.next_cursor is None, key="results_next"):
+                    cursors.append(page.next_cursor)
+                    st.rerun()
+            
+            # Выгрузка пишется потоково во временный файл порциями из БД
+            export_format = st.selectbox("Формат выгрузки", list(EXPORT_MIME_TYPES), key="export_format")
+            if st.button("Подготовить выгрузку"):
+                with st.spinner("Выгрузка результатов..."):
+                    with tempfile.NamedTemporaryFile(suffix=f".{export_format}", delete=False) as export_file:
+                        export_results(db_handler, export_file, export_format, test_name=selected_test)
+                    previous = st.session_state.get("export_path")
+                    if previous and os.path.exists(previous):
+                        os.remove(previous)
+                    st.session_state.export_path = export_file.name
+                    st.session_state.export_name = f"results_{selected_test}.{export_format}"
             
-        finally:
-            session.close()
+            export_path = st.session_state.get("export_path")
+            if export_path and os.path.exists(export_path):
+                export_name = st.session_state.export_name
+                with open(export_path, 'rb') as export_file:
+                    st.download_button(
+                        "Скачать результаты",
+                        export_file,
+                        export_name,
+                        EXPORT_MIME_TYPES[export_name.split('.', 1)[1]],
+                        key='download-csv'
+                    )
     
     # Вкладка "Оценка ответов"
     with tab2:
@@ -133,64 +205,67 @@ def admin_app():
         # Выбор теста для оценки
         selected_test = st.selectbox("Выберите тест для оценки", tests, key="evaluation_test")
         
-        # Получаем результаты для выбранного теста
-        session = db_handler.get_session()
-        try:
-            results = session.query(SurveyResult).filter_by(test_name=selected_test).all()
-            
-            if not results:
-                st.info("Нет результатов для оценки")
-                return
+        # Проверяющий нужен, чтобы не раздавать одни и те же ответы нескольким людям
+        if "grader_id" not in st.session_state:
+            st.session_state.grader_id = f"admin-{uuid.uuid4().hex[:8]}"
+        grader = st.session_state.grader_id
+        batch_size = st.selectbox("Ответов на странице", [5, 10, 20], key="grading_batch_size")
+        
+        st.metric("Ожидают оценки", db_handler.count_ungraded(selected_test))
+        
+        # Итог сохранения предыдущей страницы
+        if "grading_notice" in st.session_state:
+            saved, total = st.session_state.pop("grading_notice")
+            if saved == total:
+                st.success(f"Сохранено оценок: {saved}")
+            else:
+                st.warning(f"Сохранено {saved} из {total}: часть ответов взял другой проверяющий")
+        
+        # Текущая порция ответов хранится в сессии вместе с размером страницы и не перечитывается
+        # при каждом rerun; пустая порция перечитывается, чтобы увидеть новые ответы
+        batch_key = f"grading_batch_{selected_test}"
+        cached = st.session_state.get(batch_key)
+        if not cached or not cached[1] or cached[0] != batch_size:
+            # Свои незакрытые ответы next_ungraded вернёт снова, поэтому смена размера их не теряет
+            cached = (batch_size, db_handler.next_ungraded(selected_test, grader, limit=batch_size))
+            st.session_state[batch_key] = cached
+        batch = cached[1]
+        
+        if not batch:
+            st.info("Нет ответов для оценки")
+        else:
+            with st.form(f"grading_form_{selected_test}"):
+                human_scores = {}
+                for result in batch:
+                    st.write(f"**Кандидат:** {result['first_name']} {result['last_name']}")
+                    st.write(f"**Вопрос:** {result['question']}")
+                    st.write(f"**Ответ:** {result['answer']}")
+                    st.write(f"**Оценка LLM:** {result['llm_score']}/5")
+                    st.write(f"**Обратная связь LLM:** {result['feedback']}")
+                    
+                    # Поле для ввода оценки
+                    human_scores[result['id']] = st.number_input(
+                        "Ваша оценка (1-5)",
+                        min_value=1,
+                        max_value=5,
+                        value=int(result['llm_score']) if result['llm_score'] else 3,
+                        key=f"score_{result['id']}"
+                    )
+                    st.write("---")
+                
+                submitted = st.form_submit_button("Сохранить оценки")
             
-            # Группируем результаты по пользователям
-            user_results = {}
-            for result in results:
-                key = f"{result.first_name} {result.last_name}"
-                if key not in user_results:
-                    user_results[key] = []
-                user_results[key].append(result)
+            if submitted:
+                # Все оценки страницы и агрегаты статистики сохраняются в одной транзакции
+                saved = db_handler.save_human_scores(human_scores, grader=grader)
+                st.session_state[batch_key] = None
+                st.session_state.grading_notice = (saved, len(human_scores))
+                st.rerun()
             
-            # Отображаем результаты для оценки
-            for user, user_data in user_results.items():
-                with st.expander(f"Результаты пользователя: {user}"):
-                    for result in user_data:
-                        st.write(f"**Вопрос:** {result.question}")
-                        st.write(f"**Ответ:** {result.answer}")
-                        st.write(f"**Оценка LLM:** {result.llm_score}/5")
-                        st.write(f"**Обратная связь LLM:** {result.feedback}")
-                        
-                        # Поле для ввода оценки
-                        human_score = st.number_input(
-                            "Ваша оценка (1-5)",
-                            min_value=1,
-                            max_value=5,
-                            value=int(result.llm_score) if result.llm_score else 3,
-                            key=f"score_{result.id}"
-                        )
-                        
-                        if st.button("Сохранить оценку", key=f"save_{result.id}"):
-                            # Создаем новую сессию для обновления
-                            update_session = db_handler.get_session()
-                            try:
-                                # Получаем свежую копию результата
-                                result_to_update = update_session.query(SurveyResult).get(result.id)
-                                if result_to_update:
-                                    result_to_update.score = human_score
-                                    update_session.commit()
-                                    st.success("Оценка сохранена")
-                                    st.rerun()  # Перезагружаем страницу для обновления данных
-                                else:
-                                    st.error("Результат не найден")
-                            except Exception as e:
-                                update_session.rollback()
-                                st.error(f"Ошибка при сохранении оценки: {str(e)}")
-                            finally:
-                                update_session.close()
-                        
-                        st.write("---")
-        
-        finally:
-            session.close()
+            if st.button("Вернуть ответы в очередь"):
+                db_handler.release_claims(grader, [result['id'] for result in batch])
+                st.session_state[batch_key] = None
+                st.rerun()
     
     # Вкладка "Статистика"
     with tab3:
@@ -211,59 +286,46 @@ def admin_app():
             ["Все время", "Последние 7 дней", "Последние 30 дней"]
         )
         
-        # Получаем результаты для выбранного теста
-        session = db_handler.get_session()
-        try:
-            query = session.query(SurveyResult).filter_by(test_name=selected_test)
-            
-            # Фильтруем по периоду
-            if period == "Последние 7 дней":
-                query = query.filter(SurveyResult.timestamp >= datetime.now() - timedelta(days=7))
-            elif period == "Последние 30 дней":
-                query = query.filter(SurveyResult.timestamp >= datetime.now() - timedelta(days=30))
-            
-            results = query.all()
-            
-            if not results:
-                st.info("Нет данных для отображения статистики")
-                return
-            
-            # Собираем оценки LLM и человека
-            llm_scores = []
-            human_scores = []
-            for result in results:
-                if result.llm_score is not None:
-                    llm_scores.append(result.llm_score)
-                if result.score is not None:
-                    human_scores.append(result.score)
-            
+        # Агрегаты по вопросам собираются из предрассчитанных дневных сводок
+        since = None
+        if period == "Последние 7 дней":
+            since = datetime.utcnow() - timedelta(days=7)
+        elif period == "Последние 30 дней":
+            since = datetime.utcnow() - timedelta(days=30)
+        aggregates = rollup_scores(db_handler, selected_test, since)
+        
+        # Пустая статистика не должна прерывать admin_app: ниже идут остальные вкладки
+        if not len(aggregates):
+            st.info("Нет данных для отображения статистики")
+        else:
             # Рассчитываем статистику с помощью StatEvaluator
-            stats_df = stat_evaluator.evaluate_scores(llm_scores, human_scores)
-            
+            overall = aggregates.overall()
+            stats_df = stat_evaluator.evaluate_moments(overall.llm, overall.human)
+        
             # Отображаем результаты статистического анализа
             st.subheader("Статистический анализ оценок")
             st.dataframe(stats_df, use_container_width=True, hide_index=True)
-            
+        
             # Дополнительная статистика
             st.subheader("Дополнительная статистика")
-            
+        
             # Общая статистика
             col1, col2 = st.columns(2)
             with col1:
-                st.metric("Всего ответов", len(results))
+                st.metric("Всего ответов", int(overall.answers[0]))
             with col2:
-                st.metric("Оценено человеком", len(human_scores))
-            
+                st.metric("Оценено человеком", int(overall.human.n[0]))
+        
             # Распределение оценок
             st.subheader("Распределение оценок")
-            
+        
             # Создаем DataFrame для графика
             score_data = pd.DataFrame({
                 'Оценка': list(range(1, 6)) * 2,
                 'Тип': ['LLM'] * 5 + ['Человек'] * 5,
-                'Количество': [llm_scores.count(i) for i in range(1, 6)] + [human_scores.count(i) for i in range(1, 6)]
+                'Количество': list(overall.llm.hist[0]) + list(overall.human.hist[0])
             })
-            
+        
             # Группированная гистограмма с помощью plotly
             fig = px.bar(
                 score_data,
@@ -280,35 +342,38 @@ def admin_app():
                 plot_bgcolor='rgba(0,0,0,0)'
             )
             st.plotly_chart(fig, use_container_width=True)
-            
+        
             # Статистика по вопросам
             st.subheader("Статистика по вопросам")
-            
-            # Группируем результаты по вопросам
-            question_stats = {}
-            for result in results:
-                if result.question not in question_stats:
-                    question_stats[result.question] = {
-                        'llm_scores': [],
-                        'human_scores': []
-                    }
-                if result.llm_score is not None:
-                    question_stats[result.question]['llm_scores'].append(result.llm_score)
-                if result.score is not None:
-                    question_stats[result.question]['human_scores'].append(result.score)
-            
-            # Отображаем статистику по каждому вопросу
-            for question, stats in question_stats.items():
+        
+            # Статистика по всем вопросам считается одним векторным проходом
+            question_stats = stat_evaluator.evaluate_moments_batch(aggregates.llm, aggregates.human,
+                                                                   aggregates.question_ids)
+            for question, (_, row) in zip(aggregates.questions, question_stats.iterrows()):
                 with st.expander(f"Вопрос: {question}"):
-                    # Рассчитываем статистику для вопроса
-                    question_df = stat_evaluator.evaluate_scores(
-                        stats['llm_scores'],
-                        stats['human_scores']
-                    )
-                    st.dataframe(question_df, use_container_width=True, hide_index=True)
+                    st.dataframe(stat_evaluator.format_result(row), use_container_width=True, hide_index=True)
+        
+            # Согласованность считается только по ответам, оценённым и LLM, и человеком
+            st.subheader("Согласованность оценок LLM и человека")
+            paired = paired_score_counts(db_handler, selected_test, since)
+            if not len(paired):
+                st.info("Нет ответов, оценённых и LLM, и человеком")
+            else:
+                agreement = agreement_frame(
+                    np.concatenate([paired.overall().confusion, paired.confusion]),
+                    ['Все вопросы'] + paired.labels
+                )
+                agreement['kappa_ci'] = [f"{low:.2f} – {high:.2f}" for low, high in zip(agreement['kappa_low'], agreement['kappa_high'])]
+                agreement['icc_ci'] = [f"{low:.2f} – {high:.2f}" for low, high in zip(agreement['icc_low'], agreement['icc_high'])]
+                st.dataframe(
+                    agreement[list(AGREEMENT_VIEW_COLUMNS)].rename(columns=AGREEMENT_VIEW_COLUMNS).round(3),
+                    use_container_width=True,
+                    hide_index=True
+                )
         
-        finally:
-            session.close()
+        # Ожидание соединений из пула: рост wait_max/timeouts значит, что пул мал для нагрузки
+        with st.expander("Пулы соединений с БД"):
+            st.dataframe(pd.DataFrame(db_handler.pool_metrics()).T, use_container_width=True)
     
     # Вкладка "Управление вопросами"
     with tab4:
@@ -344,15 +409,25 @@ def admin_app():
         if st.button("Добавить вопросы"):
             if new_questions:
                 questions = [q.strip() for q in new_questions.split('\n') if q.strip()]
-                success_count = 0
-                for question in questions:
-                    if question_manager.add_question_to_test(selected_test, question):
-                        success_count += 1
-                st.success(f"Успешно добавлено {success_count} вопросов")
-                st.rerun()
+                if add_questions(selected_test, questions):
+                    st.rerun()
             else:
                 st.warning("Введите хотя бы один вопрос")
         
+        # Импорт банка вопросов одним запросом
+        question_file = st.file_uploader(
+            "Импорт вопросов из файла",
+            type=list(IMPORT_FORMATS),
+            help="CSV с колонкой question, JSON или YAML со списком вопросов, TXT по вопросу на строку"
+        )
+        if question_file is not None and st.button("Импортировать вопросы"):
+            try:
+                questions = parse_questions(question_file.getvalue(), question_file.name)
+            except (ValueError, RuntimeError) as e:
+                st.error(f"Не удалось прочитать файл: {str(e)}")
+            else:
+                add_questions(selected_test, questions)
+        
         # Генерация вопросов с помощью LLM
         st.subheader("Генерация вопросов")
         topic = st.text_input("Введите тему для генерации вопросов")
@@ -362,7 +437,7 @@ def admin_app():
             if topic:
                 with st.spinner("Генерация вопросов..."):
                     # Генерация вопросов с помощью LLM
-                    llm = MistralAPILLM()
+                    llm = registry.get(MistralAPILLM)
                     prompt = f"""Сгенерируй {num_questions} открытых вопросов для интервью по теме: {topic}
                     Вопросы должны быть:
                     - Открытыми (требующими развернутого ответа)
@@ -390,13 +465,9 @@ def admin_app():
                 st.write(f"{i}. {question}")
             
             if st.button("Добавить все вопросы в тест"):
-                success_count = 0
-                for question in st.session_state.generated_questions:
-                    if question_manager.add_question_to_test(selected_test, question):
-                        success_count += 1
-                st.success(f"Успешно добавлено {success_count} вопросов")
-                st.session_state.generated_questions = []
-                st.rerun()
+                if add_questions(selected_test, st.session_state.generated_questions):
+                    st.session_state.generated_questions = []
+                    st.rerun()
         
         # Просмотр и редактирование существующих вопросов
         st.subheader("Существующие вопросы")
@@ -409,6 +480,8 @@ def admin_app():
                 with col2:
                     if st.button("Удалить", key=f"del_{i}"):
                         if question_manager.delete_question(selected_test, question):
+                            prerenderer.invalidate(question)
+                            refresh_question_audio(selected_test)
                             st.success("Вопрос удален")
                             st.rerun()
                         else:
@@ -421,6 +494,8 @@ def admin_app():
                     if st.button("Сохранить", key=f"save_edit_{i}"):
                         if new_text and new_text != question:
                             if question_manager.update_question(selected_test, question, new_text):
+                                prerenderer.invalidate(question)
+                                refresh_question_audio(selected_test)
                                 st.success("Вопрос обновлен")
                                 st.session_state[f"edit_mode_{i}"] = False
                                 st.rerun()
@@ -432,6 +507,23 @@ def admin_app():
                         st.session_state[f"edit_mode_{i}"] = False
         else:
             st.info("В этом тесте пока нет вопросов")
+        
+        # Прогресс предварительной озвучки вопросов
+        st.subheader("Озвучка вопросов")
+        if st.button("Озвучить вопросы теста"):
+            refresh_question_audio(selected_test)
+        all_progress = prerenderer.all_progress()
+        if all_progress:
+            for test_name, progress in all_progress.items():
+                status = "выполняется" if progress.running else "готово"
+                text = f"{test_name}: {progress.done} из {progress.total} ({status})"
+                if progress.failed:
+                    text += f", ошибок: {progress.failed}"
+                st.progress(progress.fraction, text=text)
+            if any(p.running for p in all_progress.values()):
+                st.button("Обновить прогресс")
+        else:
+            st.info("Озвучка еще не запускалась")
     
     # Вкладка "Настройка моделей"
     with tab5:
@@ -7,16 +7,18 @@ from src.database.db_handler import DBHandler
 from src.llm.mistral_api_llm import MistralAPILLM
 from src.stt.whisper_stt import WhisperSTT
 from src.tts.edge_tts import EdgeTTS
-from src.utils.audio_recorder import AudioRecorder
-from src.database.models import SurveyResult
+from src.utils.audio_buffer import AudioBuffer
+from src.database.models import EVALUATION_PENDING, EVALUATION_FAILED
 from src.utils.question_manager import QuestionManager
-from src.utils.llm_evaluator import get_llm_feedback, get_llm_score
+from src.utils.interview_session import InterviewSession, sampling_from_env
+from src.utils.evaluation_queue import get_evaluation_queue, EVALUATOR_ID
+from src.utils.llm_evaluator import StreamingEvaluation
+from src.utils.model_registry import get_registry
 from streamlit_webrtc import webrtc_streamer, WebRtcMode, AudioProcessorBase
 import queue
 import threading
-import wave
 import numpy as np
-import tempfile
+import time
 from datetime import datetime
 from typing import List, Dict, Any
 import pandas as pd
@@ -26,54 +28,140 @@ root_dir = str(Path(__file__).parent.parent)
 if root_dir not in sys.path:
     sys.path.append(root_dir)
 
-# Подключаем остальные модели при необходимости (здесь демонстрационно)
-db_handler = DBHandler()
+# Модели и подключение к БД берём из общего реестра процесса:
+# они создаются один раз при первом обращении, а не на каждый rerun Streamlit
+registry = get_registry()
+db_handler = registry.get(DBHandler)
 
 # Используем Mistral API LLM и Edge TTS по умолчанию
-llm = MistralAPILLM()  # Будет использовать MISTRAL_API_KEY из переменных окружения
-stt = WhisperSTT(model_name='base')
-tts = EdgeTTS()
+llm = registry.get(MistralAPILLM)  # Будет использовать MISTRAL_API_KEY из переменных окружения
+tts = registry.get(EdgeTTS)
+STT_CONFIG = {'model_name': 'base'}  # Whisper загружается лениво при первом голосовом ответе
 
 # Инициализируем менеджер вопросов
 question_manager = QuestionManager(db_handler)
 
-def save_answer(test_name: str, question: str, answer: str, score: int, feedback: str):
-    """Save single answer to database using db_handler"""
+# Очередь фоновой оценки общая для всех сессий и переживает rerun
+evaluation_queue = get_evaluation_queue(db_handler, llm)
+SUMMARY_POLL_INTERVAL = 2  # секунды между обновлениями страницы результатов
+
+# FEEDBACK_MODE=stream: обратная связь выводится кандидату сразу, по мере генерации токенов
+STREAM_FEEDBACK = os.getenv("FEEDBACK_MODE", "background") == "stream"
+
+# INTERVIEW_QUESTIONS=N задаёт N вопросов на интервью (0 - все), INTERVIEW_SAMPLING=all|random|stratified
+# Неверные значения заменяются на "все вопросы по порядку" с предупреждением в логе
+INTERVIEW_QUESTIONS, INTERVIEW_SAMPLING = sampling_from_env()
+
+def save_answer(interview: InterviewSession, question: str, answer: str, evaluate_in_background: bool = True):
+    """Save raw answer as pending and schedule its LLM evaluation"""
     try:
-        result = SurveyResult(
-            test_name=test_name,
-            first_name=st.session_state.get('first_name', ''),
-            last_name=st.session_state.get('last_name', ''),
-            question=question,
-            answer=answer,
-            score=score,
-            llm_score=score,
-            feedback=feedback,
-            timestamp=datetime.now()
+        # Вместе с ответом сохраняется и продвижение интервью, в одной транзакции
+        result_id = db_handler.save_pending_answer(
+            interview.test_name,
+            interview.first_name,
+            interview.last_name,
+            question,
+            answer,
+            question_id=interview.question_id,
+            interview_id=interview.interview_id,
+            position=interview.current
         )
-        if db_handler.add_survey_result(result):
-            st.success("Ответ сохранен")
-        else:
+        if result_id is None:
             st.error("Ошибка при сохранении ответа")
+            return None
+        if evaluate_in_background:
+            evaluation_queue.submit(result_id, question, answer, llm)
+        st.success("Ответ сохранен")
+        return result_id
     except Exception as e:
         st.error(f"Ошибка при сохранении ответа: {str(e)}")
+        return None
+
+def submit_answer(question: str, answer: str):
+    """Save the answer and move on: to the next question or to the streamed feedback"""
+    interview = st.session_state.interview
+    # Сохранение ответа в базу данных, оценка LLM выполняется в фоне или потоково
+    result_id = save_answer(
+        interview,
+        question,
+        answer,
+        evaluate_in_background=not STREAM_FEEDBACK
+    )
+    if result_id is None:
+        # Интервью могло уйти вперёд в другой вкладке: подтягиваем сохранённое состояние
+        st.session_state.interview = InterviewSession.resume(db_handler, interview.token) or interview
+        return
+    interview.result_ids.append(result_id)
+    if STREAM_FEEDBACK:
+        st.session_state.pending_feedback = {
+            'result_id': result_id,
+            'question': question,
+            'answer': answer,
+            'score': None,
+            'feedback': None
+        }
+    else:
+        # Переход к следующему вопросу
+        interview.advance()
+    st.rerun()
 
-def display_summary(questions: list, answers: list, scores: list, feedback: list):
-    """Display summary of survey results"""
+def display_feedback(item: dict):
+    """Stream LLM feedback for the last answer; the score is parsed from the same stream"""
+    st.write(f"**Вопрос:** {item['question']}")
+    st.write(f"**Ваш ответ:** {item['answer']}")
+    st.write("**Обратная связь:**")
+    if item['feedback'] is None and db_handler.claim_evaluation(item['result_id'], EVALUATOR_ID):
+        evaluation = StreamingEvaluation(item['question'], item['answer'], llm)
+        st.write_stream(evaluation)
+        item['score'] = evaluation.score
+        item['feedback'] = evaluation.feedback
+        db_handler.complete_evaluation(item['result_id'], evaluation.score, evaluation.feedback)
+    elif item['feedback'] is None:
+        # Ответ уже оценивает другой процесс, результат появится в итогах
+        item['feedback'] = "Ответ оценивается, результат появится в итогах интервью."
+        st.write(item['feedback'])
+    else:
+        st.write(item['feedback'])
+    if item['score'] is not None:
+        st.write(f"**Оценка:** {item['score']}/5")
+    
+    if st.button("Следующий вопрос"):
+        del st.session_state['pending_feedback']
+        st.session_state.interview.advance()
+        st.rerun()
+
+def display_summary(interview: InterviewSession):
+    """Display summary of survey results, polling until every answer is evaluated"""
     st.header("Результаты опроса")
     
+    results = db_handler.get_survey_results_by_ids(interview.result_ids)
+    pending = [r for r in results if r.status == EVALUATION_PENDING]
+    
     # Отображаем результаты в раскрывающихся окнах
-    for i, (question, answer, score, feedback_text) in enumerate(zip(questions, answers, scores, feedback), 1):
+    for i, result in enumerate(results, 1):
         with st.expander(f"Вопрос {i}"):
-            st.write(f"**Вопрос:** {question}")
-            st.write(f"**Ваш ответ:** {answer}")
-            st.write(f"**Оценка:** {score}/5")
-            st.write(f"**Обратная связь:** {feedback_text}")
+            st.write(f"**Вопрос:** {result.question}")
+            st.write(f"**Ваш ответ:** {result.answer}")
+            if result.status == EVALUATION_PENDING:
+                st.write("**Оценка:** ⏳ оценивается...")
+            elif result.status == EVALUATION_FAILED:
+                st.write("**Оценка:** не удалось получить оценку")
+            else:
+                st.write(f"**Оценка:** {result.llm_score:.0f}/5")
+                st.write(f"**Обратная связь:** {result.feedback}")
+    
+    if pending:
+        st.info(f"Ожидают оценки: {len(pending)} из {len(results)}")
+        time.sleep(SUMMARY_POLL_INTERVAL)
+        st.rerun()
     
     # Reset session state
-    for key in ['test_started', 'current_question', 'answers', 'scores', 'feedback']:
+    db_handler.finish_interview(interview.interview_id)
+    for key in ['test_started', 'interview', 'pending_feedback']:
         if key in st.session_state:
             del st.session_state[key]
+    if 'interview' in st.query_params:
+        del st.query_params['interview']
     
     st.success("Тест завершен!")
 
@@ -83,14 +171,15 @@ def main():
     # Initialize session state
     if 'test_started' not in st.session_state:
         st.session_state.test_started = False
-    if 'current_question' not in st.session_state:
-        st.session_state.current_question = 0
-    if 'answers' not in st.session_state:
-        st.session_state.answers = []
-    if 'scores' not in st.session_state:
-        st.session_state.scores = []
-    if 'feedback' not in st.session_state:
-        st.session_state.feedback = []
+    
+    # Интервью из ссылки (?interview=...) продолжается после перезапуска и в любом процессе приложения
+    if 'interview' not in st.session_state and 'interview' in st.query_params:
+        interview = InterviewSession.resume(db_handler, st.query_params['interview'])
+        if interview is not None:
+            st.session_state.interview = interview
+            st.session_state.test_started = True
+        else:
+            del st.query_params['interview']
     
     # User registration
     if not st.session_state.test_started:
@@ -114,33 +203,50 @@ def main():
                 st.warning("Пожалуйста, введите имя и фамилию")
                 return
             
+            # Вопросы фиксируются один раз: дальше rerun'ы не обращаются к таблицам вопросов
+            interview = InterviewSession.start(
+                question_manager,
+                st.session_state.selected_test,
+                n=INTERVIEW_QUESTIONS,
+                mode=INTERVIEW_SAMPLING,
+                first_name=st.session_state.first_name,
+                last_name=st.session_state.last_name
+            )
+            if interview is None:
+                st.warning("В выбранном тесте нет вопросов")
+                return
+            if not interview.persist(db_handler):
+                st.error("Не удалось начать тест")
+                return
+            st.session_state.interview = interview
+            st.query_params['interview'] = interview.token
             st.session_state.test_started = True
-            st.session_state.current_question = 0
-            st.session_state.answers = []
-            st.session_state.scores = []
-            st.session_state.feedback = []
             st.rerun()
     
     # Test interface
     if st.session_state.test_started:
-        # Get questions for selected test
-        questions = question_manager.get_questions_for_test(st.session_state.selected_test)
+        interview = st.session_state.interview
         
-        if not questions:
-            st.warning("В выбранном тесте нет вопросов")
+        # Feedback for the last answer in streaming mode
+        if st.session_state.get('pending_feedback'):
+            display_feedback(st.session_state.pending_feedback)
             return
         
         # Display current question
-        if st.session_state.current_question < len(questions):
-            current_question = questions[st.session_state.current_question]
+        if not interview.finished:
+            current_question = interview.question
             
-            st.subheader(f"Вопрос {st.session_state.current_question + 1} из {len(questions)}")
+            st.subheader(f"Вопрос {interview.current + 1} из {len(interview)}")
             st.write(current_question)
             
             # TTS для вопроса
             if st.button("🔊 Прослушать вопрос"):
-                tts = EdgeTTS()
-                tts.text_to_speech(current_question)
+                # Повторное прослушивание читает аудио из кэша, без обращения к сети
+                audio_data = tts.text_to_speech(current_question)
+                if audio_data:
+                    st.audio(audio_data, format="audio/mp3")
+                else:
+                    st.error("Не удалось синтезировать речь")
             
             # Выбор способа ответа
             response_method = st.radio(
@@ -153,28 +259,7 @@ def main():
                 answer = st.text_area("Ваш ответ")
                 if st.button("Отправить ответ"):
                     if answer:
-                        # Оценка ответа с помощью LLM
-                        llm = MistralAPILLM()
-                        score = get_llm_score(current_question, answer, llm)
-                        feedback = get_llm_feedback(current_question, answer, llm)
-                        
-                        # Сохранение ответа и оценки в session_state
-                        st.session_state.answers.append(answer)
-                        st.session_state.scores.append(score)
-                        st.session_state.feedback.append(feedback)
-                        
-                        # Сохранение в базу данных
-                        save_answer(
-                            st.session_state.selected_test,
-                            current_question,
-                            answer,
-                            score,
-                            feedback
-                        )
-                        
-                        # Переход к следующему вопросу
-                        st.session_state.current_question += 1
-                        st.rerun()
+                        submit_answer(current_question, answer)
                     else:
                         st.warning("Пожалуйста, введите ответ")
             
@@ -206,59 +291,21 @@ def main():
                         audio_frames.append(audio_queue.get())
                     
                     if audio_frames:
-                        # Сохраняем аудио во временный файл
-                        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_audio:
-                            # Создаем WAV файл с правильными параметрами
-                            with wave.open(temp_audio.name, 'wb') as wf:
-                                wf.setnchannels(1)  # mono
-                                wf.setsampwidth(2)  # 2 bytes per sample
-                                wf.setframerate(16000)  # 16kHz
-                                for frame in audio_frames:
-                                    wf.writeframes(frame)
-                            
-                            # Распознаем речь
-                            stt = WhisperSTT()
-                            answer = stt.transcribe(temp_audio.name)
-                            
-                            if answer:
-                                st.write("Распознанный ответ:", answer)
-                                
-                                # Оценка ответа с помощью LLM
-                                llm = MistralAPILLM()
-                                score = get_llm_score(current_question, answer, llm)
-                                feedback = get_llm_feedback(current_question, answer, llm)
-                                
-                                # Сохранение ответа и оценки в session_state
-                                st.session_state.answers.append(answer)
-                                st.session_state.scores.append(score)
-                                st.session_state.feedback.append(feedback)
-                                
-                                # Сохранение в базу данных
-                                save_answer(
-                                    st.session_state.selected_test,
-                                    current_question,
-                                    answer,
-                                    score,
-                                    feedback
-                                )
-                                
-                                # Переход к следующему вопросу
-                                st.session_state.current_question += 1
-                                st.rerun()
-                            else:
-                                st.warning("Не удалось распознать речь. Пожалуйста, попробуйте еще раз.")
+                        # Фреймы WebRTC склеиваются в буфер в памяти с их частотой и числом каналов,
+                        # WhisperSTT сам сводит их в моно 16 кГц
+                        audio = AudioBuffer.from_av_frames(audio_frames)
+                        with registry.lease(WhisperSTT, **STT_CONFIG) as stt:
+                            answer = stt.speech_to_text(audio)
                         
-                        # Удаляем временный файл
-                        os.unlink(temp_audio.name)
+                        if answer and not answer.startswith("[Whisper Error]"):
+                            st.write("Распознанный ответ:", answer)
+                            submit_answer(current_question, answer)
+                        else:
+                            st.warning("Не удалось распознать речь. Пожалуйста, попробуйте еще раз.")
         
         # Display summary when all questions are answered
-        if st.session_state.current_question >= len(questions):
-            display_summary(
-                questions,
-                st.session_state.answers,
-                st.session_state.scores,
-                st.session_state.feedback
-            )
+        if interview.finished:
+            display_summary(interview)
 
 if __name__ == "__main__":
     main()
@@ -19,4 +19,14 @@ setuptools.setup(
         "Operating System :: OS Independent",
     ],
     python_requires='>=3.8',
+    extras_require={
+        # Асинхронный драйвер для AsyncDBHandler с PostgreSQL
+        "postgres": ["asyncpg>=0.27.0"],
+    },
+    entry_points={
+        "console_scripts": [
+            "survey-export=src.database.export:main",
+            "survey-rollups=src.database.rollups:main",
+        ],
+    },
 )
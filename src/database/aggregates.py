@@ -0,0 +1,244 @@
+"""SQL-side aggregation of LLM and human scores for the statistics tab"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+import numpy as np
+from sqlalchemy import select, func, case
+from .db_handler import DBHandler
+from .models import SurveyResult, Test, ScoreRollup, RATER_LLM, RATER_HUMAN
+from .rollups import COUNTER_COLUMNS
+
+# Оценки выставляются целыми баллами от 1 до 5
+SCORE_LEVELS = np.arange(1, 6)
+
+# Степени x, для которых считаются суммы: Σx, Σx², Σx³, Σx⁴
+MOMENT_POWERS = 4
+
+
+@dataclass
+class ScoreMoments:
+    """Power sums and a 1..5 histogram of one rater's scores per group.
+
+    n has shape (k,), sums (k, 4) with Σx..Σx⁴ and hist (k, 5), where k is the
+    number of groups. Means, variances and the statistical tests are all derived
+    from these arrays, so their size does not depend on the number of answers.
+    """
+    n: np.ndarray
+    sums: np.ndarray
+    hist: np.ndarray
+
+    @property
+    def mean(self) -> np.ndarray:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.sums[:, 0] / self.n
+
+    @property
+    def var(self) -> np.ndarray:
+        """Population variance (ddof=0), same as np.var on the raw scores"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.maximum(self.sums[:, 1] / self.n - self.mean ** 2, 0.0)
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.var)
+
+    def total(self) -> 'ScoreMoments':
+        """Collapse all groups into one"""
+        return ScoreMoments(
+            n=self.n.sum(keepdims=True),
+            sums=self.sums.sum(axis=0, keepdims=True),
+            hist=self.hist.sum(axis=0, keepdims=True),
+        )
+
+    def select(self, index) -> 'ScoreMoments':
+        index = np.atleast_1d(index)
+        return ScoreMoments(n=self.n[index], sums=self.sums[index], hist=self.hist[index])
+
+
+@dataclass
+class ScoreAggregates:
+    """Per-question aggregates of a test: answer counts plus LLM and human score moments"""
+    question_ids: np.ndarray
+    questions: List[str]
+    answers: np.ndarray
+    llm: ScoreMoments
+    human: ScoreMoments
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    def overall(self) -> 'ScoreAggregates':
+        """Aggregates of the whole test as a single group"""
+        return ScoreAggregates(
+            question_ids=np.array([-1]),
+            questions=['Все вопросы'],
+            answers=self.answers.sum(keepdims=True),
+            llm=self.llm.total(),
+            human=self.human.total(),
+        )
+
+    def row(self, index: int) -> 'ScoreAggregates':
+        return ScoreAggregates(
+            question_ids=self.question_ids[[index]],
+            questions=[self.questions[index]],
+            answers=self.answers[[index]],
+            llm=self.llm.select(index),
+            human=self.human.select(index),
+        )
+
+
+def _rater_columns(column) -> list:
+    """count, Σx..Σx⁴ and the histogram of one score column as SQL aggregates"""
+    value = func.coalesce(column, 0.0)  # NULL не попадает в count, а в суммах даёт 0
+    columns = [func.count(column)]
+    power = None
+    for _ in range(MOMENT_POWERS):
+        power = value if power is None else power * value
+        columns.append(func.coalesce(func.sum(power), 0.0))
+    for level in SCORE_LEVELS:
+        columns.append(func.coalesce(func.sum(case((column == int(level), 1), else_=0)), 0))
+    return columns
+
+
+def _split_moments(values: np.ndarray) -> ScoreMoments:
+    return ScoreMoments(
+        n=values[:, 0].astype(np.int64),
+        sums=values[:, 1:1 + MOMENT_POWERS].astype(np.float64),
+        hist=values[:, 1 + MOMENT_POWERS:].astype(np.int64),
+    )
+
+
+def aggregate_scores(db: DBHandler, test_name: Optional[str] = None,
+                     since: Optional[datetime] = None) -> ScoreAggregates:
+    """Aggregate scores per question with a single GROUP BY query.
+
+    Answers are grouped by question_id and question text, so legacy answers that
+    were never linked to a question still get their own group.
+    """
+    filters = []
+    if test_name is not None:
+        filters.append(SurveyResult.test_id == select(Test.id).where(Test.name == test_name).scalar_subquery())
+    if since is not None:
+        filters.append(SurveyResult.timestamp >= since)
+    stmt = (
+        select(
+            SurveyResult.question_id,
+            SurveyResult.question,
+            func.count(SurveyResult.id),
+            *_rater_columns(SurveyResult.llm_score),
+            *_rater_columns(SurveyResult.human_score),
+        )
+        .where(*filters)
+        .group_by(SurveyResult.question_id, SurveyResult.question)
+        .order_by(func.min(SurveyResult.id))
+    )
+    with db.read_engine.connect() as conn:
+        rows = conn.execute(stmt).all()
+
+    width = 1 + MOMENT_POWERS + len(SCORE_LEVELS)
+    values = np.array([row[3:] for row in rows], dtype=np.float64).reshape(len(rows), 2 * width)
+    return ScoreAggregates(
+        question_ids=np.array([-1 if row[0] is None else row[0] for row in rows], dtype=np.int64),
+        questions=[row[1] for row in rows],
+        answers=np.array([row[2] for row in rows], dtype=np.int64),
+        llm=_split_moments(values[:, :width]),
+        human=_split_moments(values[:, width:]),
+    )
+
+
+def rollup_scores(db: DBHandler, test_name: Optional[str] = None,
+                  since: Optional[datetime] = None) -> ScoreAggregates:
+    """Same result as aggregate_scores, merged from the pre-aggregated score_rollups.
+
+    Reads a handful of rows per question and day instead of every answer. Rollups
+    are kept per day, so since is rounded down to the start of its day.
+    """
+    filters = []
+    if test_name is not None:
+        filters.append(ScoreRollup.test_id == select(Test.id).where(Test.name == test_name).scalar_subquery())
+    if since is not None:
+        filters.append(ScoreRollup.day >= since.date())
+    stmt = (
+        select(
+            ScoreRollup.question_id,
+            ScoreRollup.question,
+            ScoreRollup.rater,
+            *[func.sum(ScoreRollup.__table__.c[column]) for column in COUNTER_COLUMNS],
+        )
+        .where(*filters)
+        .group_by(ScoreRollup.question_id, ScoreRollup.question, ScoreRollup.rater)
+        .order_by(func.min(ScoreRollup.id))
+    )
+    with db.read_engine.connect() as conn:
+        rows = conn.execute(stmt).all()
+
+    groups = {}
+    for question_id, question, rater, *counters in rows:
+        groups.setdefault((question_id, question), {})[rater] = counters
+    empty = [0] * len(COUNTER_COLUMNS)
+    llm = np.array([raters.get(RATER_LLM, empty) for raters in groups.values()], dtype=np.float64)
+    human = np.array([raters.get(RATER_HUMAN, empty) for raters in groups.values()], dtype=np.float64)
+    llm = llm.reshape(len(groups), len(COUNTER_COLUMNS))
+    human = human.reshape(len(groups), len(COUNTER_COLUMNS))
+    return ScoreAggregates(
+        question_ids=np.array([question_id or -1 for question_id, _ in groups], dtype=np.int64),
+        questions=[question for _, question in groups],
+        answers=llm[:, 0].astype(np.int64),
+        llm=_split_moments(llm[:, 1:]),
+        human=_split_moments(human[:, 1:]),
+    )
+
+
+@dataclass
+class PairedCounts:
+    """Confusion tensor of aligned (llm, human) scores: confusion[g, llm - 1, human - 1]"""
+    keys: np.ndarray
+    labels: List[str]
+    confusion: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def overall(self) -> 'PairedCounts':
+        return PairedCounts(keys=np.array([-1]), labels=['Все'], confusion=self.confusion.sum(axis=0, keepdims=True))
+
+
+def paired_score_counts(db: DBHandler, test_name: Optional[str] = None, since: Optional[datetime] = None,
+                        by: str = 'question') -> PairedCounts:
+    """Count answers by (group, llm_score, human_score) in SQL.
+
+    Only answers scored by both raters are counted, so the LLM and human
+    scores stay paired. by is 'question' or 'test'.
+    """
+    levels = [int(level) for level in SCORE_LEVELS]
+    filters = [SurveyResult.llm_score.in_(levels), SurveyResult.human_score.in_(levels)]
+    if test_name is not None:
+        filters.append(SurveyResult.test_id == select(Test.id).where(Test.name == test_name).scalar_subquery())
+    if since is not None:
+        filters.append(SurveyResult.timestamp >= since)
+    if by == 'question':
+        group = (SurveyResult.question_id, SurveyResult.question)
+    elif by == 'test':
+        group = (SurveyResult.test_id, SurveyResult.test_name)
+    else:
+        raise ValueError(f"Unknown grouping: {by}")
+    stmt = (
+        select(*group, SurveyResult.llm_score, SurveyResult.human_score, func.count(SurveyResult.id))
+        .where(*filters)
+        .group_by(*group, SurveyResult.llm_score, SurveyResult.human_score)
+        .order_by(*group)
+    )
+    with db.read_engine.connect() as conn:
+        rows = conn.execute(stmt).all()
+
+    groups = {}
+    for key, label, _, _, _ in rows:
+        groups.setdefault((key, label), len(groups))
+    confusion = np.zeros((len(groups), len(SCORE_LEVELS), len(SCORE_LEVELS)))
+    for key, label, llm_score, human_score, count in rows:
+        confusion[groups[(key, label)], int(llm_score) - 1, int(human_score) - 1] = count
+    return PairedCounts(
+        keys=np.array([-1 if key is None else key for key, _ in groups], dtype=np.int64),
+        labels=[label for _, label in groups],
+        confusion=confusion,
+    )
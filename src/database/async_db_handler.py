@@ -0,0 +1,204 @@
+"""Asyncio database handler on SQLAlchemy's asyncio extension"""
+import asyncio
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from .db_handler import DBHandler
+from .migrations import migrate_connection
+from .models import Base, SurveyResult, Test, EVALUATION_DONE, EVALUATION_PENDING
+from .sqlite_profile import apply_sqlite_profile
+
+# Асинхронные драйверы для синхронных URL из DATABASE_URL
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+}
+
+# (result_id, score, feedback, status) для complete_evaluations
+Evaluation = Tuple[int, Optional[int], Optional[str], str]
+
+
+def async_url(db_url: str) -> str:
+    """Swap the driver of a database URL for its asyncio counterpart (aiosqlite, asyncpg)"""
+    url = make_url(db_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No asyncio driver configured for {backend}")
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+class AsyncDBHandler:
+    """Coroutine counterpart of DBHandler for event-loop code.
+
+    Writes go through the same session helpers as DBHandler (via
+    AsyncSession.run_sync), so rollups and interview checkpoints stay in
+    step with the blocking handler. Every call borrows a connection from a
+    bounded pool (pool_size + max_overflow, DB_POOL_SIZE / DB_MAX_OVERFLOW);
+    coroutines beyond that wait for a connection instead of taking a thread.
+    The schema is created and migrated on first use.
+    """
+
+    def __init__(self, db_url: str = None, pool_size: Optional[int] = None, max_overflow: Optional[int] = None,
+                 pool_timeout: float = 30):
+        if db_url is None:
+            db_url = os.getenv("DATABASE_URL", "sqlite:///interview.db")
+        url = make_url(async_url(db_url))
+        pool_options = {}
+        # :memory: в aiosqlite работает на одном соединении (StaticPool), настроек пула у него нет
+        if url.database not in (None, '', ':memory:'):
+            pool_options = {
+                'pool_size': pool_size if pool_size is not None else int(os.getenv("DB_POOL_SIZE", 5)),
+                'max_overflow': max_overflow if max_overflow is not None else int(os.getenv("DB_MAX_OVERFLOW", 10)),
+                'pool_timeout': pool_timeout,
+            }
+        self.engine = create_async_engine(url, **pool_options)
+        apply_sqlite_profile(self.engine.sync_engine)
+        self.Session = async_sessionmaker(self.engine, expire_on_commit=False)
+        self._schema_ready = False
+        self._schema_lock = asyncio.Lock()
+
+    async def init(self):
+        """Create and migrate the schema; called automatically before the first query"""
+        async with self._schema_lock:
+            if self._schema_ready:
+                return
+            async with self.engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+                await conn.run_sync(migrate_connection)
+            self._schema_ready = True
+
+    async def get_session(self) -> AsyncSession:
+        """Get a new async session"""
+        if not self._schema_ready:
+            await self.init()
+        return self.Session()
+
+    async def dispose(self):
+        """Close all pooled connections"""
+        await self.engine.dispose()
+
+    async def get_all_tests(self) -> List[str]:
+        """Get all test names"""
+        async with await self.get_session() as session:
+            return list((await session.execute(select(Test.name))).scalars())
+
+    async def get_test_id(self, test_name: str) -> Optional[int]:
+        """Get test id by name"""
+        async with await self.get_session() as session:
+            return (await session.execute(select(Test.id).where(Test.name == test_name))).scalar()
+
+    async def add_survey_result(self, result: SurveyResult) -> bool:
+        """Add a survey result to the database"""
+        return await self.add_survey_results([result]) == 1
+
+    async def add_survey_results(self, results: Sequence[SurveyResult]) -> int:
+        """Add many survey results in one transaction, return how many were added"""
+        if not results:
+            return 0
+
+        def add(session):
+            for result in results:
+                DBHandler._add_result(session, result)
+
+        async with await self.get_session() as session:
+            try:
+                await session.run_sync(add)
+                await session.commit()
+                return len(results)
+            except SQLAlchemyError as e:
+                await session.rollback()
+                print(f"Error adding survey results: {str(e)}")
+                return 0
+
+    async def save_pending_answer(self, test_name: str, first_name: str, last_name: str,
+                                  question: str, answer: str, question_id: Optional[int] = None,
+                                  interview_id: Optional[int] = None, position: Optional[int] = None) -> Optional[int]:
+        """Store a raw answer awaiting LLM evaluation, return its id (see DBHandler.save_pending_answer)"""
+        async with await self.get_session() as session:
+            try:
+                result_id = await session.run_sync(
+                    DBHandler._insert_pending_answer, test_name, first_name, last_name, question, answer,
+                    question_id, interview_id, position
+                )
+                await session.commit()
+                return result_id
+            except SQLAlchemyError as e:
+                await session.rollback()
+                print(f"Error saving pending answer: {str(e)}")
+                return None
+
+    async def complete_evaluation(self, result_id: int, score: Optional[int], feedback: Optional[str],
+                                  status: str = EVALUATION_DONE) -> bool:
+        """Store the LLM score and feedback for a pending answer"""
+        return await self.complete_evaluations([(result_id, score, feedback, status)]) == 1
+
+    async def complete_evaluations(self, evaluations: Sequence[Evaluation]) -> int:
+        """Store many LLM evaluations in one transaction, return how many results were found"""
+        if not evaluations:
+            return 0
+
+        def apply(session) -> int:
+            return sum(DBHandler._apply_evaluation(session, *evaluation) for evaluation in evaluations)
+
+        async with await self.get_session() as session:
+            try:
+                completed = await session.run_sync(apply)
+                await session.commit()
+                return completed
+            except SQLAlchemyError as e:
+                await session.rollback()
+                print(f"Error completing evaluations: {str(e)}")
+                return 0
+
+    async def update_human_score(self, result_id: int, score: float) -> bool:
+        """Update human score for a survey result"""
+        return await self.update_human_scores({result_id: score}) == 1
+
+    async def update_human_scores(self, scores: Dict[int, float]) -> int:
+        """Update many human scores in one transaction, return how many results were found"""
+        if not scores:
+            return 0
+
+        def apply(session) -> int:
+            return sum(DBHandler._apply_human_score(session, result_id, score) for result_id, score in scores.items())
+
+        async with await self.get_session() as session:
+            try:
+                updated = await session.run_sync(apply)
+                await session.commit()
+                return updated
+            except SQLAlchemyError as e:
+                await session.rollback()
+                print(f"Error updating human scores: {str(e)}")
+                return 0
+
+    async def get_pending_results(self) -> List[SurveyResult]:
+        """Get answers that are still waiting for LLM evaluation"""
+        async with await self.get_session() as session:
+            stmt = select(SurveyResult).where(SurveyResult.status == EVALUATION_PENDING)
+            return list((await session.execute(stmt)).scalars())
+
+    async def get_survey_results_by_ids(self, result_ids: List[int]) -> List[SurveyResult]:
+        """Get survey results by id, preserving the order of result_ids"""
+        if not result_ids:
+            return []
+        async with await self.get_session() as session:
+            stmt = select(SurveyResult).where(SurveyResult.id.in_(result_ids))
+            by_id = {result.id: result for result in (await session.execute(stmt)).scalars()}
+            return [by_id[result_id] for result_id in result_ids if result_id in by_id]
+
+    async def count_survey_results(self, test_name: Optional[str] = None, since: Optional[datetime] = None,
+                                   status: Optional[str] = None) -> int:
+        """Count survey results with the same filters as DBHandler.query_survey_results"""
+        async with await self.get_session() as session:
+            test_id = None
+            if test_name is not None:
+                test_id = (await session.execute(select(Test.id).where(Test.name == test_name))).scalar()
+                if test_id is None:
+                    return 0
+            stmt = select(func.count(SurveyResult.id)).where(*DBHandler._result_filters(test_id, since, status))
+            return (await session.execute(stmt)).scalar()
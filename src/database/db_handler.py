@@ -1,31 +1,206 @@
 """Database Handler for Survey Results"""
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy import select, insert, update, delete, exists, literal, func, and_, or_
+from sqlalchemy.orm import sessionmaker, scoped_session, selectinload
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError
-from .models import Base, SurveyResult, Test, Question
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from .models import (
+    Base, SurveyResult, Test, Question, Candidate, CatalogVersion, InterviewRecord,
+    EVALUATION_PENDING, EVALUATION_DONE, RATER_LLM, RATER_HUMAN, INTERVIEW_FINISHED
+)
+from .migrations import migrate
+from .rollups import add_result_to_rollups, unlink_rollups, update_rollup
+from .engines import PoolSettings, create_db_engine, pool_status
+from .sqlite_profile import is_sqlite_file
+from .writer import GroupCommitWriter, DURABILITY_IMMEDIATE
+import atexit
+import json
 import os
+import uuid
 from pathlib import Path
-from typing import List, Optional
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Колонки, которые можно запрашивать через query_survey_results
+DEFAULT_RESULT_COLUMNS = (
+    'id', 'first_name', 'last_name', 'question', 'answer', 'llm_score', 'human_score',
+    'feedback', 'timestamp', 'status'
+)
+
+# Колонки ответов, которые отдаёт очередь ручной оценки
+GRADING_COLUMNS = ('id', 'first_name', 'last_name', 'question', 'answer', 'llm_score', 'feedback')
+
+# Сколько секунд ответ закреплён за проверяющим
+GRADING_LEASE_SECONDS = 600
+
+# Сколько секунд ответ закреплён за процессом, который оценивает его через LLM (с учётом повторов)
+EVALUATION_LEASE_SECONDS = 600
+
+@dataclass
+class ResultPage:
+    """One page of survey results as plain dicts plus the keyset cursor of the next page"""
+    rows: List[Dict[str, Any]]
+    next_cursor: Optional[Tuple[datetime, int]]
+
+@dataclass(frozen=True)
+class QuestionInfo:
+    """A question as a plain value, safe to use after its session is closed"""
+    id: int
+    test_id: int
+    text: str
+
+@dataclass(frozen=True)
+class TestInfo:
+    """A test with its questions (ordered by id) as plain values"""
+    id: int
+    name: str
+    questions: Tuple[QuestionInfo, ...] = ()
 
 class DBHandler:
-    def __init__(self, db_url: str = None):
-        """Initialize database connection"""
+    def __init__(self, db_url: str = None, group_commit: Optional[bool] = None, replica_url: str = None):
+        """Initialize database connection.
+
+        Pools are tuned by PoolSettings (DB_* variables, see engines.py) and
+        SQLite connections get the WAL/pragma profile of sqlite_profile. With
+        group_commit (default: on for file SQLite, DB_GROUP_COMMIT=0/1 overrides)
+        new answers are written by one writer thread that commits them in batches;
+        the queue is flushed at interpreter exit.
+        With replica_url (or DATABASE_REPLICA_URL) admin analytics reads go to a
+        read-only replica engine (DB_REPLICA_* pool settings); everything else
+        uses the primary.
+        """
         if db_url is None:
             db_url = os.getenv("DATABASE_URL", "sqlite:///interview.db")
-        self.engine = create_engine(db_url)
+        self.engine = create_db_engine(db_url, PoolSettings.from_env())
         Base.metadata.create_all(self.engine)
+        migrate(self.engine)
         self.Session = scoped_session(sessionmaker(bind=self.engine))
+        replica_url = replica_url or os.getenv("DATABASE_REPLICA_URL")
+        if replica_url:
+            self.read_engine = create_db_engine(replica_url, PoolSettings.from_env("DB_REPLICA_"), read_only=True)
+            self.ReadSession = scoped_session(sessionmaker(bind=self.read_engine))
+        else:
+            self.read_engine = self.engine
+            self.ReadSession = self.Session
+        if group_commit is None:
+            group_commit = os.getenv("DB_GROUP_COMMIT", "1" if is_sqlite_file(db_url) else "0") == "1"
+        self.writer = GroupCommitWriter(sessionmaker(bind=self.engine)) if group_commit else None
+        if self.writer is not None:
+            # Поток записи - демон; при штатном завершении процесса очередь дописывается в базу
+            atexit.register(self.writer.stop)
     
     def get_session(self) -> Session:
         """Get a new database session"""
         return self.Session()
+
+    @contextmanager
+    def session_scope(self, replica: bool = False) -> Iterator[Session]:
+        """Unit of work: commit on success, roll back on error, always close.
+
+        replica sessions come from get_read_session() and are never committed.
+        """
+        session = self.get_read_session() if replica else self.get_session()
+        try:
+            yield session
+            if not replica:
+                session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def get_read_session(self) -> Session:
+        """Session for analytics reads; bound to the replica when one is configured.
+
+        Replicas may lag behind, so code that must see its own writes (the
+        candidate flow, the grading queue) uses get_session().
+        """
+        return self.ReadSession()
+
+    def pool_metrics(self) -> Dict[str, Dict[str, float]]:
+        """Pool occupancy and checkout wait times per engine"""
+        metrics = {'primary': pool_status(self.engine)}
+        if self.read_engine is not self.engine:
+            metrics['replica'] = pool_status(self.read_engine)
+        return metrics
+
+    def _write(self, write: Callable[[Session], Any], durability: str = DURABILITY_IMMEDIATE) -> Any:
+        """Run a write through the group-commit writer, or in its own transaction without one.
+
+        Errors of immediate writes are raised to the caller; batched writes
+        return None at once and their errors are only logged by the writer.
+        """
+        if self.writer is not None:
+            return self.writer.write(write, durability)
+        session = self.get_session()
+        try:
+            value = write(session)
+            session.commit()
+            return value
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    @staticmethod
+    def _get_or_create_candidate(session: Session, first_name: str, last_name: str) -> int:
+        first_name, last_name = first_name or '', last_name or ''
+        candidate = session.query(Candidate).filter_by(first_name=first_name, last_name=last_name).first()
+        if candidate:
+            return candidate.id
+        try:
+            # Точка сохранения: параллельная сессия могла уже создать этого кандидата
+            with session.begin_nested():
+                candidate = Candidate(first_name=first_name, last_name=last_name)
+                session.add(candidate)
+            return candidate.id
+        except IntegrityError:
+            return session.query(Candidate.id).filter_by(first_name=first_name, last_name=last_name).scalar()
+
+    @staticmethod
+    def _link_result(session: Session, result: SurveyResult):
+        """Fill test_id/question_id/candidate_id of a result from its names"""
+        if result.test_id is None and result.test_name:
+            result.test_id = session.query(Test.id).filter(Test.name == result.test_name).scalar()
+        if result.question_id is None and result.test_id is not None and result.question:
+            result.question_id = session.query(Question.id).filter(
+                Question.test_id == result.test_id,
+                Question.text == result.question
+            ).order_by(Question.id).limit(1).scalar()
+        if result.candidate_id is None:
+            result.candidate_id = DBHandler._get_or_create_candidate(session, result.first_name, result.last_name)
+
+    @staticmethod
+    def _add_result(session: Session, result: SurveyResult):
+        """Link and add a new result and count it in score_rollups in the same transaction"""
+        DBHandler._link_result(session, result)
+        if result.timestamp is None:
+            result.timestamp = datetime.utcnow()
+        session.add(result)
+        add_result_to_rollups(session, result)
+
+    @staticmethod
+    def bump_catalog_version(session: Session):
+        """Mark tests/questions as changed; call inside the transaction that changes them"""
+        session.execute(update(CatalogVersion).where(CatalogVersion.id == 1).values(version=CatalogVersion.version + 1))
+
+    def get_catalog_version(self) -> int:
+        """Current catalog version, shared by all processes using this database"""
+        with self.engine.connect() as conn:
+            return conn.execute(select(CatalogVersion.version).where(CatalogVersion.id == 1)).scalar() or 0
+
+    def get_test_id(self, test_name: str) -> Optional[int]:
+        """Get test id by name"""
+        with self.session_scope() as session:
+            return session.execute(select(Test.id).where(Test.name == test_name)).scalar()
     
     def save_survey_result(self, first_name: str, last_name: str, question: str, 
                           answer: str, feedback: str, llm_score: float, 
-                          human_score: float = None) -> bool:
+                          human_score: float = None, durability: str = DURABILITY_IMMEDIATE) -> bool:
         """Save survey result to database"""
-        session = self.get_session()
         try:
             result = SurveyResult(
                 first_name=first_name,
@@ -36,24 +211,28 @@ class DBHandler:
                 llm_score=llm_score,
                 human_score=human_score
             )
-            session.add(result)
-            session.commit()
+            self._write(lambda session: self._add_result(session, result), durability)
             print(f"Saved survey result for {first_name} {last_name}")
             return True
         except SQLAlchemyError as e:
-            session.rollback()
             print(f"Error saving survey result: {str(e)}")
             return False
-        finally:
-            session.close()
     
+    @staticmethod
+    def _apply_human_score(session: Session, result_id: int, score: float) -> bool:
+        """Set the human score of a result and move it in the rollups; False if there is no such result"""
+        result = session.get(SurveyResult, result_id)
+        if result is None:
+            return False
+        update_rollup(session, result, RATER_HUMAN, old_score=result.human_score, new_score=score)
+        result.human_score = score
+        return True
+
     def update_human_score(self, result_id: int, score: float) -> bool:
         """Update human score for a survey result"""
         session = self.get_session()
         try:
-            result = session.query(SurveyResult).filter(SurveyResult.id == result_id).first()
-            if result:
-                result.human_score = score
+            if self._apply_human_score(session, result_id, score):
                 session.commit()
                 print(f"Updated human score for result {result_id}")
                 return True
@@ -68,7 +247,7 @@ class DBHandler:
     
     def get_all_survey_results(self):
         """Get all survey results from database"""
-        session = self.get_session()
+        session = self.get_read_session()
         try:
             results = session.query(SurveyResult).all()
             print(f"Retrieved {len(results)} survey results")
@@ -81,7 +260,7 @@ class DBHandler:
     
     def get_survey_results_by_name(self, first_name, last_name):
         """Get survey results for a specific person"""
-        session = self.get_session()
+        session = self.get_read_session()
         try:
             results = session.query(SurveyResult).filter_by(
                 first_name=first_name,
@@ -95,135 +274,588 @@ class DBHandler:
         finally:
             session.close()
     
-    def get_test_by_name(self, test_name: str) -> Optional[Test]:
-        """Get test by name"""
-        session = self.get_session()
-        try:
-            return session.query(Test).filter_by(name=test_name).first()
-        finally:
-            session.close()
+    @staticmethod
+    def _test_id_subquery(test_name: str):
+        return select(Test.id).where(Test.name == test_name).scalar_subquery()
+
+    @staticmethod
+    def _question_id_subquery(test_name: str, question_text: str):
+        # Первый вопрос теста с таким текстом, как и раньше при .first()
+        return select(func.min(Question.id)).where(
+            Question.test_id == DBHandler._test_id_subquery(test_name),
+            Question.text == question_text
+        ).scalar_subquery()
+
+    def get_test_by_name(self, test_name: str) -> Optional[TestInfo]:
+        """Get a test and its questions by name in one query"""
+        with self.session_scope() as session:
+            rows = session.execute(
+                select(Test.id, Test.name, Question.id, Question.text)
+                .outerjoin(Question, Question.test_id == Test.id)
+                .where(Test.name == test_name)
+                .order_by(Question.id)
+            ).all()
+        if not rows:
+            return None
+        test_id, name = rows[0][0], rows[0][1]
+        questions = tuple(QuestionInfo(question_id, test_id, text)
+                          for _, _, question_id, text in rows if question_id is not None)
+        return TestInfo(test_id, name, questions)
+
+    def get_tests_with_questions(self) -> List[TestInfo]:
+        """All tests with their questions; questions of every test come from one selectin query"""
+        with self.session_scope() as session:
+            tests = session.execute(
+                select(Test).options(selectinload(Test.questions)).order_by(Test.id)
+            ).scalars().all()
+            return [
+                TestInfo(test.id, test.name, tuple(
+                    QuestionInfo(question.id, test.id, question.text)
+                    for question in sorted(test.questions, key=lambda question: question.id)
+                ))
+                for test in tests
+            ]
     
     def get_all_tests(self) -> List[str]:
         """Get all test names"""
-        session = self.get_session()
+        with self.session_scope() as session:
+            return list(session.execute(select(Test.name).order_by(Test.id)).scalars())
+
+    def _catalog_change(self, stmt, action: str) -> bool:
+        """Run one INSERT/UPDATE/DELETE on tests or questions; bump the catalog version if it hit a row"""
         try:
-            tests = session.query(Test).all()
-            return [test.name for test in tests]
-        finally:
-            session.close()
+            with self.session_scope() as session:
+                changed = session.execute(stmt).rowcount > 0
+                if changed:
+                    self.bump_catalog_version(session)
+                return changed
+        except SQLAlchemyError as e:
+            print(f"Error {action}: {str(e)}")
+            return False
     
     def create_test(self, test_name: str) -> bool:
-        """Create a new test"""
+        """Create a new test; False if it already exists"""
+        return self._catalog_change(
+            insert(Test).from_select(
+                ['name'], select(literal(test_name)).where(~exists().where(Test.name == test_name))
+            ),
+            "creating test"
+        )
+    
+    def add_question_to_test(self, test_name: str, question_text: str) -> bool:
+        """Add a question to a test"""
+        return self._catalog_change(
+            insert(Question).from_select(
+                ['test_id', 'text'], select(Test.id, literal(question_text)).where(Test.name == test_name)
+            ),
+            "adding question"
+        )
+    
+    def update_question(self, test_name: str, old_text: str, new_text: str) -> bool:
+        """Update a question in a test"""
+        return self._catalog_change(
+            update(Question).where(Question.id == self._question_id_subquery(test_name, old_text))
+            .values(text=new_text),
+            "updating question"
+        )
+    
+    def delete_question(self, test_name: str, question_text: str) -> bool:
+        """Delete a question from a test; its answers keep their text but lose the link"""
+        try:
+            with self.session_scope() as session:
+                question_id = session.execute(select(self._question_id_subquery(test_name, question_text))).scalar()
+                if question_id is None:
+                    return False
+                session.execute(
+                    update(SurveyResult).where(SurveyResult.question_id == question_id).values(question_id=None)
+                )
+                unlink_rollups(session, question_id=question_id)
+                session.execute(delete(Question).where(Question.id == question_id))
+                self.bump_catalog_version(session)
+                return True
+        except SQLAlchemyError as e:
+            print(f"Error deleting question: {str(e)}")
+            return False
+    
+    def delete_test(self, test_name: str) -> bool:
+        """Delete a test and all its questions; their answers keep the names but lose the links"""
+        try:
+            with self.session_scope() as session:
+                test_id = session.execute(select(Test.id).where(Test.name == test_name)).scalar()
+                if test_id is None:
+                    return False
+                # SQLite не выполняет ON DELETE SET NULL, поэтому ссылки обнуляются явно
+                test_questions = select(Question.id).where(Question.test_id == test_id)
+                session.execute(
+                    update(SurveyResult).where(SurveyResult.question_id.in_(test_questions)).values(question_id=None)
+                )
+                session.execute(update(SurveyResult).where(SurveyResult.test_id == test_id).values(test_id=None))
+                session.execute(update(InterviewRecord).where(InterviewRecord.test_id == test_id).values(test_id=None))
+                unlink_rollups(session, test_id=test_id)
+                session.execute(delete(Question).where(Question.test_id == test_id))
+                session.execute(delete(Test).where(Test.id == test_id))
+                self.bump_catalog_version(session)
+                return True
+        except SQLAlchemyError as e:
+            print(f"Error deleting test: {str(e)}")
+            return False
+
+    def add_survey_result(self, result: SurveyResult, durability: str = DURABILITY_IMMEDIATE) -> bool:
+        """Add a survey result to the database.
+
+        durability=batched returns as soon as the result is queued; it is
+        committed with the writer's next batch.
+        """
+        try:
+            self._write(lambda session: self._add_result(session, result), durability)
+            return True
+        except SQLAlchemyError:
+            return False
+
+    def get_survey_results(self, test_name: Optional[str] = None) -> List[SurveyResult]:
+        """Get all survey results, optionally filtered by test name"""
+        session = self.get_read_session()
+        try:
+            query = session.query(SurveyResult)
+            if test_name:
+                query = query.join(Test, SurveyResult.test_id == Test.id).filter(Test.name == test_name)
+            return query.all()
+        finally:
+            session.close()
+
+    @staticmethod
+    def _insert_pending_answer(session: Session, test_name: str, first_name: str, last_name: str,
+                               question: str, answer: str, question_id: Optional[int] = None,
+                               interview_id: Optional[int] = None, position: Optional[int] = None) -> Optional[int]:
+        """Insert a pending answer in the session (see save_pending_answer), return its flushed id"""
+        if interview_id is not None and not DBHandler._advance_interview(session, interview_id, position):
+            print(f"Interview {interview_id} has already passed question {position}")
+            return None
+        if question_id is not None and session.get(Question, question_id) is None:
+            question_id = None
+        result = SurveyResult(
+            test_name=test_name,
+            first_name=first_name,
+            last_name=last_name,
+            question=question,
+            answer=answer,
+            question_id=question_id,
+            interview_id=interview_id,
+            score=0,  # score NOT NULL в старых базах, перезаписывается после оценки
+            status=EVALUATION_PENDING,
+            timestamp=datetime.utcnow()
+        )
+        DBHandler._add_result(session, result)
+        session.flush()
+        return result.id
+
+    def save_pending_answer(self, test_name: str, first_name: str, last_name: str,
+                            question: str, answer: str, question_id: Optional[int] = None,
+                            interview_id: Optional[int] = None, position: Optional[int] = None) -> Optional[int]:
+        """Store a raw answer awaiting LLM evaluation, return its id.
+
+        question_id links the answer to the question it was asked from even if
+        the question text was edited since; a deleted question is ignored.
+        With interview_id the answer to question number position also moves the
+        persisted interview past it in the same transaction. An answer to a
+        position the interview has already passed (a second tab or replica got
+        there first) is rejected and None is returned. The id is needed right
+        away, so this write is always immediate.
+        """
+        def write(session: Session) -> Optional[int]:
+            return self._insert_pending_answer(session, test_name, first_name, last_name, question, answer,
+                                               question_id, interview_id, position)
+
+        try:
+            return self._write(write)
+        except SQLAlchemyError as e:
+            print(f"Error saving pending answer: {str(e)}")
+            return None
+
+    @staticmethod
+    def _apply_evaluation(session: Session, result_id: int, score: Optional[int], feedback: Optional[str],
+                          status: str = EVALUATION_DONE) -> bool:
+        """Store an LLM evaluation in the session; False if there is no such result"""
+        result = session.get(SurveyResult, result_id)
+        if result is None:
+            return False
+        if score is not None:
+            update_rollup(session, result, RATER_LLM, old_score=result.llm_score, new_score=score)
+            result.score = score
+            result.llm_score = score
+        result.feedback = feedback
+        result.status = status
+        # Оценка закончена, ответ освобождается для проверяющих
+        result.claimed_by = None
+        result.claimed_until = None
+        return True
+
+    def complete_evaluation(self, result_id: int, score: Optional[int], feedback: Optional[str],
+                            status: str = EVALUATION_DONE) -> bool:
+        """Store the LLM score and feedback for a pending answer"""
         session = self.get_session()
         try:
-            if session.query(Test).filter_by(name=test_name).first():
+            if not self._apply_evaluation(session, result_id, score, feedback, status):
+                print(f"No result found with id {result_id}")
                 return False
-            test = Test(name=test_name)
-            session.add(test)
             session.commit()
             return True
         except SQLAlchemyError as e:
             session.rollback()
-            print(f"Error creating test: {str(e)}")
+            print(f"Error completing evaluation: {str(e)}")
             return False
         finally:
             session.close()
-    
-    def add_question_to_test(self, test_name: str, question_text: str) -> bool:
-        """Add a question to a test"""
+
+    def get_pending_results(self, stale_seconds: Optional[int] = None) -> List[SurveyResult]:
+        """Get answers that are still waiting for LLM evaluation.
+
+        With stale_seconds only answers older than that and not claimed by a
+        live evaluator are returned, i.e. the ones a stopped process left behind.
+        """
         session = self.get_session()
         try:
-            test = session.query(Test).filter_by(name=test_name).first()
-            if not test:
-                return False
-            question = Question(text=question_text, test=test)
-            session.add(question)
+            query = session.query(SurveyResult).filter_by(status=EVALUATION_PENDING)
+            if stale_seconds is not None:
+                now = datetime.utcnow()
+                query = query.filter(
+                    or_(SurveyResult.timestamp.is_(None),
+                        SurveyResult.timestamp < now - timedelta(seconds=stale_seconds)),
+                    or_(SurveyResult.claimed_until.is_(None), SurveyResult.claimed_until < now)
+                )
+            return query.all()
+        finally:
+            session.close()
+
+    def claim_evaluation(self, result_id: int, evaluator: str,
+                         lease_seconds: int = EVALUATION_LEASE_SECONDS) -> bool:
+        """Claim a pending answer for LLM evaluation; False if it is done or another evaluator holds it.
+
+        Like next_ungraded this is a conditional UPDATE, so two processes
+        never evaluate the same answer at once. complete_evaluation releases it.
+        """
+        session = self.get_session()
+        try:
+            now = datetime.utcnow()
+            claimed = session.execute(
+                update(SurveyResult)
+                .where(SurveyResult.id == result_id, SurveyResult.status == EVALUATION_PENDING,
+                       self._claim_available(evaluator, now))
+                .values(claimed_by=evaluator, claimed_until=now + timedelta(seconds=lease_seconds))
+            ).rowcount == 1
             session.commit()
-            return True
+            return claimed
         except SQLAlchemyError as e:
             session.rollback()
-            print(f"Error adding question: {str(e)}")
+            print(f"Error claiming answer for evaluation: {str(e)}")
             return False
         finally:
             session.close()
-    
-    def update_question(self, test_name: str, old_text: str, new_text: str) -> bool:
-        """Update a question in a test"""
+
+    def get_survey_results_by_ids(self, result_ids: List[int]) -> List[SurveyResult]:
+        """Get survey results by id, preserving the order of result_ids"""
+        if not result_ids:
+            return []
         session = self.get_session()
         try:
-            test = session.query(Test).filter_by(name=test_name).first()
-            if not test:
-                return False
-            question = session.query(Question).filter_by(test=test, text=old_text).first()
-            if not question:
-                return False
-            question.text = new_text
+            results = session.query(SurveyResult).filter(SurveyResult.id.in_(result_ids)).all()
+            by_id = {result.id: result for result in results}
+            return [by_id[result_id] for result_id in result_ids if result_id in by_id]
+        finally:
+            session.close()
+
+    @staticmethod
+    def _result_filters(test_id: Optional[int] = None, since: Optional[datetime] = None,
+                        status: Optional[str] = None) -> list:
+        filters = []
+        if test_id is not None:
+            filters.append(SurveyResult.test_id == test_id)
+        if since is not None:
+            filters.append(SurveyResult.timestamp >= since)
+        if status is not None:
+            filters.append(SurveyResult.status == status)
+        return filters
+
+    def query_survey_results(self, test_name: Optional[str] = None, columns: Sequence[str] = DEFAULT_RESULT_COLUMNS,
+                             since: Optional[datetime] = None, status: Optional[str] = None,
+                             cursor: Optional[Tuple[datetime, int]] = None,
+                             limit: Optional[int] = 50) -> ResultPage:
+        """Get survey results newest first, filtered and paginated in SQL.
+
+        Only the requested columns are selected and rows come back as dicts, so no
+        ORM objects are built. Pagination is keyset-based on (timestamp, id): pass
+        the next_cursor of the previous page to continue. Legacy rows without a
+        timestamp come last. limit=None returns all rows.
+        """
+        session = self.get_read_session()
+        try:
+            test_id = None
+            if test_name is not None:
+                test_id = session.query(Test.id).filter(Test.name == test_name).scalar()
+                if test_id is None:
+                    return ResultPage(rows=[], next_cursor=None)
+            filters = self._result_filters(test_id, since, status)
+            if cursor is not None:
+                cursor_timestamp, cursor_id = cursor
+                # Старые ответы без timestamp идут в конце, после всех датированных, по убыванию id
+                if cursor_timestamp is None:
+                    filters.append(and_(SurveyResult.timestamp.is_(None), SurveyResult.id < cursor_id))
+                else:
+                    filters.append(or_(
+                        SurveyResult.timestamp < cursor_timestamp,
+                        and_(SurveyResult.timestamp == cursor_timestamp, SurveyResult.id < cursor_id),
+                        SurveyResult.timestamp.is_(None)
+                    ))
+
+            table = SurveyResult.__table__
+            selected = [table.c[name] for name in columns]
+            # timestamp и id нужны для курсора, даже если их не запросили
+            extra = [table.c[name] for name in ('timestamp', 'id') if name not in columns]
+            stmt = (
+                select(*selected, *extra)
+                .where(*filters)
+                .order_by(SurveyResult.timestamp.desc().nulls_last(), SurveyResult.id.desc())
+            )
+            if limit is not None:
+                stmt = stmt.limit(limit + 1)
+            rows = [dict(row) for row in session.execute(stmt).mappings()]
+
+            next_cursor = None
+            if limit is not None and len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = (rows[-1]['timestamp'], rows[-1]['id'])
+            if extra:
+                for row in rows:
+                    for column in extra:
+                        row.pop(column.name)
+            return ResultPage(rows=rows, next_cursor=next_cursor)
+        except SQLAlchemyError as e:
+            print(f"Error querying survey results: {str(e)}")
+            return ResultPage(rows=[], next_cursor=None)
+        finally:
+            session.close()
+
+    def count_survey_results(self, test_name: Optional[str] = None, since: Optional[datetime] = None,
+                             status: Optional[str] = None) -> int:
+        """Count survey results with the same filters as query_survey_results"""
+        session = self.get_read_session()
+        try:
+            test_id = None
+            if test_name is not None:
+                test_id = session.query(Test.id).filter(Test.name == test_name).scalar()
+                if test_id is None:
+                    return 0
+            stmt = select(func.count(SurveyResult.id)).where(*self._result_filters(test_id, since, status))
+            return session.execute(stmt).scalar()
+        finally:
+            session.close()
+
+    @staticmethod
+    def _ungraded_filters(test_id: int) -> list:
+        return [
+            SurveyResult.test_id == test_id,
+            SurveyResult.human_score.is_(None),
+            # Ответы, которые ещё ждут LLM, проверять рано
+            SurveyResult.status.is_distinct_from(EVALUATION_PENDING),
+        ]
+
+    @staticmethod
+    def _claim_available(grader: str, now: datetime):
+        return or_(
+            SurveyResult.claimed_until.is_(None),
+            SurveyResult.claimed_until < now,
+            SurveyResult.claimed_by == grader
+        )
+
+    def next_ungraded(self, test_name: str, grader: str, limit: int = 10,
+                      lease_seconds: int = GRADING_LEASE_SECONDS) -> List[Dict[str, Any]]:
+        """Claim up to limit ungraded answers of a test for a grader, oldest first.
+
+        Claimed answers are hidden from other graders until the lease expires,
+        so concurrent graders never get the same answer. The grader's own
+        unexpired claims are returned again (and extended). Under contention
+        fewer than limit answers may be returned.
+        """
+        session = self.get_session()
+        try:
+            test_id = session.query(Test.id).filter(Test.name == test_name).scalar()
+            if test_id is None:
+                return []
+            now = datetime.utcnow()
+            available = self._claim_available(grader, now)
+            ids = session.execute(
+                select(SurveyResult.id)
+                .where(*self._ungraded_filters(test_id), available)
+                .order_by(SurveyResult.id)
+                .limit(limit)
+            ).scalars().all()
+            if not ids:
+                return []
+            # Условие повторяется в UPDATE: ответ мог забрать другой проверяющий
+            session.execute(
+                update(SurveyResult)
+                .where(SurveyResult.id.in_(ids), available)
+                .values(claimed_by=grader, claimed_until=now + timedelta(seconds=lease_seconds))
+            )
             session.commit()
-            return True
+            table = SurveyResult.__table__
+            stmt = (
+                select(*[table.c[name] for name in GRADING_COLUMNS])
+                .where(SurveyResult.id.in_(ids), SurveyResult.claimed_by == grader)
+                .order_by(SurveyResult.id)
+            )
+            return [dict(row) for row in session.execute(stmt).mappings()]
         except SQLAlchemyError as e:
             session.rollback()
-            print(f"Error updating question: {str(e)}")
-            return False
+            print(f"Error claiming answers for grading: {str(e)}")
+            return []
         finally:
             session.close()
-    
-    def delete_question(self, test_name: str, question_text: str) -> bool:
-        """Delete a question from a test"""
+
+    def release_claims(self, grader: str, result_ids: Optional[List[int]] = None) -> int:
+        """Return a grader's claimed answers to the queue, all of them by default"""
         session = self.get_session()
         try:
-            test = session.query(Test).filter_by(name=test_name).first()
-            if not test:
-                return False
-            question = session.query(Question).filter_by(test=test, text=question_text).first()
-            if not question:
-                return False
-            session.delete(question)
+            stmt = update(SurveyResult).where(SurveyResult.claimed_by == grader)
+            if result_ids is not None:
+                stmt = stmt.where(SurveyResult.id.in_(result_ids))
+            released = session.execute(stmt.values(claimed_by=None, claimed_until=None)).rowcount
             session.commit()
-            return True
+            return released
         except SQLAlchemyError as e:
             session.rollback()
-            print(f"Error deleting question: {str(e)}")
-            return False
+            print(f"Error releasing claims: {str(e)}")
+            return 0
         finally:
             session.close()
-    
-    def delete_test(self, test_name: str) -> bool:
-        """Delete a test and all its questions"""
+
+    def save_human_scores(self, scores: Dict[int, float], grader: Optional[str] = None) -> int:
+        """Save several human scores in one transaction, return how many were saved.
+
+        With a grader, answers currently claimed by someone else are skipped.
+        Saved answers are released and counted in score_rollups.
+        """
+        if not scores:
+            return 0
         session = self.get_session()
         try:
-            test = session.query(Test).filter_by(name=test_name).first()
-            if not test:
-                return False
-            session.delete(test)
+            now = datetime.utcnow()
+            results = session.query(SurveyResult).filter(SurveyResult.id.in_(list(scores))).all()
+            saved = 0
+            for result in results:
+                claimed_by_other = (
+                    result.claimed_by not in (None, grader)
+                    and result.claimed_until is not None and result.claimed_until > now
+                )
+                if grader is not None and claimed_by_other:
+                    continue
+                score = scores[result.id]
+                update_rollup(session, result, RATER_HUMAN, old_score=result.human_score, new_score=score)
+                result.human_score = score
+                result.claimed_by = None
+                result.claimed_until = None
+                saved += 1
             session.commit()
-            return True
+            print(f"Saved {saved} human scores")
+            return saved
         except SQLAlchemyError as e:
             session.rollback()
-            print(f"Error deleting test: {str(e)}")
-            return False
+            print(f"Error saving human scores: {str(e)}")
+            return 0
+        finally:
+            session.close()
+
+    def count_ungraded(self, test_name: str) -> int:
+        """Number of answers of a test still waiting for a human score"""
+        session = self.get_session()
+        try:
+            test_id = session.query(Test.id).filter(Test.name == test_name).scalar()
+            if test_id is None:
+                return 0
+            return session.execute(
+                select(func.count(SurveyResult.id)).where(*self._ungraded_filters(test_id))
+            ).scalar()
         finally:
             session.close()
 
-    def add_survey_result(self, result: SurveyResult) -> bool:
-        """Add a survey result to the database"""
+    @staticmethod
+    def _advance_interview(session: Session, interview_id: int, position: int) -> bool:
+        """Move an interview past question number position unless it is already there"""
+        moved = session.execute(
+            update(InterviewRecord)
+            .where(InterviewRecord.id == interview_id, InterviewRecord.current <= position)
+            .values(current=position + 1, updated_at=datetime.utcnow())
+        ).rowcount
+        return moved > 0
+
+    def create_interview(self, test_name: str, first_name: str, last_name: str, question_ids: List[int],
+                         questions: List[str], mode: Optional[str] = None,
+                         seed: Optional[int] = None) -> Optional[Tuple[int, str]]:
+        """Persist the question snapshot of a new interview, return its (id, resume token)"""
         session = self.get_session()
         try:
-            session.add(result)
+            record = InterviewRecord(
+                token=uuid.uuid4().hex,
+                test_id=session.query(Test.id).filter(Test.name == test_name).scalar(),
+                candidate_id=self._get_or_create_candidate(session, first_name or '', last_name or ''),
+                test_name=test_name,
+                first_name=first_name,
+                last_name=last_name,
+                question_ids=json.dumps(list(question_ids)),
+                questions=json.dumps(list(questions), ensure_ascii=False),
+                mode=mode,
+                seed=seed
+            )
+            session.add(record)
             session.commit()
-            return True
-        except SQLAlchemyError:
+            return record.id, record.token
+        except SQLAlchemyError as e:
             session.rollback()
-            return False
+            print(f"Error creating interview: {str(e)}")
+            return None
         finally:
             session.close()
 
-    def get_survey_results(self, test_name: Optional[str] = None) -> List[SurveyResult]:
-        """Get all survey results, optionally filtered by test name"""
+    def load_interview(self, token: str) -> Optional[Dict[str, Any]]:
+        """Interview state by resume token: snapshot, position and ids of the saved answers"""
         session = self.get_session()
         try:
-            query = session.query(SurveyResult)
-            if test_name:
-                query = query.filter_by(test_name=test_name)
-            return query.all()
+            record = session.query(InterviewRecord).filter(InterviewRecord.token == token).first()
+            if record is None:
+                return None
+            result_ids = [result_id for (result_id,) in session.query(SurveyResult.id).filter(
+                SurveyResult.interview_id == record.id
+            ).order_by(SurveyResult.id)]
+            return {
+                'id': record.id,
+                'token': record.token,
+                'test_name': record.test_name,
+                'first_name': record.first_name or '',
+                'last_name': record.last_name or '',
+                'question_ids': json.loads(record.question_ids),
+                'questions': json.loads(record.questions),
+                'mode': record.mode,
+                'seed': record.seed,
+                'current': record.current,
+                'status': record.status,
+                'result_ids': result_ids,
+            }
+        finally:
+            session.close()
+
+    def finish_interview(self, interview_id: int) -> bool:
+        """Mark an interview as finished once its summary has been shown"""
+        session = self.get_session()
+        try:
+            session.execute(
+                update(InterviewRecord).where(InterviewRecord.id == interview_id)
+                .values(status=INTERVIEW_FINISHED, updated_at=datetime.utcnow())
+            )
+            session.commit()
+            return True
+        except SQLAlchemyError as e:
+            session.rollback()
+            print(f"Error finishing interview: {str(e)}")
+            return False
         finally:
             session.close()
@@ -0,0 +1,146 @@
+"""Engine profiles: pool tuning, timeouts and pool checkout metrics"""
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool
+from .sqlite_profile import apply_sqlite_profile, sqlite_pragmas
+
+
+def _env(prefix: str, name: str, default: Any) -> str:
+    # DB_REPLICA_POOL_SIZE -> DB_POOL_SIZE -> значение по умолчанию
+    return os.getenv(f"{prefix}{name}", os.getenv(f"DB_{name}", str(default)))
+
+
+@dataclass
+class PoolSettings:
+    """Connection pool and session limits of one engine"""
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0  # Секунд ожидания свободного соединения
+    pool_recycle: int = 1800  # Переоткрывать соединения старше, чем закрывает сервер/балансировщик
+    pool_pre_ping: bool = True  # Проверять соединение перед выдачей (после рестарта БД/failover)
+    statement_timeout_ms: Optional[int] = None  # Только PostgreSQL
+
+    @classmethod
+    def from_env(cls, prefix: str = "DB_") -> 'PoolSettings':
+        """Settings from DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+        DB_POOL_PRE_PING and DB_STATEMENT_TIMEOUT_MS; another prefix (e.g. DB_REPLICA_)
+        overrides them for one engine"""
+        defaults = cls()
+        timeout = _env(prefix, "STATEMENT_TIMEOUT_MS", "")
+        return cls(
+            pool_size=int(_env(prefix, "POOL_SIZE", defaults.pool_size)),
+            max_overflow=int(_env(prefix, "MAX_OVERFLOW", defaults.max_overflow)),
+            pool_timeout=float(_env(prefix, "POOL_TIMEOUT", defaults.pool_timeout)),
+            pool_recycle=int(_env(prefix, "POOL_RECYCLE", defaults.pool_recycle)),
+            pool_pre_ping=_env(prefix, "POOL_PRE_PING", "1") == "1",
+            statement_timeout_ms=int(timeout) if timeout else None,
+        )
+
+
+class PoolMetrics:
+    """How long sessions waited for a pooled connection"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, wait: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_total': self.wait_total,
+                'wait_avg': self.wait_total / attempts if attempts else 0.0,
+                'wait_max': self.wait_max,
+            }
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool that records the time every checkout waited in PoolMetrics"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - start)
+        return connection
+
+    def recreate(self) -> 'MeteredQueuePool':
+        # engine.dispose() пересоздаёт пул; счётчики переходят в новый
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def create_db_engine(db_url: str, settings: Optional[PoolSettings] = None, read_only: bool = False) -> Engine:
+    """Engine with a metered, tuned pool.
+
+    PostgreSQL gets statement_timeout and, for read_only engines,
+    default_transaction_read_only. SQLite gets the sqlite_profile pragmas and
+    query_only for read_only engines; in-memory SQLite keeps its default
+    single-connection pool.
+    """
+    settings = settings or PoolSettings.from_env()
+    url = make_url(db_url)
+    backend = url.get_backend_name()
+    options: Dict[str, Any] = {}
+    if not (backend == 'sqlite' and url.database in (None, '', ':memory:')):
+        options = {
+            'poolclass': MeteredQueuePool,
+            'pool_size': settings.pool_size,
+            'max_overflow': settings.max_overflow,
+            'pool_timeout': settings.pool_timeout,
+            'pool_recycle': settings.pool_recycle,
+            'pool_pre_ping': settings.pool_pre_ping,
+        }
+    if backend == 'postgresql':
+        server_options = []
+        if settings.statement_timeout_ms:
+            server_options.append(f"-c statement_timeout={settings.statement_timeout_ms}")
+        if read_only:
+            server_options.append("-c default_transaction_read_only=on")
+        if server_options:
+            options['connect_args'] = {'options': ' '.join(server_options)}
+    engine = create_engine(url, **options)
+    if backend == 'sqlite':
+        pragmas = sqlite_pragmas()
+        if read_only:
+            pragmas['query_only'] = 1
+        apply_sqlite_profile(engine, pragmas)
+    return engine
+
+
+def pool_status(engine: Engine) -> Dict[str, float]:
+    """Current pool occupancy plus the checkout wait metrics of a metered pool"""
+    pool = engine.pool
+    status: Dict[str, float] = {}
+    if isinstance(pool, QueuePool):
+        status.update(size=pool.size(), checked_out=pool.checkedout(), overflow=pool.overflow())
+    if isinstance(pool, MeteredQueuePool):
+        status.update(pool.metrics.snapshot())
+    return status
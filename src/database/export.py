@@ -0,0 +1,130 @@
+"""Streaming export of survey results to CSV, gzip-CSV or Parquet"""
+import argparse
+import csv
+import gzip
+import io
+from datetime import datetime
+from typing import BinaryIO, Iterator, List, Optional, Sequence, Union
+from sqlalchemy import select
+from .db_handler import DBHandler
+from .models import SurveyResult, Test
+
+EXPORT_COLUMNS = (
+    'id', 'test_name', 'first_name', 'last_name', 'question', 'answer',
+    'llm_score', 'human_score', 'feedback', 'status', 'timestamp'
+)
+
+EXPORT_FORMATS = ('csv', 'csv.gz', 'parquet')
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def iter_result_batches(db: DBHandler, test_name: Optional[str] = None, since: Optional[datetime] = None,
+                        columns: Sequence[str] = EXPORT_COLUMNS,
+                        chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[tuple]]:
+    """Yield survey result rows in chunks from a server-side cursor.
+
+    At most chunk_size rows are held in memory at a time; rows are plain
+    tuples in the order of columns.
+    """
+    table = SurveyResult.__table__
+    stmt = select(*[table.c[name] for name in columns]).order_by(SurveyResult.id)
+    if test_name is not None:
+        stmt = stmt.where(SurveyResult.test_id == select(Test.id).where(Test.name == test_name).scalar_subquery())
+    if since is not None:
+        stmt = stmt.where(SurveyResult.timestamp >= since)
+    with db.read_engine.connect() as conn:
+        result = conn.execution_options(stream_results=True).execute(stmt)
+        for partition in result.partitions(chunk_size):
+            yield [tuple(row) for row in partition]
+
+
+def write_csv(output: BinaryIO, batches, columns: Sequence[str] = EXPORT_COLUMNS, compress: bool = False) -> int:
+    """Write batches as UTF-8 CSV (optionally gzip-compressed), return the row count"""
+    stream = gzip.GzipFile(fileobj=output, mode='wb') if compress else output
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    try:
+        writer = csv.writer(text)
+        writer.writerow(columns)
+        count = 0
+        for batch in batches:
+            writer.writerows(batch)
+            count += len(batch)
+        text.flush()
+        return count
+    finally:
+        # Отсоединяем обёртку, чтобы не закрыть файл вызывающего кода
+        text.detach()
+        if compress:
+            stream.close()
+
+
+def _arrow_schema(columns: Sequence[str]):
+    import pyarrow as pa
+    types = {
+        'id': pa.int64(),
+        'test_id': pa.int64(),
+        'question_id': pa.int64(),
+        'candidate_id': pa.int64(),
+        'score': pa.int64(),
+        'llm_score': pa.float64(),
+        'human_score': pa.float64(),
+        'timestamp': pa.timestamp('us'),
+    }
+    return pa.schema([(name, types.get(name, pa.string())) for name in columns])
+
+
+def write_parquet(output: Union[str, BinaryIO], batches, columns: Sequence[str] = EXPORT_COLUMNS) -> int:
+    """Write batches as Arrow record batches into a Parquet file, return the row count"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+    schema = _arrow_schema(columns)
+    count = 0
+    with pq.ParquetWriter(output, schema) as writer:
+        for batch in batches:
+            arrays = [pa.array(list(values), type=field.type) for values, field in zip(zip(*batch), schema)]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            count += len(batch)
+    return count
+
+
+def export_results(db: DBHandler, output: BinaryIO, fmt: str = 'csv', test_name: Optional[str] = None,
+                   since: Optional[datetime] = None, columns: Sequence[str] = EXPORT_COLUMNS,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """Stream survey results into a binary file object, return the number of rows written"""
+    batches = iter_result_batches(db, test_name, since, columns, chunk_size)
+    if fmt == 'csv':
+        return write_csv(output, batches, columns)
+    if fmt == 'csv.gz':
+        return write_csv(output, batches, columns, compress=True)
+    if fmt == 'parquet':
+        return write_parquet(output, batches, columns)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """CLI entry point for bulk dumps, e.g. nightly:
+
+        python -m src.database.export --format parquet --output results.parquet
+    """
+    parser = argparse.ArgumentParser(description="Export survey results")
+    parser.add_argument('--output', '-o', required=True, help="Output file path")
+    parser.add_argument('--format', '-f', choices=EXPORT_FORMATS, default='csv')
+    parser.add_argument('--test', help="Only export results of this test")
+    parser.add_argument('--since', type=datetime.fromisoformat, help="Only results since this ISO date")
+    parser.add_argument('--db-url', help="Database URL (defaults to DATABASE_URL)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    db = DBHandler(args.db_url)
+    with open(args.output, 'wb') as output:
+        count = export_results(db, output, args.format, args.test, args.since, chunk_size=args.chunk_size)
+    print(f"Exported {count} survey results to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
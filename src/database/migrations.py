@@ -0,0 +1,157 @@
+"""Schema migrations for existing databases"""
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from .models import Question, SurveyResult
+from .rollups import rebuild_rollups
+
+SCHEMA_VERSION_TABLE = 'schema_version'
+
+
+def _column_names(conn, table: str):
+    return {column['name'] for column in inspect(conn).get_columns(table)}
+
+
+def _create_indexes(conn, table):
+    """Create the model's indexes on a table, skipping those over columns a later migration adds"""
+    columns = _column_names(conn, table.name)
+    for index in table.indexes:
+        if all(column.name in columns for column in index.columns):
+            index.create(conn, checkfirst=True)
+
+
+def _add_evaluation_status(conn):
+    """v2: survey_results.status for the background evaluation queue"""
+    if 'status' not in _column_names(conn, 'survey_results'):
+        conn.execute(text("ALTER TABLE survey_results ADD COLUMN status VARCHAR(20) DEFAULT 'done'"))
+
+
+def _normalize_survey_results(conn):
+    """v3: test/question/candidate foreign keys on survey_results plus indexes.
+
+    Existing rows are backfilled by matching the stored test name, question
+    text and candidate name; rows whose test or question no longer exists
+    keep NULL references. Foreign key constraints are only declared on
+    freshly created tables (SQLite cannot add them to existing ones).
+    """
+    columns = _column_names(conn, 'survey_results')
+    for column in ('test_id', 'question_id', 'candidate_id'):
+        if column not in columns:
+            conn.execute(text(f"ALTER TABLE survey_results ADD COLUMN {column} INTEGER"))
+
+    conn.execute(text("""
+        INSERT INTO candidates (first_name, last_name)
+        SELECT DISTINCT COALESCE(r.first_name, ''), COALESCE(r.last_name, '')
+        FROM survey_results r
+        WHERE NOT EXISTS (
+            SELECT 1 FROM candidates c
+            WHERE c.first_name = COALESCE(r.first_name, '') AND c.last_name = COALESCE(r.last_name, '')
+        )
+    """))
+    conn.execute(text("""
+        UPDATE survey_results SET test_id = (
+            SELECT t.id FROM tests t WHERE t.name = survey_results.test_name
+        ) WHERE test_id IS NULL
+    """))
+    conn.execute(text("""
+        UPDATE survey_results SET question_id = (
+            SELECT MIN(q.id) FROM questions q
+            WHERE q.test_id = survey_results.test_id AND q.text = survey_results.question
+        ) WHERE question_id IS NULL AND test_id IS NOT NULL
+    """))
+    conn.execute(text("""
+        UPDATE survey_results SET candidate_id = (
+            SELECT c.id FROM candidates c
+            WHERE c.first_name = COALESCE(survey_results.first_name, '')
+              AND c.last_name = COALESCE(survey_results.last_name, '')
+        ) WHERE candidate_id IS NULL
+    """))
+
+    _create_indexes(conn, SurveyResult.__table__)
+    _create_indexes(conn, Question.__table__)
+
+
+def _backfill_score_rollups(conn):
+    """v4: fill score_rollups (created by create_all) from existing answers"""
+    rebuild_rollups(conn)
+
+
+def _add_grading_claims(conn):
+    """v5: claim columns for the grading queue; human grades move to human_score.
+
+    The old grading tab wrote human grades into score. Rows whose score differs
+    from llm_score were graded that way and get human_score = score. Grades that
+    matched the LLM score cannot be told apart from ungraded rows and stay NULL.
+    """
+    columns = _column_names(conn, 'survey_results')
+    if 'claimed_by' not in columns:
+        conn.execute(text("ALTER TABLE survey_results ADD COLUMN claimed_by VARCHAR(100)"))
+    if 'claimed_until' not in columns:
+        conn.execute(text("ALTER TABLE survey_results ADD COLUMN claimed_until DATETIME"))
+    moved = conn.execute(text("""
+        UPDATE survey_results SET human_score = score
+        WHERE human_score IS NULL AND llm_score IS NOT NULL AND score != llm_score
+          AND score BETWEEN 1 AND 5
+    """)).rowcount
+    _create_indexes(conn, SurveyResult.__table__)
+    if moved:
+        rebuild_rollups(conn)
+
+
+def _add_catalog_version(conn):
+    """v6: the single catalog_version row used by catalog caches"""
+    if conn.execute(text("SELECT COUNT(*) FROM catalog_version")).scalar() == 0:
+        conn.execute(text("INSERT INTO catalog_version (id, version) VALUES (1, 0)"))
+
+
+def _add_interview_sessions(conn):
+    """v7: survey_results.interview_id linking answers to persisted interviews"""
+    if 'interview_id' not in _column_names(conn, 'survey_results'):
+        conn.execute(text("ALTER TABLE survey_results ADD COLUMN interview_id INTEGER"))
+    _create_indexes(conn, SurveyResult.__table__)
+
+
+# (версия, функция миграции) в порядке применения
+MIGRATIONS = [
+    (2, _add_evaluation_status),
+    (3, _normalize_survey_results),
+    (4, _backfill_score_rollups),
+    (5, _add_grading_claims),
+    (6, _add_catalog_version),
+    (7, _add_interview_sessions),
+]
+
+CURRENT_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn) -> int:
+    """Return the stored schema version, 1 for databases created before versioning"""
+    if not inspect(conn).has_table(SCHEMA_VERSION_TABLE):
+        return 1
+    version = conn.execute(text(f"SELECT version FROM {SCHEMA_VERSION_TABLE}")).scalar()
+    return version or 1
+
+
+def migrate(engine: Engine) -> int:
+    """Bring an existing database up to CURRENT_VERSION.
+
+    Must run after Base.metadata.create_all(), so new tables already exist and
+    migrations only have to patch tables created by older versions.
+    Every migration is idempotent, which makes fresh databases a no-op.
+    """
+    with engine.begin() as conn:
+        return migrate_connection(conn)
+
+
+def migrate_connection(conn) -> int:
+    """migrate() inside an open transaction, e.g. via AsyncConnection.run_sync()"""
+    if not inspect(conn).has_table(SCHEMA_VERSION_TABLE):
+        conn.execute(text(f"CREATE TABLE {SCHEMA_VERSION_TABLE} (version INTEGER NOT NULL)"))
+        conn.execute(text(f"INSERT INTO {SCHEMA_VERSION_TABLE} (version) VALUES (1)"))
+    version = get_schema_version(conn)
+    for target, migration in MIGRATIONS:
+        if version < target:
+            migration(conn)
+            conn.execute(text(f"UPDATE {SCHEMA_VERSION_TABLE} SET version = :v"), {"v": target})
+            print(f"Migrated database schema to version {target}")
+            version = target
+    return version
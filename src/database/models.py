@@ -1,13 +1,27 @@
 """SQLAlchemy Models"""
-from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, DateTime
+from sqlalchemy import (
+    Column, Integer, BigInteger, String, Text, Float, ForeignKey, Date, DateTime, Index, UniqueConstraint
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
 Base = declarative_base()
 
+# Статусы фоновой оценки ответа
+EVALUATION_PENDING = 'pending'
+EVALUATION_DONE = 'done'
+EVALUATION_FAILED = 'failed'
+
+# Статусы интервью
+INTERVIEW_ACTIVE = 'active'
+INTERVIEW_FINISHED = 'finished'
+
 class Test(Base):
     __tablename__ = 'tests'
+    # SQLite без AUTOINCREMENT отдаёт id удалённой строки следующей, и к новому тесту
+    # приклеились бы ответы и агрегаты удалённого
+    __table_args__ = {'sqlite_autoincrement': True}
     
     id = Column(Integer, primary_key=True)
     name = Column(String, unique=True, nullable=False)
@@ -15,16 +29,63 @@ class Test(Base):
 
 class Question(Base):
     __tablename__ = 'questions'
+    __table_args__ = {'sqlite_autoincrement': True}
     
     id = Column(Integer, primary_key=True)
-    test_id = Column(Integer, ForeignKey('tests.id'))
+    test_id = Column(Integer, ForeignKey('tests.id'), index=True)
     text = Column(String, nullable=False)
     test = relationship("Test", back_populates="questions")
 
+class Candidate(Base):
+    __tablename__ = 'candidates'
+    __table_args__ = (
+        UniqueConstraint('first_name', 'last_name', name='uq_candidates_name'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    first_name = Column(String(50), nullable=False, default='')
+    last_name = Column(String(50), nullable=False, default='')
+
+class InterviewRecord(Base):
+    """Persisted interview: the question snapshot and the candidate's position in it.
+
+    Any app process can resume an interview by its token; answers point back
+    to it via survey_results.interview_id.
+    """
+    __tablename__ = 'interview_sessions'
+
+    id = Column(Integer, primary_key=True)
+    token = Column(String(32), nullable=False, unique=True)  # Непредсказуемый ключ для URL
+    test_id = Column(Integer, ForeignKey('tests.id', ondelete='SET NULL'))
+    candidate_id = Column(Integer, ForeignKey('candidates.id', ondelete='SET NULL'))
+    test_name = Column(String, nullable=False)
+    first_name = Column(String(50))
+    last_name = Column(String(50))
+    question_ids = Column(Text, nullable=False)  # JSON-список id вопросов снимка
+    questions = Column(Text, nullable=False)  # JSON-список текстов вопросов снимка
+    mode = Column(String(20))
+    seed = Column(BigInteger)
+    current = Column(Integer, nullable=False, default=0)  # Индекс текущего вопроса
+    status = Column(String(20), nullable=False, default=INTERVIEW_ACTIVE)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
 class SurveyResult(Base):
     __tablename__ = 'survey_results'
+    __table_args__ = (
+        Index('ix_survey_results_test_timestamp', 'test_id', 'timestamp'),
+        Index('ix_survey_results_question', 'question_id'),
+        Index('ix_survey_results_candidate', 'candidate_id'),
+        Index('ix_survey_results_grading', 'test_id', 'human_score'),
+        Index('ix_survey_results_interview', 'interview_id'),
+    )
 
     id = Column(Integer, primary_key=True)
+    # Ссылки на нормализованные таблицы; test_name и question хранят текст на момент ответа
+    test_id = Column(Integer, ForeignKey('tests.id', ondelete='SET NULL'))
+    question_id = Column(Integer, ForeignKey('questions.id', ondelete='SET NULL'))
+    candidate_id = Column(Integer, ForeignKey('candidates.id', ondelete='SET NULL'))
+    interview_id = Column(Integer, ForeignKey('interview_sessions.id', ondelete='SET NULL'))
     first_name = Column(String(50))
     last_name = Column(String(50))
     test_name = Column(String, nullable=False)
@@ -35,3 +96,51 @@ class SurveyResult(Base):
     timestamp = Column(DateTime, default=datetime.utcnow)
     llm_score = Column(Float)  # Оценка от LLM
     human_score = Column(Float)  # Оценка от человека
+    status = Column(String(20), default=EVALUATION_DONE)  # Статус фоновой оценки LLM
+    # Кто из проверяющих взял ответ на оценку и до какого времени (UTC)
+    claimed_by = Column(String(100))
+    claimed_until = Column(DateTime)
+
+class CatalogVersion(Base):
+    """Single-row counter bumped by every change of tests or questions.
+
+    Lets in-process catalog caches of all app replicas notice changes made
+    by other processes.
+    """
+    __tablename__ = 'catalog_version'
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+# Оценщики, для которых ведутся агрегаты
+RATER_LLM = 'llm'
+RATER_HUMAN = 'human'
+
+class ScoreRollup(Base):
+    """Running sufficient statistics of one rater's scores per (test, question, day).
+
+    Maintained by DBHandler on every insert and re-score, see src.database.rollups.
+    Unlinked tests/questions are stored with id 0 so the key never contains NULL.
+    """
+    __tablename__ = 'score_rollups'
+    __table_args__ = (
+        UniqueConstraint('test_id', 'question_id', 'question', 'day', 'rater', name='uq_score_rollups_key'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    test_id = Column(Integer, nullable=False, default=0)
+    question_id = Column(Integer, nullable=False, default=0)
+    question = Column(String, nullable=False)
+    day = Column(Date, nullable=False)
+    rater = Column(String(10), nullable=False)
+    answers = Column(Integer, nullable=False, default=0)  # Все ответы группы, включая неоценённые
+    n = Column(Integer, nullable=False, default=0)  # Ответы с оценкой этого оценщика
+    s1 = Column(Float, nullable=False, default=0.0)  # Σx
+    s2 = Column(Float, nullable=False, default=0.0)  # Σx²
+    s3 = Column(Float, nullable=False, default=0.0)  # Σx³
+    s4 = Column(Float, nullable=False, default=0.0)  # Σx⁴
+    h1 = Column(Integer, nullable=False, default=0)  # Количество оценок 1..5
+    h2 = Column(Integer, nullable=False, default=0)
+    h3 = Column(Integer, nullable=False, default=0)
+    h4 = Column(Integer, nullable=False, default=0)
+    h5 = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,35 @@
+"""Counting the SQL statements a block of code sends to the database"""
+from typing import List
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryCounter:
+    """Collects the statements the given engines execute inside a with block.
+
+        with QueryCounter(db.engine) as queries:
+            manager.update_question('Python', 'Старый', 'Новый')
+        assert queries.count <= 2
+
+    executemany counts as one statement; BEGIN/COMMIT are not counted.
+    """
+
+    def __init__(self, *engines: Engine):
+        self.engines = engines
+        self.statements: List[str] = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self) -> 'QueryCounter':
+        for engine in self.engines:
+            event.listen(engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        for engine in self.engines:
+            event.remove(engine, 'before_cursor_execute', self._record)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
@@ -0,0 +1,163 @@
+"""Incremental maintenance of the score_rollups table"""
+import argparse
+from datetime import date
+from typing import List, Optional
+from sqlalchemy import select, func, case, cast, delete, insert, literal, Date
+from sqlalchemy.orm import Session
+from .models import ScoreRollup, SurveyResult, RATER_LLM, RATER_HUMAN
+
+RATER_COLUMNS = {
+    RATER_LLM: SurveyResult.llm_score,
+    RATER_HUMAN: SurveyResult.human_score,
+}
+
+SUM_COLUMNS = ('s1', 's2', 's3', 's4')
+HIST_COLUMNS = ('h1', 'h2', 'h3', 'h4', 'h5')
+COUNTER_COLUMNS = ('answers', 'n') + SUM_COLUMNS + HIST_COLUMNS
+KEY_COLUMNS = ('test_id', 'question_id', 'question', 'day', 'rater')
+
+# День для старых ответов без timestamp: попадают только в статистику за всё время
+UNKNOWN_DAY = date(1970, 1, 1)
+
+
+def _rollup_key(result: SurveyResult, rater: str) -> dict:
+    return {
+        'test_id': result.test_id or 0,
+        'question_id': result.question_id or 0,
+        'question': result.question,
+        'day': result.timestamp.date() if result.timestamp else UNKNOWN_DAY,
+        'rater': rater,
+    }
+
+
+def _score_delta(score: Optional[float], sign: int, delta: dict):
+    if score is None:
+        return
+    delta['n'] += sign
+    for power, column in enumerate(SUM_COLUMNS, start=1):
+        delta[column] += sign * float(score) ** power
+    if float(score).is_integer() and 1 <= score <= 5:
+        delta[HIST_COLUMNS[int(score) - 1]] += sign
+
+
+def _upsert(session: Session, key: dict, delta: dict):
+    """Add delta to the rollup row of key, creating the row if needed"""
+    dialect = session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        table = ScoreRollup.__table__
+        stmt = dialect_insert(table).values(**key, **delta)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(KEY_COLUMNS),
+            set_={column: table.c[column] + stmt.excluded[column] for column in COUNTER_COLUMNS}
+        )
+        session.execute(stmt)
+        return
+    rollup = session.query(ScoreRollup).filter_by(**key).with_for_update().first()
+    if rollup is None:
+        session.add(ScoreRollup(**key, **delta))
+        session.flush()
+    else:
+        for column, value in delta.items():
+            setattr(rollup, column, getattr(rollup, column) + value)
+
+
+def update_rollup(session: Session, result: SurveyResult, rater: str, old_score: Optional[float] = None,
+                  new_score: Optional[float] = None, answers: int = 0):
+    """Move one answer's contribution to the rater's rollup from old_score to new_score.
+
+    Runs inside the caller's session, so the rollup commits or rolls back
+    together with the change of the answer itself.
+    """
+    delta = {column: 0 for column in COUNTER_COLUMNS}
+    delta['answers'] = answers
+    _score_delta(old_score, -1, delta)
+    _score_delta(new_score, 1, delta)
+    if any(delta.values()):
+        _upsert(session, _rollup_key(result, rater), delta)
+
+
+def add_result_to_rollups(session: Session, result: SurveyResult):
+    """Count a newly inserted answer; result must already be linked and timestamped"""
+    update_rollup(session, result, RATER_LLM, new_score=result.llm_score, answers=1)
+    update_rollup(session, result, RATER_HUMAN, new_score=result.human_score, answers=1)
+
+
+def unlink_rollups(session: Session, test_id: Optional[int] = None, question_id: Optional[int] = None):
+    """Move the rollups of a deleted test or question under id 0, as its answers are unlinked.
+
+    Counters are merged into rows that already exist under the new key, so
+    the rollups keep matching survey_results without a rebuild.
+    """
+    table = ScoreRollup.__table__
+    if test_id is not None:
+        where = table.c.test_id == test_id
+    else:
+        where = table.c.question_id == question_id
+    rows = session.execute(select(table).where(where)).mappings().all()
+    session.execute(delete(table).where(where))
+    for row in rows:
+        key = {column: row[column] for column in KEY_COLUMNS}
+        key['question_id'] = 0
+        if test_id is not None:
+            key['test_id'] = 0
+        _upsert(session, key, {column: row[column] for column in COUNTER_COLUMNS})
+
+
+def _day_expression(dialect: str):
+    # CAST(... AS DATE) в SQLite превращает строку даты в число
+    if dialect == 'sqlite':
+        day = func.date(SurveyResult.timestamp)
+    else:
+        day = cast(SurveyResult.timestamp, Date)
+    return func.coalesce(day, UNKNOWN_DAY)
+
+
+def rebuild_rollups(conn) -> int:
+    """Recompute score_rollups from survey_results, return the number of rollup rows.
+
+    Used for backfill and to repair drift, e.g. after rows were edited by hand.
+    Legacy answers without a timestamp are counted under UNKNOWN_DAY.
+    """
+    day = _day_expression(conn.dialect.name)
+    conn.execute(delete(ScoreRollup))
+    for rater, column in RATER_COLUMNS.items():
+        value = func.coalesce(column, 0.0)
+        sums = [func.coalesce(func.sum(value), 0.0), func.coalesce(func.sum(value * value), 0.0),
+                func.coalesce(func.sum(value * value * value), 0.0),
+                func.coalesce(func.sum(value * value * value * value), 0.0)]
+        hist = [func.coalesce(func.sum(case((column == level, 1), else_=0)), 0) for level in range(1, 6)]
+        test_id = func.coalesce(SurveyResult.test_id, 0)
+        question_id = func.coalesce(SurveyResult.question_id, 0)
+        source = (
+            select(test_id, question_id, SurveyResult.question, day, literal(rater),
+                   func.count(SurveyResult.id), func.count(column), *sums, *hist)
+            .group_by(test_id, question_id, SurveyResult.question, day)
+        )
+        conn.execute(insert(ScoreRollup).from_select(list(KEY_COLUMNS + COUNTER_COLUMNS), source))
+    return conn.execute(select(func.count(ScoreRollup.id))).scalar()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """CLI for backfilling rollups:
+
+        python -m src.database.rollups --db-url sqlite:///interview.db
+    """
+    from .db_handler import DBHandler
+
+    parser = argparse.ArgumentParser(description="Rebuild the score_rollups table")
+    parser.add_argument('--db-url', help="Database URL (defaults to DATABASE_URL)")
+    args = parser.parse_args(argv)
+
+    db = DBHandler(args.db_url)
+    with db.engine.begin() as conn:
+        count = rebuild_rollups(conn)
+    print(f"Rebuilt {count} score rollup rows")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
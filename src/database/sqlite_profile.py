@@ -0,0 +1,42 @@
+"""SQLite performance profile applied to every new connection"""
+import os
+from typing import Any, Dict, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+
+# Значения по умолчанию, каждое можно переопределить переменной окружения SQLITE_<PRAGMA>
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',  # Читатели не блокируют писателя и наоборот
+    'synchronous': 'NORMAL',  # В WAL fsync только на checkpoint; коммит не теряет целостность
+    'busy_timeout': 5000,  # мс ожидания блокировки вместо немедленного "database is locked"
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,  # Отрицательное значение - размер в КиБ (64 МиБ)
+    'temp_store': 'MEMORY',
+}
+
+
+def is_sqlite_file(url) -> bool:
+    """True for SQLite databases stored in a file (not :memory:)"""
+    url = make_url(url)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def sqlite_pragmas() -> Dict[str, Any]:
+    """SQLITE_PRAGMAS with environment overrides, e.g. SQLITE_BUSY_TIMEOUT=10000"""
+    return {name: os.getenv(f"SQLITE_{name.upper()}", value) for name, value in SQLITE_PRAGMAS.items()}
+
+
+def apply_sqlite_profile(engine: Engine, pragmas: Optional[Dict[str, Any]] = None):
+    """Run the PRAGMAs on every connection the engine opens; no-op for other databases"""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = sqlite_pragmas() if pragmas is None else pragmas
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
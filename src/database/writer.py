@@ -0,0 +1,130 @@
+"""Single writer thread that group-commits inserts coming from many sessions"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+
+# Гарантии записи, выбираются при каждом вызове
+DURABILITY_IMMEDIATE = 'immediate'  # Вызов ждёт коммита пакета со своей записью
+DURABILITY_BATCHED = 'batched'  # Вызов возвращается сразу, запись уходит со следующим пакетом (теряется при kill -9)
+DURABILITY_MODES = (DURABILITY_IMMEDIATE, DURABILITY_BATCHED)
+
+Write = Callable[[Session], Any]
+
+
+class GroupCommitWriter:
+    """Runs queued writes on one thread and commits them in batches.
+
+    Each write is a function of a session that adds/updates rows and returns
+    a plain value (e.g. a flushed id) which becomes the result of its future
+    once the batch is committed. With SQLite this turns many concurrent
+    commits into one transaction and one fsync, and the only writer never
+    waits for the database lock held by another writer of this process.
+
+    If a batch fails it is rolled back and its writes are retried one by one,
+    so a bad write only fails its own future.
+
+    The thread is a daemon: call stop() (DBHandler registers it with atexit)
+    to commit what is still queued. Batched writes are only as durable as a
+    clean shutdown; a killed process loses them.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], max_batch: int = 256, max_delay: float = 0.01):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay  # Сколько пакет из одних batched-записей ждёт попутчиков
+        self._queue: "queue.Queue[Optional[Tuple[Write, Future, str]]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, write: Write, durability: str = DURABILITY_IMMEDIATE) -> Future:
+        """Queue a write; the future resolves after its batch is committed"""
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability: {durability}")
+        future: Future = Future()
+        self._ensure_started()
+        self._queue.put((write, future, durability))
+        return future
+
+    def write(self, write: Write, durability: str = DURABILITY_IMMEDIATE, timeout: Optional[float] = None) -> Any:
+        """Queue a write; immediate waits for the commit and returns the write's result, batched returns None"""
+        future = self.submit(write, durability)
+        if durability == DURABILITY_BATCHED:
+            return None
+        return future.result(timeout)
+
+    def flush(self, timeout: Optional[float] = None):
+        """Wait until everything queued so far is committed"""
+        self.write(lambda session: None, DURABILITY_IMMEDIATE, timeout)
+
+    def stop(self, timeout: Optional[float] = None):
+        """Commit what is queued and stop the thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def _next_batch(self) -> Tuple[List[Tuple[Write, Future, str]], bool]:
+        """Block for one write, then take what is already queued (up to max_batch)"""
+        item = self._queue.get()
+        if item is None:
+            return [], True
+        batch = [item]
+        urgent = item[2] == DURABILITY_IMMEDIATE
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                # Немедленные записи не задерживаются, только пакет из отложенных ждёт max_delay
+                if urgent:
+                    item = self._queue.get_nowait()
+                else:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+            urgent = urgent or item[2] == DURABILITY_IMMEDIATE
+        return batch, False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            if batch:
+                try:
+                    self._commit(batch)
+                except Exception as e:
+                    print(f"Database writer error: {str(e)}")
+                    for _, future, _ in batch:
+                        if not future.done():
+                            future.set_exception(e)
+
+    def _commit(self, batch: List[Tuple[Write, Future, str]]):
+        session = self.session_factory()
+        try:
+            results = [write(session) for write, _, _ in batch]
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            if len(batch) > 1:
+                print(f"Group commit of {len(batch)} writes failed, retrying one by one: {str(e)}")
+                for item in batch:
+                    self._commit([item])
+            else:
+                print(f"Error in queued write: {str(e)}")
+                batch[0][1].set_exception(e)
+            return
+        finally:
+            session.close()
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
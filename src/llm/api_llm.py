@@ -1,18 +1,23 @@
-import requests
 from typing import Optional
 import json
+from src.utils.http_transport import HTTPTransport, AsyncHTTPTransport, get_transport, get_async_transport
 
 class API_LLM:
-    def __init__(self, endpoint: str, api_key: str):
+    def __init__(self, endpoint: str, api_key: str, transport: Optional[HTTPTransport] = None,
+                 async_transport: Optional[AsyncHTTPTransport] = None):
         """
         Initialize the API-based Language Model service.
         
         Args:
             endpoint (str): The API endpoint URL
             api_key (str): API key for authentication
+            transport (HTTPTransport): Pooled HTTP transport, shared default if None
+            async_transport (AsyncHTTPTransport): Pooled async transport, shared default if None
         """
         self.endpoint = endpoint
         self.api_key = api_key
+        self.transport = transport or get_transport()
+        self.async_transport = async_transport or get_async_transport()
         self.headers = {
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
@@ -35,7 +40,7 @@ class API_LLM:
                 "max_tokens": max_tokens
             }
             
-            response = requests.post(
+            response = self.transport.post(
                 self.endpoint,
                 headers=self.headers,
                 json=payload
@@ -50,4 +55,38 @@ class API_LLM:
                 
         except Exception as e:
             print(f"Error during generation: {str(e)}")
-            return None 
\ No newline at end of file
+            return None
+
+    async def agenerate_answer(self, prompt: str, max_tokens: int = 1000) -> Optional[str]:
+        """
+        Asynchronously generate a response using the language model API.
+        
+        Args:
+            prompt (str): The input prompt
+            max_tokens (int): Maximum number of tokens in the response
+            
+        Returns:
+            Optional[str]: Generated response or None if generation fails
+        """
+        try:
+            payload = {
+                "prompt": prompt,
+                "max_tokens": max_tokens
+            }
+            
+            response = await self.async_transport.post(
+                self.endpoint,
+                headers=self.headers,
+                json=payload
+            )
+            
+            if response.status_code == 200:
+                result = response.json()
+                return result.get('text', '')
+            else:
+                print(f"Error in generation: {response.status_code} - {response.text}")
+                return None
+                
+        except Exception as e:
+            print(f"Error during generation: {str(e)}")
+            return None
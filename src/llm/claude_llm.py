@@ -1,8 +1,10 @@
 """Claude LLM Integration"""
 import os
+from typing import Iterator
 import anthropic
+from src.utils.async_providers import AsyncLLMMixin
 
-class ClaudeLLM:
+class ClaudeLLM(AsyncLLMMixin):
     def __init__(self, api_key: str):
         self.api_key = api_key
         self.client = anthropic.Client(api_key)
@@ -18,3 +20,21 @@ class ClaudeLLM:
             return resp["completion"]
         except Exception as e:
             return f"[Claude Error]: {str(e)}"
+
+    def stream_answer(self, prompt: str) -> Iterator[str]:
+        """Yield new text as it streams; the SDK reports the cumulative completion"""
+        try:
+            stream = self.client.completion_stream(
+                prompt=f"{anthropic.HUMAN_PROMPT} {prompt}{anthropic.AI_PROMPT}",
+                stop_sequences=[anthropic.HUMAN_PROMPT],
+                model="claude-2",
+                max_tokens_to_sample=256
+            )
+            sent = 0
+            for data in stream:
+                completion = data["completion"]
+                if len(completion) > sent:
+                    yield completion[sent:]
+                    sent = len(completion)
+        except Exception as e:
+            yield f"[Claude Error]: {str(e)}"
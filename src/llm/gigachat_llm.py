@@ -1,19 +1,35 @@
 """Gigachat (Sber) LLM Integration (Demo Example)"""
-import requests
+from typing import Optional
+from src.utils.http_transport import HTTPTransport, AsyncHTTPTransport, get_transport, get_async_transport
 
 class GigachatLLM:
-    def __init__(self, api_endpoint: str, api_key: str):
+    def __init__(self, api_endpoint: str, api_key: str, transport: Optional[HTTPTransport] = None,
+                 async_transport: Optional[AsyncHTTPTransport] = None):
         self.api_endpoint = api_endpoint
         self.api_key = api_key
+        self.transport = transport or get_transport()
+        self.async_transport = async_transport or get_async_transport()
+
+    def _request_args(self, prompt: str) -> dict:
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        data = {"prompt": prompt, "max_tokens": 200}
+        return {"json": data, "headers": headers}
 
     def generate_answer(self, prompt: str) -> str:
         try:
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            data = {"prompt": prompt, "max_tokens": 200}
-            resp = requests.post(self.api_endpoint, json=data, headers=headers, timeout=30)
+            resp = self.transport.post(self.api_endpoint, **self._request_args(prompt))
+            resp.raise_for_status()
+            answer = resp.json().get("answer", "")
+            return answer
+        except Exception as e:
+            return f"[Gigachat Error]: {str(e)}"
+
+    async def agenerate_answer(self, prompt: str) -> str:
+        try:
+            resp = await self.async_transport.post(self.api_endpoint, **self._request_args(prompt))
             resp.raise_for_status()
             answer = resp.json().get("answer", "")
             return answer
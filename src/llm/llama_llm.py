@@ -1,10 +1,13 @@
 """Llama LLM Integration via Hugging Face"""
 import os
 from huggingface_hub import hf_hub_download
-from transformers import LlamaTokenizer, LlamaForCausalLM
+from threading import Thread
+from typing import Iterator
+from transformers import LlamaTokenizer, LlamaForCausalLM, TextIteratorStreamer
 import torch
+from src.utils.async_providers import AsyncLLMMixin
 
-class LlamaLLM:
+class LlamaLLM(AsyncLLMMixin):
     def __init__(self, hf_model_id: str = 'decapoda-research/llama-7b-hf', download: bool = True, local_path: str = None, hf_token: str = None):
         self.hf_model_id = hf_model_id
         self.download = download
@@ -37,3 +40,25 @@ class LlamaLLM:
             return answer
         except Exception as e:
             return f"[Llama Error]: {str(e)}"
+
+    def stream_answer(self, prompt: str) -> Iterator[str]:
+        """Yield decoded text while generate() runs in a background thread"""
+        try:
+            inputs = self.tokenizer(prompt, return_tensors="pt")
+            if torch.cuda.is_available():
+                inputs = {k: v.cuda() for k, v in inputs.items()}
+            streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+            generation_kwargs = dict(**inputs, streamer=streamer, max_new_tokens=128, do_sample=True, top_k=50)
+
+            def generate():
+                with torch.no_grad():
+                    self.model.generate(**generation_kwargs)
+
+            thread = Thread(target=generate, daemon=True)
+            thread.start()
+            for text in streamer:
+                if text:
+                    yield text
+            thread.join()
+        except Exception as e:
+            yield f"[Llama Error]: {str(e)}"
@@ -1,4 +1,5 @@
 import os
+from typing import Iterator
 from mistralai import Mistral
 
 class MistralAPILLM:
@@ -10,19 +11,47 @@ class MistralAPILLM:
         self.model = model
         self.client = Mistral(api_key=self.api_key)
 
+    def _messages(self, prompt: str) -> list:
+        return [
+            {
+                "role": "user",
+                "content": prompt,
+            },
+        ]
+
     def generate_answer(self, prompt: str) -> str:
         try:
-            messages = [
-                {
-                    "role": "user",
-                    "content": prompt,
-                },
-            ]
             response = self.client.chat.complete(
                 model=self.model,
-                messages=messages,
+                messages=self._messages(prompt),
+                temperature=0.7
+            )
+            return response.choices[0].message.content
+        except Exception as e:
+            return f"[Mistral API Error]: {str(e)}"
+
+    async def agenerate_answer(self, prompt: str) -> str:
+        try:
+            response = await self.client.chat.complete_async(
+                model=self.model,
+                messages=self._messages(prompt),
                 temperature=0.7
             )
             return response.choices[0].message.content
         except Exception as e:
-            return f"[Mistral API Error]: {str(e)}"
\ No newline at end of file
+            return f"[Mistral API Error]: {str(e)}"
+
+    def stream_answer(self, prompt: str) -> Iterator[str]:
+        """Yield the completion token by token as the API streams it"""
+        try:
+            stream = self.client.chat.stream(
+                model=self.model,
+                messages=self._messages(prompt),
+                temperature=0.7
+            )
+            for event in stream:
+                content = event.data.choices[0].delta.content
+                if content:
+                    yield content
+        except Exception as e:
+            yield f"[Mistral API Error]: {str(e)}"
@@ -1,10 +1,13 @@
 """Mistral LLM Integration (Demo via Hugging Face)"""
 import os
 from huggingface_hub import hf_hub_download
-from transformers import AutoTokenizer, AutoModelForCausalLM
+from threading import Thread
+from typing import Iterator
+from transformers import AutoTokenizer, AutoModelForCausalLM, TextIteratorStreamer
 import torch
+from src.utils.async_providers import AsyncLLMMixin
 
-class MistralLLM:
+class MistralLLM(AsyncLLMMixin):
     def __init__(self, hf_model_id: str, hf_token: str = None, local_path: str = None):
         """
         :param hf_model_id: e.g. 'mistralai/Mistral-7B-v0.1'
@@ -44,3 +47,25 @@ class MistralLLM:
             return answer
         except Exception as e:
             return f"[Mistral Error]: {str(e)}"
+
+    def stream_answer(self, prompt: str) -> Iterator[str]:
+        """Yield decoded text while generate() runs in a background thread"""
+        try:
+            inputs = self.tokenizer(prompt, return_tensors="pt")
+            if torch.cuda.is_available():
+                inputs = {k: v.cuda() for k, v in inputs.items()}
+            streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+            generation_kwargs = dict(**inputs, streamer=streamer, max_new_tokens=128, do_sample=True, top_k=50)
+
+            def generate():
+                with torch.no_grad():
+                    self.model.generate(**generation_kwargs)
+
+            thread = Thread(target=generate, daemon=True)
+            thread.start()
+            for text in streamer:
+                if text:
+                    yield text
+            thread.join()
+        except Exception as e:
+            yield f"[Mistral Error]: {str(e)}"
@@ -1,8 +1,10 @@
 """OpenAI LLM Integration"""
 import os
+from typing import Iterator
 import openai
+from src.utils.async_providers import AsyncLLMMixin
 
-class OpenAILLM:
+class OpenAILLM(AsyncLLMMixin):
     def __init__(self, api_key: str):
         self.api_key = api_key
         openai.api_key = self.api_key
@@ -17,3 +19,19 @@ class OpenAILLM:
             return response.choices[0].message.content
         except Exception as e:
             return f"[OpenAI Error]: {str(e)}"
+
+    def stream_answer(self, prompt: str) -> Iterator[str]:
+        """Yield the completion chunk by chunk (stream=True)"""
+        try:
+            response = openai.ChatCompletion.create(
+                model="gpt-3.5-turbo",
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.7,
+                stream=True
+            )
+            for chunk in response:
+                content = chunk.choices[0].delta.get("content")
+                if content:
+                    yield content
+        except Exception as e:
+            yield f"[OpenAI Error]: {str(e)}"
@@ -2,10 +2,11 @@
 import os
 from yandexcloud import SDK
 from yandexcloud._auth import ServiceAccountCredentials
+from src.utils.async_providers import AsyncLLMMixin
 
 # В реальности у Яндекс нет публичной LLM, поэтому это условный пример
 # Если появится официальное API, нужно обновить код
-class YandexLLM:
+class YandexLLM(AsyncLLMMixin):
     def __init__(self, service_account_json: str):
         # Предполагаем, что service_account_json - путь до файла аутентификации
         try:
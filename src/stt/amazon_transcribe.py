@@ -4,8 +4,9 @@ import uuid
 import time
 import os
 import tempfile
+from src.utils.async_providers import AsyncSTTMixin
 
-class AmazonTranscribeSTT:
+class AmazonTranscribeSTT(AsyncSTTMixin):
     def __init__(self, aws_access_key_id: str, aws_secret_access_key: str, region_name: str = 'us-east-1'):
         self.transcribe = boto3.client(
             'transcribe',
@@ -1,21 +1,27 @@
-import requests
 from typing import Optional
 import json
+import os
+from src.utils.http_transport import HTTPTransport, AsyncHTTPTransport, get_transport, get_async_transport
 
 class API_STT:
-    def __init__(self, endpoint: str, api_key: str):
+    def __init__(self, endpoint: str, api_key: str, transport: Optional[HTTPTransport] = None,
+                 async_transport: Optional[AsyncHTTPTransport] = None):
         """
         Initialize the API-based Speech-to-Text service.
         
         Args:
             endpoint (str): The API endpoint URL
             api_key (str): API key for authentication
+            transport (HTTPTransport): Pooled HTTP transport, shared default if None
+            async_transport (AsyncHTTPTransport): Pooled async transport, shared default if None
         """
         self.endpoint = endpoint
         self.api_key = api_key
+        self.transport = transport or get_transport()
+        self.async_transport = async_transport or get_async_transport()
+        # Content-Type для multipart выставляет requests вместе с boundary
         self.headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
+            "Authorization": f"Bearer {api_key}"
         }
     
     def transcribe(self, audio_file_path: str) -> Optional[str]:
@@ -29,14 +35,46 @@ class API_STT:
             Optional[str]: Transcribed text or None if transcription fails
         """
         try:
+            # Читаем файл целиком, чтобы тело запроса можно было отправить повторно при ретрае
             with open(audio_file_path, 'rb') as audio_file:
-                files = {'file': audio_file}
-                response = requests.post(
-                    self.endpoint,
-                    headers=self.headers,
-                    files=files
-                )
+                audio_data = audio_file.read()
+            files = {'file': (os.path.basename(audio_file_path), audio_data)}
+            response = self.transport.post(
+                self.endpoint,
+                headers=self.headers,
+                files=files
+            )
+            
+            if response.status_code == 200:
+                result = response.json()
+                return result.get('text', '')
+            else:
+                print(f"Error in transcription: {response.status_code} - {response.text}")
+                return None
                 
+        except Exception as e:
+            print(f"Error during transcription: {str(e)}")
+            return None
+
+    async def atranscribe(self, audio_data: bytes, filename: str = "audio.wav") -> Optional[str]:
+        """
+        Asynchronously transcribe in-memory audio to text using the API.
+        
+        Args:
+            audio_data (bytes): Encoded audio (e.g. WAV)
+            filename (str): File name reported in the multipart upload
+            
+        Returns:
+            Optional[str]: Transcribed text or None if transcription fails
+        """
+        try:
+            files = {'file': (filename, audio_data)}
+            response = await self.async_transport.post(
+                self.endpoint,
+                headers=self.headers,
+                files=files
+            )
+            
             if response.status_code == 200:
                 result = response.json()
                 return result.get('text', '')
@@ -46,4 +84,4 @@ class API_STT:
                 
         except Exception as e:
             print(f"Error during transcription: {str(e)}")
-            return None 
\ No newline at end of file
+            return None
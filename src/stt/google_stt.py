@@ -1,8 +1,9 @@
 """Google Cloud Speech-to-Text"""
 import os
 from google.cloud import speech
+from src.utils.async_providers import AsyncSTTMixin
 
-class GoogleSTT:
+class GoogleSTT(AsyncSTTMixin):
     def __init__(self, credentials_json: str):
         os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = credentials_json
         self.client = speech.SpeechClient()
@@ -1,10 +1,14 @@
 """Vosk STT Integration"""
 import vosk
-import tempfile
 import json
 import os
+from src.utils.async_providers import AsyncSTTMixin
+from src.utils.audio_buffer import AudioBuffer
 
-class VoskSTT:
+# Сэмплов в одном куске, который подаётся распознавателю
+CHUNK_FRAMES = 4000
+
+class VoskSTT(AsyncSTTMixin):
     def __init__(self, model_path='models/vosk'):
         """model_path - путь к распакованной модели Vosk"""
         if not os.path.exists(model_path):
@@ -14,28 +18,17 @@ class VoskSTT:
             # Для демонстрации оставим так
         self.model = vosk.Model(model_path)
 
-    def speech_to_text(self, audio_data: bytes) -> str:
-        import wave
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as fp:
-            fp.write(audio_data)
-            temp_wav_path = fp.name
-
+    def speech_to_text(self, audio_data) -> str:
+        """audio_data - AudioBuffer, WAV/PCM16 байты или массив NumPy; PCM подаётся кусками из памяти"""
         rec_text = ""
         try:
-            wf = wave.open(temp_wav_path, "rb")
-            rec = vosk.KaldiRecognizer(self.model, wf.getframerate())
-            data = wf.readframes(4000)
-            while len(data) > 0:
-                if rec.AcceptWaveform(data):
-                    pass
-                data = wf.readframes(4000)
-            final = rec.FinalResult()
-            rec_json = json.loads(final)
+            audio = AudioBuffer.coerce(audio_data)
+            rec = vosk.KaldiRecognizer(self.model, audio.sample_rate)
+            for chunk in audio.pcm16_chunks(CHUNK_FRAMES):
+                # Привязка vosk принимает только bytes, копируется лишь текущий кусок
+                rec.AcceptWaveform(chunk.tobytes())
+            rec_json = json.loads(rec.FinalResult())
             rec_text = rec_json.get("text", "")
-            wf.close()
         except Exception as e:
             rec_text = f"[Vosk Error]: {str(e)}"
-        finally:
-            if os.path.exists(temp_wav_path):
-                os.remove(temp_wav_path)
         return rec_text
@@ -1,26 +1,25 @@
 """OpenAI Whisper Integration"""
 import whisper
-import tempfile
-import os
+from src.utils.async_providers import AsyncSTTMixin
+from src.utils.audio_buffer import AudioBuffer
 
-class WhisperSTT:
+# Whisper работает только с 16 кГц
+WHISPER_SAMPLE_RATE = 16000
+
+class WhisperSTT(AsyncSTTMixin):
     def __init__(self, model_name='tiny'):
         """model_name может быть 'tiny', 'base', 'small', 'medium', 'large'"""
         self.model = whisper.load_model(model_name)
 
-    def speech_to_text(self, audio_data: bytes) -> str:
-        # Сохраняем байты во временный файл
-        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as fp:
-            fp.write(audio_data)
-            temp_wav_path = fp.name
-
+    def speech_to_text(self, audio_data) -> str:
+        """audio_data - AudioBuffer, WAV/PCM16 байты или массив NumPy; в модель уходит float32 без временных файлов"""
         result_text = ""
         try:
-            transcription = self.model.transcribe(temp_wav_path)
+            audio = AudioBuffer.coerce(audio_data).resample(WHISPER_SAMPLE_RATE)
+            if not len(audio):
+                return result_text
+            transcription = self.model.transcribe(audio.to_float32())
             result_text = transcription.get('text', '')
         except Exception as e:
             result_text = f"[Whisper Error]: {str(e)}"
-        finally:
-            if os.path.exists(temp_wav_path):
-                os.remove(temp_wav_path)
         return result_text
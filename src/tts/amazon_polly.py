@@ -1,22 +1,34 @@
 """Amazon Polly Integration"""
 import boto3
+from typing import Optional
 from botocore.exceptions import BotoCoreError, ClientError
+from .audio_cache import AudioCache, get_audio_cache
+from src.utils.async_providers import AsyncTTSMixin
 
-class AmazonPollyTTS:
-    def __init__(self, aws_access_key_id: str, aws_secret_access_key: str, region_name: str = 'us-east-1'):
+class AmazonPollyTTS(AsyncTTSMixin):
+    PROVIDER = 'amazon_polly'
+    VOICE = 'Joanna'
+
+    def __init__(self, aws_access_key_id: str, aws_secret_access_key: str, region_name: str = 'us-east-1',
+                 cache: Optional[AudioCache] = None):
         self.polly = boto3.client(
             'polly',
             aws_access_key_id=aws_access_key_id,
             aws_secret_access_key=aws_secret_access_key,
             region_name=region_name
         )
+        self.cache = cache or get_audio_cache()
+        self.cache_voice = self.VOICE
 
     def text_to_speech(self, text: str) -> bytes:
+        return self.cache.get_or_synthesize(self.PROVIDER, self.cache_voice, text, lambda: self._synthesize(text))
+
+    def _synthesize(self, text: str) -> bytes:
         try:
             response = self.polly.synthesize_speech(
                 Text=text,
                 OutputFormat='mp3',
-                VoiceId='Joanna'
+                VoiceId=self.VOICE
             )
             return response['AudioStream'].read()
         except (BotoCoreError, ClientError) as e:
@@ -1,19 +1,24 @@
-import requests
 from typing import Optional
 import json
 import os
+from src.utils.http_transport import HTTPTransport, AsyncHTTPTransport, get_transport, get_async_transport
 
 class API_TTS:
-    def __init__(self, endpoint: str, api_key: str):
+    def __init__(self, endpoint: str, api_key: str, transport: Optional[HTTPTransport] = None,
+                 async_transport: Optional[AsyncHTTPTransport] = None):
         """
         Initialize the API-based Text-to-Speech service.
         
         Args:
             endpoint (str): The API endpoint URL
             api_key (str): API key for authentication
+            transport (HTTPTransport): Pooled HTTP transport, shared default if None
+            async_transport (AsyncHTTPTransport): Pooled async transport, shared default if None
         """
         self.endpoint = endpoint
         self.api_key = api_key
+        self.transport = transport or get_transport()
+        self.async_transport = async_transport or get_async_transport()
         self.headers = {
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
@@ -37,7 +42,7 @@ class API_TTS:
                 "voice": voice
             }
             
-            response = requests.post(
+            response = self.transport.post(
                 self.endpoint,
                 headers=self.headers,
                 json=payload
@@ -54,4 +59,37 @@ class API_TTS:
                 
         except Exception as e:
             print(f"Error during synthesis: {str(e)}")
-            return False 
\ No newline at end of file
+            return False
+
+    async def asynthesize(self, text: str, voice: str = "default") -> bytes:
+        """
+        Asynchronously synthesize text to speech using the API.
+        
+        Args:
+            text (str): Text to synthesize
+            voice (str): Voice to use for synthesis
+            
+        Returns:
+            bytes: Audio data, empty if synthesis failed
+        """
+        try:
+            payload = {
+                "text": text,
+                "voice": voice
+            }
+            
+            response = await self.async_transport.post(
+                self.endpoint,
+                headers=self.headers,
+                json=payload
+            )
+            
+            if response.status_code == 200:
+                return response.content
+            else:
+                print(f"Error in synthesis: {response.status_code} - {response.text}")
+                return b""
+                
+        except Exception as e:
+            print(f"Error during synthesis: {str(e)}")
+            return b""
@@ -0,0 +1,174 @@
+"""Content-addressed audio cache shared by all TTS adapters"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+
+class AudioCache:
+    """On-disk audio cache keyed by (provider, voice, text) with an in-memory LRU front.
+
+    Files are written atomically (temp file + os.replace), so concurrent
+    sessions and processes never read a half-written file. When the disk
+    size exceeds max_bytes, the least recently used files are removed
+    (hits refresh the file mtime).
+    """
+
+    def __init__(self, cache_dir: str = "./cache/tts", max_bytes: int = 512 * 1024 * 1024,
+                 memory_max_bytes: int = 32 * 1024 * 1024, extension: str = "mp3"):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.memory_max_bytes = memory_max_bytes
+        self.extension = extension
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes: Optional[int] = None
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(provider: str, voice: str, text: str) -> str:
+        payload = json.dumps([provider, voice, text], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.{self.extension}")
+
+    def _remember(self, key: str, data: bytes):
+        """Кладёт аудио в LRU в памяти, вытесняя самые старые записи"""
+        if len(data) > self.memory_max_bytes:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= len(old)
+            self._memory[key] = data
+            self._memory_bytes += len(data)
+            while self._memory_bytes > self.memory_max_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def get(self, provider: str, voice: str, text: str) -> Optional[bytes]:
+        """Cached audio or None; never touches the network"""
+        key = self.make_key(provider, voice, text)
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                return data
+        path = self.path_for(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        self._remember(key, data)
+        return data
+
+    def put(self, provider: str, voice: str, text: str, data: bytes):
+        if not data:
+            return
+        key = self.make_key(provider, voice, text)
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            # Перезапись того же ключа не должна увеличивать счётчик на размер старого файла
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = 0
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error writing audio cache: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self._remember(key, data)
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += len(data) - replaced
+            over_budget = self._disk_bytes is None or self._disk_bytes > self.max_bytes
+        if over_budget:
+            self._evict()
+
+    def invalidate(self, provider: str, voice: str, text: str):
+        """Drop cached audio, e.g. when a question text changes"""
+        key = self.make_key(provider, voice, text)
+        with self._lock:
+            data = self._memory.pop(key, None)
+            if data is not None:
+                self._memory_bytes -= len(data)
+        try:
+            os.remove(self.path_for(key))
+        except OSError:
+            return
+        with self._lock:
+            self._disk_bytes = None
+
+    def _evict(self):
+        """Удаляет самые давно использованные файлы, пока кэш больше max_bytes"""
+        files = []
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if not name.endswith(f".{self.extension}"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        with self._lock:
+            self._disk_bytes = total
+
+    def get_or_synthesize(self, provider: str, voice: str, text: str,
+                          synthesize: Callable[[], bytes]) -> bytes:
+        data = self.get(provider, voice, text)
+        if data is not None:
+            return data
+        data = synthesize()
+        self.put(provider, voice, text, data)
+        return data
+
+    async def aget_or_synthesize(self, provider: str, voice: str, text: str,
+                                 asynthesize: Callable[[], Awaitable[bytes]]) -> bytes:
+        data = self.get(provider, voice, text)
+        if data is not None:
+            return data
+        data = await asynthesize()
+        self.put(provider, voice, text, data)
+        return data
+
+
+_default_cache: Optional[AudioCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_audio_cache() -> AudioCache:
+    """Process-wide cache configured from TTS_CACHE_* environment variables"""
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = AudioCache(
+                    cache_dir=os.getenv("TTS_CACHE_DIR", "./cache/tts"),
+                    max_bytes=int(float(os.getenv("TTS_CACHE_MAX_MB", 512)) * 1024 * 1024),
+                    memory_max_bytes=int(float(os.getenv("TTS_CACHE_MEMORY_MB", 32)) * 1024 * 1024),
+                )
+    return _default_cache
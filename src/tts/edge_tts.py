@@ -1,13 +1,26 @@
 """Edge TTS Integration"""
+import io
 import tempfile
+from typing import Optional
 import edge_tts
+from .audio_cache import AudioCache, get_audio_cache
 
 class EdgeTTS:
-    def __init__(self, voice='ru-RU-DmitryNeural'):
-        """voice - голос для синтеза речи"""
+    PROVIDER = 'edge'
+
+    def __init__(self, voice='ru-RU-DmitryNeural', cache: Optional[AudioCache] = None):
+        """voice - голос для синтеза речи, cache - кэш аудио (общий по умолчанию)"""
         self.voice = voice
+        self.cache = cache or get_audio_cache()
+        self.cache_voice = voice
 
     def text_to_speech(self, text: str) -> bytes:
+        return self.cache.get_or_synthesize(self.PROVIDER, self.cache_voice, text, lambda: self._synthesize(text))
+
+    async def asynthesize(self, text: str) -> bytes:
+        return await self.cache.aget_or_synthesize(self.PROVIDER, self.cache_voice, text, lambda: self._asynthesize(text))
+
+    def _synthesize(self, text: str) -> bytes:
         try:
             with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as fp:
                 output_file = fp.name
@@ -18,3 +31,15 @@ class EdgeTTS:
             return audio_data
         except Exception as e:
             return b""
+
+    async def _asynthesize(self, text: str) -> bytes:
+        """Native async synthesis: edge_tts streams audio chunks without a temp file"""
+        try:
+            communicate = edge_tts.Communicate(text, self.voice)
+            buffer = io.BytesIO()
+            async for chunk in communicate.stream():
+                if chunk["type"] == "audio":
+                    buffer.write(chunk["data"])
+            return buffer.getvalue()
+        except Exception as e:
+            return b""
@@ -1,14 +1,26 @@
 """ElevenLabs TTS Integration"""
 import os
+from typing import Optional
 from elevenlabs import generate, set_api_key
+from .audio_cache import AudioCache, get_audio_cache
+from src.utils.async_providers import AsyncTTSMixin
 
-class ElevenLabsTTS:
-    def __init__(self, api_key: str):
+class ElevenLabsTTS(AsyncTTSMixin):
+    PROVIDER = 'elevenlabs'
+    VOICE = 'Bella'
+    MODEL = 'eleven_monolingual_v1'
+
+    def __init__(self, api_key: str, cache: Optional[AudioCache] = None):
         set_api_key(api_key)
+        self.cache = cache or get_audio_cache()
+        self.cache_voice = f"{self.VOICE}/{self.MODEL}"
 
     def text_to_speech(self, text: str) -> bytes:
+        return self.cache.get_or_synthesize(self.PROVIDER, self.cache_voice, text, lambda: self._synthesize(text))
+
+    def _synthesize(self, text: str) -> bytes:
         try:
-            audio = generate(text=text, voice='Bella', model='eleven_monolingual_v1')
+            audio = generate(text=text, voice=self.VOICE, model=self.MODEL)
             return audio
         except Exception as e:
             return b""
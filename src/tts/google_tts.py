@@ -1,13 +1,24 @@
 """Google Cloud Text-to-Speech Integration"""
 import os
+from typing import Optional
 from google.cloud import texttospeech
+from .audio_cache import AudioCache, get_audio_cache
+from src.utils.async_providers import AsyncTTSMixin
 
-class GoogleTTS:
-    def __init__(self, credentials_json: str):
+class GoogleTTS(AsyncTTSMixin):
+    PROVIDER = 'google'
+    VOICE = 'en-US/NEUTRAL'
+
+    def __init__(self, credentials_json: str, cache: Optional[AudioCache] = None):
         os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = credentials_json
         self.client = texttospeech.TextToSpeechClient()
+        self.cache = cache or get_audio_cache()
+        self.cache_voice = self.VOICE
 
     def text_to_speech(self, text: str) -> bytes:
+        return self.cache.get_or_synthesize(self.PROVIDER, self.cache_voice, text, lambda: self._synthesize(text))
+
+    def _synthesize(self, text: str) -> bytes:
         synthesis_input = texttospeech.SynthesisInput(text=text)
         voice = texttospeech.VoiceSelectionParams(
             language_code="en-US",
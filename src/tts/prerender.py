@@ -0,0 +1,102 @@
+"""Background pre-rendering of question audio into the TTS cache"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+
+@dataclass
+class PrerenderProgress:
+    total: int = 0
+    done: int = 0
+    failed: int = 0
+    running: bool = False
+
+    @property
+    def fraction(self) -> float:
+        return (self.done + self.failed) / self.total if self.total else 1.0
+
+
+class QuestionAudioPrerenderer:
+    """Synthesizes audio for every question of a test into the adapter's AudioCache.
+
+    Works with any cached TTS adapter (PROVIDER, cache_voice, cache attributes).
+    Scheduling a test again while its job is running supersedes the old job,
+    so only the latest question list is rendered.
+    """
+
+    def __init__(self, tts, max_workers: int = 2):
+        self.tts = tts
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prerender")
+        self._lock = threading.Lock()
+        self._progress: Dict[str, PrerenderProgress] = {}
+        self._generations: Dict[str, int] = {}
+
+    def is_rendered(self, text: str) -> bool:
+        return self.tts.cache.get(self.tts.PROVIDER, self.tts.cache_voice, text) is not None
+
+    def invalidate(self, text: str):
+        """Drop audio of a question whose text changed or was deleted"""
+        self.tts.cache.invalidate(self.tts.PROVIDER, self.tts.cache_voice, text)
+
+    def schedule(self, test_name: str, questions: List[str]):
+        """Start rendering all questions of a test in the background"""
+        with self._lock:
+            generation = self._generations.get(test_name, 0) + 1
+            self._generations[test_name] = generation
+            self._progress[test_name] = PrerenderProgress(total=len(questions), running=True)
+        return self._executor.submit(self._render, test_name, list(questions), generation)
+
+    def _render(self, test_name: str, questions: List[str], generation: int):
+        for text in questions:
+            with self._lock:
+                if self._generations.get(test_name) != generation:
+                    return  # Запущен более новый прогон для этого теста
+            try:
+                ok = self.is_rendered(text) or bool(self.tts.text_to_speech(text))
+            except Exception as e:
+                print(f"Error pre-rendering question audio: {str(e)}")
+                ok = False
+            with self._lock:
+                if self._generations.get(test_name) != generation:
+                    return
+                progress = self._progress[test_name]
+                if ok:
+                    progress.done += 1
+                else:
+                    progress.failed += 1
+        with self._lock:
+            if self._generations.get(test_name) == generation:
+                self._progress[test_name].running = False
+
+    def progress(self, test_name: str) -> Optional[PrerenderProgress]:
+        with self._lock:
+            progress = self._progress.get(test_name)
+            return PrerenderProgress(**vars(progress)) if progress else None
+
+    def all_progress(self) -> Dict[str, PrerenderProgress]:
+        with self._lock:
+            return {name: PrerenderProgress(**vars(p)) for name, p in self._progress.items()}
+
+    def forget(self, test_name: str):
+        """Stop tracking a deleted test"""
+        with self._lock:
+            self._generations[test_name] = self._generations.get(test_name, 0) + 1
+            self._progress.pop(test_name, None)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+_prerenderers: Dict[int, QuestionAudioPrerenderer] = {}
+_prerenderers_lock = threading.Lock()
+
+
+def get_prerenderer(tts) -> QuestionAudioPrerenderer:
+    """Process-wide prerenderer for a (shared) TTS adapter instance"""
+    with _prerenderers_lock:
+        prerenderer = _prerenderers.get(id(tts))
+        if prerenderer is None or prerenderer.tts is not tts:
+            prerenderer = QuestionAudioPrerenderer(tts)
+            _prerenderers[id(tts)] = prerenderer
+        return prerenderer
@@ -0,0 +1,197 @@
+"""Paired LLM/human rater agreement computed from confusion matrices"""
+import warnings
+from typing import Callable, Optional, Tuple
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+# Оценки выставляются целыми баллами от 1 до 5
+LEVELS = np.arange(1, 6, dtype=np.float64)
+
+
+def confusion_matrices(groups, llm_scores, human_scores, size: Optional[int] = None) -> np.ndarray:
+    """Count aligned (llm, human) score pairs into a (size, 5, 5) tensor.
+
+    groups are group indices in range(size); pairs where either score is
+    missing or off the 1..5 scale are skipped, so both raters always see the
+    same answers.
+    """
+    groups = np.asarray(groups, dtype=np.int64)
+    llm_scores = np.asarray(llm_scores, dtype=np.float64)
+    human_scores = np.asarray(human_scores, dtype=np.float64)
+    if size is None:
+        size = int(groups.max()) + 1 if groups.size else 0
+    levels = len(LEVELS)
+    valid = np.isin(llm_scores, LEVELS) & np.isin(human_scores, LEVELS)
+    cells = (groups[valid] * levels + (llm_scores[valid].astype(np.int64) - 1)) * levels \
+        + (human_scores[valid].astype(np.int64) - 1)
+    return np.bincount(cells, minlength=size * levels * levels).reshape(size, levels, levels).astype(np.float64)
+
+
+def _margins(confusion: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    return confusion.sum(axis=(-2, -1)), confusion.sum(axis=-1), confusion.sum(axis=-2)
+
+
+def _midranks(counts: np.ndarray) -> np.ndarray:
+    """Average rank of every score level given how many times each level occurs"""
+    return np.cumsum(counts, axis=-1) - counts + (counts + 1) / 2
+
+
+def weighted_kappa(confusion: np.ndarray, weights: str = 'quadratic') -> np.ndarray:
+    """Cohen's weighted kappa (quadratic or linear weights); 1 is perfect agreement"""
+    levels = confusion.shape[-1]
+    distance = np.abs(np.subtract.outer(np.arange(levels), np.arange(levels))) / (levels - 1)
+    agreement = 1 - (distance ** 2 if weights == 'quadratic' else distance)
+    n, rows, cols = _margins(confusion)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        observed = np.einsum('...ij,ij->...', confusion, agreement) / n
+        expected = np.einsum('...i,ij,...j->...', rows, agreement, cols) / n ** 2
+        return (observed - expected) / (1 - expected)
+
+
+def _pair_sums(confusion: np.ndarray):
+    n, rows, cols = _margins(confusion)
+    sx, sy = rows @ LEVELS, cols @ LEVELS
+    sxx, syy = rows @ LEVELS ** 2, cols @ LEVELS ** 2
+    sxy = np.einsum('...ij,i,j->...', confusion, LEVELS, LEVELS)
+    return n, sx, sy, sxx, syy, sxy
+
+
+def icc(confusion: np.ndarray) -> np.ndarray:
+    """ICC(2,1): two-way random effects, absolute agreement, single rater"""
+    n, sx, sy, sxx, syy, sxy = _pair_sums(confusion)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        grand = (sx + sy) ** 2 / (2 * n)
+        ss_total = sxx + syy - grand
+        ss_subjects = (sxx + 2 * sxy + syy) / 2 - grand
+        ss_raters = (sx ** 2 + sy ** 2) / n - grand
+        ms_subjects = ss_subjects / (n - 1)
+        ms_raters = ss_raters
+        ms_error = (ss_total - ss_subjects - ss_raters) / (n - 1)
+        return (ms_subjects - ms_error) / (ms_subjects + ms_error + 2 * (ms_raters - ms_error) / n)
+
+
+def spearman(confusion: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Spearman's rho with midranks for ties and its t-distribution p-value"""
+    n, rows, cols = _margins(confusion)
+    rx, ry = _midranks(rows), _midranks(cols)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = (n + 1) / 2
+        cov = np.einsum('...ij,...i,...j->...', confusion, rx, ry) - n * mean ** 2
+        var_x = (rows * rx ** 2).sum(axis=-1) - n * mean ** 2
+        var_y = (cols * ry ** 2).sum(axis=-1) - n * mean ** 2
+        rho = np.clip(cov / np.sqrt(var_x * var_y), -1, 1)
+        t = rho * np.sqrt((n - 2) / ((1 - rho) * (1 + rho)))
+        p_value = 2 * stats.t.sf(np.abs(t), n - 2)
+    return rho, p_value
+
+
+def kendall_tau(confusion: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Kendall's tau-b and its asymptotic p-value (as scipy.stats.kendalltau with ties)"""
+    n, rows, cols = _margins(confusion)
+    # Сумма клеток строго ниже-правее и строго ниже-левее каждой клетки
+    tail = np.cumsum(np.cumsum(confusion[..., ::-1, ::-1], axis=-2), axis=-1)[..., ::-1, ::-1]
+    below_right = np.zeros_like(confusion)
+    below_right[..., :-1, :-1] = tail[..., 1:, 1:]
+    left = np.cumsum(np.cumsum(confusion[..., ::-1, :], axis=-2), axis=-1)[..., ::-1, :]
+    below_left = np.zeros_like(confusion)
+    below_left[..., :-1, 1:] = left[..., 1:, :-1]
+    concordant_minus_discordant = (confusion * (below_right - below_left)).sum(axis=(-2, -1))
+
+    total = n * (n - 1) / 2
+    x_ties, y_ties = (rows * (rows - 1) / 2).sum(axis=-1), (cols * (cols - 1) / 2).sum(axis=-1)
+    x0, y0 = (rows * (rows - 1) * (rows - 2)).sum(axis=-1), (cols * (cols - 1) * (cols - 2)).sum(axis=-1)
+    x1, y1 = (rows * (rows - 1) * (2 * rows + 5)).sum(axis=-1), (cols * (cols - 1) * (2 * cols + 5)).sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        tau = np.clip(concordant_minus_discordant / np.sqrt((total - x_ties) * (total - y_ties)), -1, 1)
+        m = n * (n - 1)
+        var = (m * (2 * n + 5) - x1 - y1) / 18 + 2 * x_ties * y_ties / m + x0 * y0 / (9 * m * (n - 2))
+        p_value = 2 * stats.norm.sf(np.abs(concordant_minus_discordant / np.sqrt(var)))
+    return tau, p_value
+
+
+def wilcoxon_signed_rank(confusion: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Wilcoxon signed-rank test of llm - human differences.
+
+    Zero differences are dropped and the normal approximation with tie
+    correction is used, matching scipy.stats.wilcoxon for tied data.
+    """
+    levels = confusion.shape[-1]
+    diff = np.subtract.outer(np.arange(levels), np.arange(levels))
+    magnitudes = np.arange(1, levels)
+    positive = np.stack([(confusion * (diff == d)).sum(axis=(-2, -1)) for d in magnitudes], axis=-1)
+    negative = np.stack([(confusion * (diff == -d)).sum(axis=(-2, -1)) for d in magnitudes], axis=-1)
+    ties = positive + negative
+    ranks = _midranks(ties)
+    r_plus = (positive * ranks).sum(axis=-1)
+    r_minus = (negative * ranks).sum(axis=-1)
+    count = ties.sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = count * (count + 1) / 4
+        se = np.sqrt((count * (count + 1) * (2 * count + 1) - (ties ** 3 - ties).sum(axis=-1) / 2) / 24)
+        p_value = 2 * stats.norm.sf(np.abs((r_plus - mean) / se))
+    return np.minimum(r_plus, r_minus), np.minimum(p_value, 1)
+
+
+def mean_difference(confusion: np.ndarray) -> np.ndarray:
+    """Average llm - human score; positive means the LLM grades higher"""
+    n, sx, sy, _, _, _ = _pair_sums(confusion)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (sx - sy) / n
+
+
+def bootstrap_samples(confusion: np.ndarray, n_boot: int = 1000, seed: Optional[int] = None) -> np.ndarray:
+    """Resample every confusion matrix multinomially, shape (n_boot,) + confusion.shape.
+
+    Resampling the 25 cells instead of the pairs makes the cost independent
+    of the number of answers.
+    """
+    rng = np.random.default_rng(seed)
+    flat = confusion.reshape(-1, confusion.shape[-2] * confusion.shape[-1])
+    n = flat.sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        probabilities = np.nan_to_num(flat / n[:, None])
+    samples = rng.multinomial(n.astype(np.int64), probabilities, size=(n_boot, len(flat)))
+    return samples.reshape((n_boot,) + confusion.shape).astype(np.float64)
+
+
+def bootstrap_ci(samples: np.ndarray, metric: Callable[[np.ndarray], np.ndarray],
+                 confidence: float = 0.95) -> Tuple[np.ndarray, np.ndarray]:
+    """Percentile confidence interval of a metric over bootstrap_samples()"""
+    values = metric(samples)
+    alpha = (1 - confidence) / 2
+    with warnings.catch_warnings():
+        # Пустые группы дают только NaN, для них интервал тоже NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        low, high = np.nanquantile(values, [alpha, 1 - alpha], axis=0)
+    return low, high
+
+
+def agreement_frame(confusion: np.ndarray, group_ids=None, n_boot: int = 1000,
+                    seed: Optional[int] = 0) -> pd.DataFrame:
+    """All agreement metrics for every group of a (k, 5, 5) tensor as one numeric frame"""
+    samples = bootstrap_samples(confusion, n_boot, seed)
+    kappa = weighted_kappa(confusion)
+    kappa_low, kappa_high = bootstrap_ci(samples, weighted_kappa)
+    icc_value = icc(confusion)
+    icc_low, icc_high = bootstrap_ci(samples, icc)
+    rho, rho_p = spearman(confusion)
+    tau, tau_p = kendall_tau(confusion)
+    wilcoxon, wilcoxon_p = wilcoxon_signed_rank(confusion)
+    return pd.DataFrame({
+        'group': np.arange(len(confusion)) if group_ids is None else np.asarray(group_ids),
+        'pairs': confusion.sum(axis=(-2, -1)).astype(np.int64),
+        'mean_diff': mean_difference(confusion),
+        'kappa': kappa,
+        'kappa_low': kappa_low,
+        'kappa_high': kappa_high,
+        'icc': icc_value,
+        'icc_low': icc_low,
+        'icc_high': icc_high,
+        'spearman': rho,
+        'spearman_p': rho_p,
+        'kendall': tau,
+        'kendall_p': tau_p,
+        'wilcoxon': wilcoxon,
+        'wilcoxon_p': wilcoxon_p,
+    })
@@ -0,0 +1,70 @@
+"""Asyncio interface for LLM, STT and TTS providers"""
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, Protocol, runtime_checkable
+
+
+@runtime_checkable
+class AsyncLLMProvider(Protocol):
+    async def agenerate_answer(self, prompt: str) -> str: ...
+
+
+@runtime_checkable
+class AsyncSTTProvider(Protocol):
+    async def atranscribe(self, audio_data: bytes) -> str: ...
+
+
+@runtime_checkable
+class AsyncTTSProvider(Protocol):
+    async def asynthesize(self, text: str) -> bytes: ...
+
+
+_provider_pool: Optional[ThreadPoolExecutor] = None
+_provider_pool_lock = threading.Lock()
+
+
+def get_provider_pool() -> ThreadPoolExecutor:
+    """Bounded thread pool for blocking SDK calls (PROVIDER_POOL_SIZE workers)"""
+    global _provider_pool
+    if _provider_pool is None:
+        with _provider_pool_lock:
+            if _provider_pool is None:
+                _provider_pool = ThreadPoolExecutor(
+                    max_workers=int(os.getenv("PROVIDER_POOL_SIZE", 8)),
+                    thread_name_prefix="provider",
+                )
+    return _provider_pool
+
+
+async def run_in_provider_pool(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking provider call without blocking the event loop.
+
+    Calls beyond the pool size wait in the executor queue instead of
+    spawning a thread each, so many coroutines can be in flight at once.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_provider_pool(), functools.partial(func, *args, **kwargs))
+
+
+class AsyncLLMMixin:
+    """agenerate_answer() for adapters that only have a blocking generate_answer()"""
+
+    async def agenerate_answer(self, prompt: str, *args, **kwargs) -> str:
+        return await run_in_provider_pool(self.generate_answer, prompt, *args, **kwargs)
+
+
+class AsyncSTTMixin:
+    """atranscribe() for adapters that only have a blocking speech_to_text()"""
+
+    async def atranscribe(self, audio_data: bytes, *args, **kwargs) -> str:
+        return await run_in_provider_pool(self.speech_to_text, audio_data, *args, **kwargs)
+
+
+class AsyncTTSMixin:
+    """asynthesize() for adapters that only have a blocking text_to_speech()"""
+
+    async def asynthesize(self, text: str, *args, **kwargs) -> bytes:
+        return await run_in_provider_pool(self.text_to_speech, text, *args, **kwargs)
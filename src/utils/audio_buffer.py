@@ -0,0 +1,158 @@
+"""In-memory PCM audio for STT adapters, so no temp files sit on the transcription path"""
+import struct
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional, Sequence, Union
+import numpy as np
+
+# Частота, которую ждут Whisper и большинство моделей Vosk
+DEFAULT_SAMPLE_RATE = 16000
+
+# Коды формата в WAV-заголовке
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+@dataclass(frozen=True)
+class AudioBuffer:
+    """Mono audio samples plus their sample rate.
+
+    samples is an int16 (PCM) or float32 (-1..1) NumPy array. Buffers built
+    from bytes are views into them, so wrapping a recording or a WAV payload
+    copies nothing; conversions copy only when the dtype or rate changes.
+    """
+    samples: np.ndarray
+    sample_rate: int = DEFAULT_SAMPLE_RATE
+
+    def __post_init__(self):
+        if self.samples.dtype not in (np.int16, np.float32) or self.samples.ndim != 1:
+            raise ValueError("AudioBuffer needs mono int16 or float32 samples")
+
+    @classmethod
+    def from_pcm16(cls, data: Union[bytes, bytearray, memoryview], sample_rate: int = DEFAULT_SAMPLE_RATE,
+                   channels: int = 1) -> 'AudioBuffer':
+        """Wrap raw little-endian 16-bit PCM; stereo and wider input is mixed down to mono"""
+        samples = np.frombuffer(data, dtype='<i2')
+        return cls(samples, sample_rate).mixdown(channels)
+
+    @classmethod
+    def from_frames(cls, frames: Iterable, sample_rate: int = DEFAULT_SAMPLE_RATE,
+                    channels: int = 1) -> 'AudioBuffer':
+        """Join recorded PCM16 frames (bytes or int16 arrays) into a buffer with a single copy"""
+        return cls.from_pcm16(b''.join(frames), sample_rate, channels)
+
+    @classmethod
+    def from_av_frames(cls, frames: Sequence) -> 'AudioBuffer':
+        """Join PyAV AudioFrames, as WebRTC delivers them, at the frames' own rate and channel count.
+
+        Packed s16 frames (the usual 48 kHz stereo from WebRTC) are joined with
+        a single copy; planar and float frames are interleaved and converted first.
+        """
+        if not frames:
+            raise ValueError("No audio frames")
+        first = frames[0]
+        chunks = []
+        for frame in frames:
+            samples = frame.to_ndarray()
+            if frame.format.is_planar:
+                # (каналы, сэмплы) -> чередующиеся каналы, как в packed-формате
+                samples = samples.T
+            if samples.dtype != np.int16:
+                samples = (np.clip(samples, -1.0, 1.0) * 32767.0).astype(np.int16)
+            chunks.append(np.ascontiguousarray(samples))
+        return cls.from_frames(chunks, first.sample_rate, len(first.layout.channels))
+
+    @classmethod
+    def from_wav(cls, data: Union[bytes, bytearray, memoryview]) -> 'AudioBuffer':
+        """Parse a WAV payload in memory; 16-bit PCM and 32-bit float data are used in place"""
+        view = memoryview(data)
+        if len(view) < 12 or bytes(view[:4]) != b'RIFF' or bytes(view[8:12]) != b'WAVE':
+            raise ValueError("Not a WAV file")
+        fmt = None
+        offset = 12
+        while offset + 8 <= len(view):
+            chunk_id = bytes(view[offset:offset + 4])
+            size = struct.unpack_from('<I', view, offset + 4)[0]
+            body = view[offset + 8:offset + 8 + size]
+            if chunk_id == b'fmt ':
+                fmt = struct.unpack_from('<HHIIHH', body)
+            elif chunk_id == b'data':
+                if fmt is None:
+                    raise ValueError("WAV data chunk before fmt chunk")
+                format_tag, channels, sample_rate, _, _, bits = fmt
+                if format_tag == WAVE_FORMAT_EXTENSIBLE:
+                    # Настоящий формат лежит в SubFormat расширенного заголовка
+                    format_tag = WAVE_FORMAT_IEEE_FLOAT if bits == 32 else WAVE_FORMAT_PCM
+                if format_tag == WAVE_FORMAT_PCM and bits == 16:
+                    dtype = '<i2'
+                elif format_tag == WAVE_FORMAT_IEEE_FLOAT and bits == 32:
+                    dtype = '<f4'
+                else:
+                    raise ValueError(f"Unsupported WAV sample format: {format_tag}/{bits} bit")
+                usable = len(body) - len(body) % (bits // 8)
+                samples = np.frombuffer(body[:usable], dtype=dtype)
+                return cls(samples, sample_rate).mixdown(channels)
+            offset += 8 + size + size % 2  # Чанки выровнены на чётную границу
+        raise ValueError("WAV file has no data chunk")
+
+    @classmethod
+    def coerce(cls, audio, sample_rate: Optional[int] = None) -> 'AudioBuffer':
+        """AudioBuffer from what STT adapters receive: a buffer, WAV or raw PCM16 bytes, or an array"""
+        if isinstance(audio, AudioBuffer):
+            return audio
+        if isinstance(audio, np.ndarray):
+            samples = audio.reshape(-1)
+            if samples.dtype != np.int16:
+                samples = samples.astype(np.float32, copy=False)
+            return cls(samples, sample_rate or DEFAULT_SAMPLE_RATE)
+        if bytes(memoryview(audio)[:4]) == b'RIFF':
+            return cls.from_wav(audio)
+        return cls.from_pcm16(audio, sample_rate or DEFAULT_SAMPLE_RATE)
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    @property
+    def duration(self) -> float:
+        """Length in seconds"""
+        return len(self.samples) / self.sample_rate
+
+    def mixdown(self, channels: int) -> 'AudioBuffer':
+        """Average interleaved channels into mono; a no-op for mono"""
+        if channels == 1:
+            return self
+        frames = self.samples[:len(self.samples) - len(self.samples) % channels].reshape(-1, channels)
+        mono = frames.mean(axis=1, dtype=np.float32)
+        if self.samples.dtype == np.int16:
+            mono = np.round(mono).astype(np.int16)
+        return AudioBuffer(mono, self.sample_rate)
+
+    def to_float32(self) -> np.ndarray:
+        """Samples as float32 in -1..1, the input format of Whisper"""
+        if self.samples.dtype == np.float32:
+            return self.samples
+        return self.samples.astype(np.float32) / 32768.0
+
+    def to_pcm16(self) -> np.ndarray:
+        """Samples as int16 PCM, the input format of Vosk"""
+        if self.samples.dtype == np.int16:
+            return self.samples
+        return (np.clip(self.samples, -1.0, 1.0) * 32767.0).astype(np.int16)
+
+    def resample(self, sample_rate: int) -> 'AudioBuffer':
+        """Linear-interpolation resampling, e.g. 48 kHz WebRTC audio to Whisper's 16 kHz"""
+        if sample_rate == self.sample_rate or not len(self.samples):
+            return AudioBuffer(self.samples, sample_rate)
+        count = int(round(len(self.samples) * sample_rate / self.sample_rate))
+        positions = np.arange(count) * (self.sample_rate / sample_rate)
+        resampled = np.interp(positions, np.arange(len(self.samples)), self.samples).astype(np.float32)
+        if self.samples.dtype == np.int16:
+            resampled = np.round(resampled).astype(np.int16)
+        return AudioBuffer(resampled, sample_rate)
+
+    def pcm16_chunks(self, frames: int = 4000) -> Iterator[memoryview]:
+        """Consecutive PCM16 chunks of at most frames samples, as views into one array"""
+        pcm = memoryview(self.to_pcm16()).cast('B')
+        step = frames * 2
+        for start in range(0, len(pcm), step):
+            yield pcm[start:start + step]
@@ -0,0 +1,89 @@
+"""Process-wide read-through cache of tests and their questions"""
+import os
+import threading
+import time
+import weakref
+from typing import Callable, Dict, List, Optional
+
+
+class CatalogCache:
+    """Caches test names and question lists until the catalog version changes.
+
+    Writers bump the catalog_version row in the same transaction as their
+    change (see DBHandler.bump_catalog_version) and call invalidate(), so the
+    writing process sees its change immediately. Other processes notice the
+    new version on their next check, at most check_interval seconds later;
+    between checks reads don't touch the database at all.
+    """
+
+    def __init__(self, db, check_interval: float = 2.0):
+        self.db = db
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._tests: Optional[List[str]] = None
+        self._questions: Dict[str, List[str]] = {}
+        self._generation = 0  # Растёт при каждом сбросе, чтобы не сохранить устаревшую загрузку
+
+    def _sync(self):
+        """Drop cached data if another process changed the catalog"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked_at < self.check_interval:
+                return
+        version = self.db.get_catalog_version()
+        with self._lock:
+            if version != self._version:
+                self._version = version
+                self._tests = None
+                self._questions.clear()
+                self._generation += 1
+            self._checked_at = now
+
+    def get_tests(self, load: Callable[[], List[str]]) -> List[str]:
+        self._sync()
+        with self._lock:
+            if self._tests is not None:
+                return list(self._tests)
+            generation = self._generation
+        tests = load()
+        with self._lock:
+            if generation == self._generation:
+                self._tests = list(tests)
+        return tests
+
+    def get_questions(self, test_name: str, load: Callable[[str], List[str]]) -> List[str]:
+        self._sync()
+        with self._lock:
+            if test_name in self._questions:
+                return list(self._questions[test_name])
+            generation = self._generation
+        questions = load(test_name)
+        with self._lock:
+            if generation == self._generation:
+                self._questions[test_name] = list(questions)
+        return questions
+
+    def invalidate(self):
+        """Forget everything and re-read the version on the next access"""
+        with self._lock:
+            self._version = None
+            self._checked_at = 0.0
+            self._tests = None
+            self._questions.clear()
+            self._generation += 1
+
+
+_caches: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_caches_lock = threading.Lock()
+
+
+def get_catalog_cache(db) -> CatalogCache:
+    """Shared cache for a database engine (CATALOG_CHECK_INTERVAL seconds between version checks)"""
+    with _caches_lock:
+        cache = _caches.get(db.engine)
+        if cache is None:
+            cache = CatalogCache(db, check_interval=float(os.getenv("CATALOG_CHECK_INTERVAL", 2)))
+            _caches[db.engine] = cache
+        return cache
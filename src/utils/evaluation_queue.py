@@ -0,0 +1,133 @@
+"""Background evaluation queue that scores answers outside of the Streamlit request"""
+import os
+import random
+import socket
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional
+from src.database.db_handler import DBHandler, EVALUATION_LEASE_SECONDS
+from src.database.models import EVALUATION_DONE, EVALUATION_FAILED
+from src.utils.llm_evaluator import evaluate_answer
+
+# Имя этого процесса в claimed_by, под ним он забирает ответы на оценку
+EVALUATOR_ID = f"llm@{socket.gethostname()}:{os.getpid()}"
+
+
+class EvaluationQueue:
+    """Worker pool that fills in llm_score/feedback for pending SurveyResult rows.
+
+    Concurrency is bounded both globally (max_workers) and per LLM provider
+    (max_per_provider), so a slow provider cannot occupy every worker. Failed
+    strict evaluations and provider errors are retried with exponential backoff
+    and jitter; the last attempt uses the two-call fallback of evaluate_answer().
+    An answer is claimed in the database before it is evaluated, so replicas
+    sharing the database skip answers someone else is already working on.
+    """
+
+    def __init__(self, db_handler: DBHandler, max_workers: int = 4, max_per_provider: int = 2,
+                 max_retries: int = 3, backoff_base: float = 1.0, backoff_max: float = 30.0,
+                 evaluator: str = EVALUATOR_ID):
+        self.db = db_handler
+        self.evaluator = evaluator
+        self.max_per_provider = max_per_provider
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="evaluation")
+        self._lock = threading.Lock()
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._inflight: Dict[int, Future] = {}
+
+    def _semaphore(self, provider: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if provider not in self._semaphores:
+                self._semaphores[provider] = threading.BoundedSemaphore(self.max_per_provider)
+            return self._semaphores[provider]
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, delay)
+
+    def submit(self, result_id: int, question: str, answer: str, llm,
+               provider: Optional[str] = None) -> Future:
+        """Schedule evaluation of a stored answer; duplicate submissions are ignored"""
+        provider = provider or type(llm).__name__
+        with self._lock:
+            future = self._inflight.get(result_id)
+            if future is not None:
+                return future
+            future = self._executor.submit(self._run, result_id, question, answer, llm, provider)
+            self._inflight[result_id] = future
+        future.add_done_callback(lambda _: self._forget(result_id))
+        return future
+
+    def _forget(self, result_id: int):
+        with self._lock:
+            self._inflight.pop(result_id, None)
+
+    def _run(self, result_id: int, question: str, answer: str, llm, provider: str) -> bool:
+        if not self.db.claim_evaluation(result_id, self.evaluator):
+            # Ответ уже оценён или его оценивает другой процесс
+            return False
+        semaphore = self._semaphore(provider)
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                with semaphore:
+                    score, feedback = evaluate_answer(question, answer, llm, fallback=last_attempt)
+                return self.db.complete_evaluation(result_id, score, feedback, EVALUATION_DONE)
+            except Exception as e:
+                # Непарсящийся ответ и ошибки провайдера (сеть, лимиты) повторяются с backoff
+                if last_attempt:
+                    print(f"Error evaluating result {result_id}: {str(e)}")
+                    break
+                delay = self._backoff(attempt)
+                print(f"Evaluation of result {result_id} failed (attempt {attempt + 1}): {str(e)}, "
+                      f"retrying in {delay:.1f}s")
+                time.sleep(delay)
+        self.db.complete_evaluation(result_id, None, None, EVALUATION_FAILED)
+        return False
+
+    def recover_pending(self, llm, provider: Optional[str] = None,
+                        stale_seconds: int = EVALUATION_LEASE_SECONDS) -> int:
+        """Re-enqueue answers left pending by a stopped process.
+
+        Only answers older than stale_seconds whose claim has expired are
+        taken; fresh ones are still being evaluated by the process that saved them.
+        """
+        pending = self.db.get_pending_results(stale_seconds)
+        for result in pending:
+            self.submit(result.id, result.question, result.answer, llm, provider)
+        return len(pending)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._inflight)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+_default_queue: Optional[EvaluationQueue] = None
+_default_queue_lock = threading.Lock()
+
+
+def get_evaluation_queue(db_handler: DBHandler, llm=None) -> EvaluationQueue:
+    """Process-wide queue that survives Streamlit reruns.
+
+    On first creation answers left pending by a stopped process are picked up
+    again when an llm is given (see EvaluationQueue.recover_pending).
+    """
+    global _default_queue
+    if _default_queue is None:
+        with _default_queue_lock:
+            if _default_queue is None:
+                _default_queue = EvaluationQueue(
+                    db_handler,
+                    max_workers=int(os.getenv("EVALUATION_WORKERS", 4)),
+                    max_per_provider=int(os.getenv("EVALUATION_PER_PROVIDER", 2)),
+                )
+                if llm is not None:
+                    _default_queue.recover_pending(llm)
+    return _default_queue
@@ -0,0 +1,197 @@
+"""Shared HTTP transport with pooled keep-alive sessions for API adapters"""
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+class HTTPTransport:
+    """Keeps one pooled requests.Session per endpoint (scheme, host, port).
+
+    Connections are reused between calls, every request gets connect/read
+    timeouts, and 429/5xx responses or failed connects are retried with
+    exponential backoff plus full jitter (Retry-After is honoured when sent).
+    """
+
+    def __init__(self, connect_timeout: float = 5.0, read_timeout: float = 60.0,
+                 pool_maxsize: int = 10, max_retries: int = 3,
+                 backoff_base: float = 0.5, backoff_max: float = 10.0):
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._sessions: Dict[Tuple[str, str, Optional[int]], requests.Session] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def endpoint_key(url: str) -> Tuple[str, str, Optional[int]]:
+        parts = urlsplit(url)
+        return parts.scheme, parts.hostname or '', parts.port
+
+    def session_for(self, url: str) -> requests.Session:
+        """Pooled keep-alive session for the endpoint of url"""
+        key = self.endpoint_key(url)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                # pool_block: при исчерпании пула ждём свободное соединение, а не открываем лишние
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize, pool_block=True)
+                session.mount(f"{key[0]}://", adapter)
+                self._sessions[key] = session
+            return session
+
+    def _retry_delay(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after:
+                try:
+                    return min(self.backoff_max, float(retry_after))
+                except ValueError:
+                    pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request, retrying 429/5xx responses and failed connects"""
+        kwargs.setdefault('timeout', self.timeout)
+        session = self.session_for(url)
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = session.request(method, url, **kwargs)
+            except requests.exceptions.ConnectionError:
+                # ConnectTimeout - подкласс ConnectionError; ReadTimeout не повторяем,
+                # так как запрос мог быть уже обработан сервером
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._retry_delay(attempt))
+                continue
+            if response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                return response
+            delay = self._retry_delay(attempt, response)
+            response.close()
+            time.sleep(delay)
+        return response
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+class AsyncHTTPTransport:
+    """Asyncio counterpart of HTTPTransport built on pooled httpx.AsyncClient instances.
+
+    httpx clients are bound to the event loop they were created on, so one
+    client per (loop, endpoint) is kept; clients of a garbage-collected loop
+    are dropped with it.
+    """
+
+    def __init__(self, connect_timeout: float = 5.0, read_timeout: float = 60.0,
+                 pool_maxsize: int = 10, max_retries: int = 3,
+                 backoff_base: float = 0.5, backoff_max: float = 10.0):
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict]" = weakref.WeakKeyDictionary()
+
+    def client_for(self, url: str) -> httpx.AsyncClient:
+        """Pooled keep-alive client for the endpoint of url on the running loop"""
+        loop = asyncio.get_running_loop()
+        clients = self._clients.setdefault(loop, {})
+        key = HTTPTransport.endpoint_key(url)
+        client = clients.get(key)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+            clients[key] = client
+        return client
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after:
+                try:
+                    return min(self.backoff_max, float(retry_after))
+                except ValueError:
+                    pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request, retrying 429/5xx responses and failed connects"""
+        client = self.client_for(url)
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await client.request(method, url, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(self._retry_delay(attempt))
+                continue
+            if response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                return response
+            await asyncio.sleep(self._retry_delay(attempt, response))
+        return response
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request('POST', url, **kwargs)
+
+    async def aclose(self):
+        """Close the clients that belong to the running loop"""
+        clients = self._clients.pop(asyncio.get_running_loop(), {})
+        for client in clients.values():
+            await client.aclose()
+
+
+_default_transport: Optional[HTTPTransport] = None
+_default_transport_lock = threading.Lock()
+
+
+def get_transport() -> HTTPTransport:
+    """Process-wide transport configured from HTTP_* environment variables"""
+    global _default_transport
+    if _default_transport is None:
+        with _default_transport_lock:
+            if _default_transport is None:
+                _default_transport = HTTPTransport(
+                    connect_timeout=float(os.getenv("HTTP_CONNECT_TIMEOUT", 5.0)),
+                    read_timeout=float(os.getenv("HTTP_READ_TIMEOUT", 60.0)),
+                    pool_maxsize=int(os.getenv("HTTP_POOL_SIZE", 10)),
+                    max_retries=int(os.getenv("HTTP_MAX_RETRIES", 3)),
+                )
+    return _default_transport
+
+
+_default_async_transport: Optional[AsyncHTTPTransport] = None
+
+
+def get_async_transport() -> AsyncHTTPTransport:
+    """Process-wide async transport configured from HTTP_* environment variables"""
+    global _default_async_transport
+    if _default_async_transport is None:
+        with _default_transport_lock:
+            if _default_async_transport is None:
+                _default_async_transport = AsyncHTTPTransport(
+                    connect_timeout=float(os.getenv("HTTP_CONNECT_TIMEOUT", 5.0)),
+                    read_timeout=float(os.getenv("HTTP_READ_TIMEOUT", 60.0)),
+                    pool_maxsize=int(os.getenv("HTTP_POOL_SIZE", 10)),
+                    max_retries=int(os.getenv("HTTP_MAX_RETRIES", 3)),
+                )
+    return _default_async_transport
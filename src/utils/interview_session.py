@@ -0,0 +1,153 @@
+"""Per-candidate interview state with a fixed snapshot of the questions"""
+import os
+import random
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Tuple
+
+# Способы выбора вопросов для интервью
+SAMPLING_ALL = 'all'
+SAMPLING_RANDOM = 'random'
+SAMPLING_STRATIFIED = 'stratified'
+SAMPLING_MODES = (SAMPLING_ALL, SAMPLING_RANDOM, SAMPLING_STRATIFIED)
+
+QuestionRow = Tuple[int, str]
+
+
+def sample_questions(rows: Sequence[QuestionRow], n: Optional[int] = None, seed: Optional[int] = None,
+                     mode: str = SAMPLING_RANDOM) -> List[QuestionRow]:
+    """Pick n of the (id, text) rows; the same rows, n and seed always give the same result.
+
+    random draws n rows in random order. stratified splits the id-ordered
+    bank into n consecutive blocks and draws one row from each, so a sample
+    covers the whole bank (imported banks are usually grouped by topic) and
+    keeps its order. all, or n of None/0/at least len(rows), keeps every row;
+    random still shuffles them.
+    """
+    rows = sorted(rows)
+    if mode not in SAMPLING_MODES:
+        raise ValueError(f"Unknown sampling mode: {mode}")
+    n = len(rows) if not n else min(n, len(rows))
+    rng = random.Random(seed)
+    if mode == SAMPLING_RANDOM:
+        return rng.sample(rows, n)
+    if mode == SAMPLING_ALL or n == len(rows):
+        return rows
+    bounds = [len(rows) * i // n for i in range(n + 1)]
+    return [rows[rng.randrange(start, end)] for start, end in zip(bounds, bounds[1:])]
+
+
+def sampling_from_env() -> Tuple[int, str]:
+    """(question count, sampling mode) from INTERVIEW_QUESTIONS and INTERVIEW_SAMPLING.
+
+    Invalid values fall back to 0 (every question) and all with a warning,
+    so a typo in the deployment can't break the interview page.
+    """
+    count = os.getenv("INTERVIEW_QUESTIONS", "0")
+    try:
+        n = int(count)
+        if n < 0:
+            raise ValueError(count)
+    except ValueError:
+        print(f"Invalid INTERVIEW_QUESTIONS={count!r}, using all questions")
+        n = 0
+    mode = os.getenv("INTERVIEW_SAMPLING", SAMPLING_ALL)
+    if mode not in SAMPLING_MODES:
+        print(f"Invalid INTERVIEW_SAMPLING={mode!r}, expected one of {', '.join(SAMPLING_MODES)}; using {SAMPLING_ALL}")
+        mode = SAMPLING_ALL
+    return n, mode
+
+
+@dataclass
+class InterviewSession:
+    """Questions of one interview, fixed when it starts.
+
+    The page keeps this object in st.session_state, so reruns read questions
+    from the snapshot instead of the database and admin edits made during the
+    interview can't shift, skip or repeat questions. persist() also stores it
+    in interview_sessions, so any app process can resume it by token after a
+    restart or a move to another replica.
+    """
+    test_name: str
+    question_ids: List[int]
+    questions: List[str]
+    mode: str = SAMPLING_ALL
+    seed: Optional[int] = None
+    current: int = 0
+    result_ids: List[int] = field(default_factory=list)
+    first_name: str = ''
+    last_name: str = ''
+    interview_id: Optional[int] = None
+    token: Optional[str] = None
+
+    @classmethod
+    def start(cls, question_manager, test_name: str, n: Optional[int] = None, seed: Optional[int] = None,
+              mode: str = SAMPLING_ALL, first_name: str = '', last_name: str = '') -> Optional['InterviewSession']:
+        """Snapshot the questions of a test; None if it has no questions.
+
+        Without a seed a random one is drawn and stored, so the sample of any
+        interview can be reproduced later.
+        """
+        rows = question_manager.get_question_rows(test_name)
+        if not rows:
+            return None
+        if seed is None and mode != SAMPLING_ALL:
+            seed = random.SystemRandom().randrange(2 ** 32)
+        rows = sample_questions(rows, n, seed, mode)
+        return cls(
+            test_name=test_name,
+            question_ids=[question_id for question_id, _ in rows],
+            questions=[text for _, text in rows],
+            mode=mode,
+            seed=seed,
+            first_name=first_name,
+            last_name=last_name
+        )
+
+    def persist(self, db) -> bool:
+        """Store the snapshot in the database; afterwards token resumes the interview"""
+        created = db.create_interview(self.test_name, self.first_name, self.last_name,
+                                      self.question_ids, self.questions, self.mode, self.seed)
+        if created is None:
+            return False
+        self.interview_id, self.token = created
+        return True
+
+    @classmethod
+    def resume(cls, db, token: str) -> Optional['InterviewSession']:
+        """Load a persisted interview by token; None if it is unknown"""
+        state = db.load_interview(token)
+        if state is None:
+            return None
+        return cls(
+            test_name=state['test_name'],
+            question_ids=state['question_ids'],
+            questions=state['questions'],
+            mode=state['mode'],
+            seed=state['seed'],
+            current=state['current'],
+            result_ids=state['result_ids'],
+            first_name=state['first_name'],
+            last_name=state['last_name'],
+            interview_id=state['id'],
+            token=state['token']
+        )
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    @property
+    def finished(self) -> bool:
+        return self.current >= len(self.questions)
+
+    @property
+    def question(self) -> Optional[str]:
+        return None if self.finished else self.questions[self.current]
+
+    @property
+    def question_id(self) -> Optional[int]:
+        return None if self.finished else self.question_ids[self.current]
+
+    def advance(self):
+        """Move on to the next question"""
+        if not self.finished:
+            self.current += 1
@@ -1,4 +1,7 @@
 """LLM evaluation utilities for scoring and feedback"""
+import json
+import re
+from typing import Iterator, Optional, Tuple
 
 def get_llm_feedback(question: str, answer: str, llm) -> str:
     """Get feedback from LLM"""
@@ -30,4 +33,145 @@ def get_llm_score(question: str, answer: str, llm) -> int:
         except ValueError:
             return 3  # Возвращаем среднюю оценку в случае ошибки
     except Exception as e:
-        return 3  # Возвращаем среднюю оценку в случае ошибки 
\ No newline at end of file
+        return 3  # Возвращаем среднюю оценку в случае ошибки 
+
+
+class EvaluationParseError(ValueError):
+    """Raised when the combined LLM evaluation cannot be parsed"""
+
+
+def build_evaluation_prompt(question: str, answer: str) -> str:
+    """Prompt that asks for the score and the feedback in one JSON object"""
+    return f"""Оцени ответ на вопрос интервью по шкале от 1 до 5 и дай краткую обратную связь.
+        Вопрос: {question}
+        Ответ: {answer}
+        
+        Формат ответа: только JSON-объект без пояснений вида
+        {{"score": <целое число от 1 до 5>, "feedback": "<краткая обратная связь>"}}"""
+
+
+def parse_evaluation(text: str) -> Tuple[int, str]:
+    """Strictly parse a combined evaluation, raising EvaluationParseError on any mismatch"""
+    if not text:
+        raise EvaluationParseError("Empty evaluation")
+    start = text.find('{')
+    end = text.rfind('}')
+    if start == -1 or end < start:
+        raise EvaluationParseError("No JSON object in evaluation")
+    try:
+        data = json.loads(text[start:end + 1])
+    except json.JSONDecodeError as e:
+        raise EvaluationParseError(f"Invalid JSON in evaluation: {e}")
+    if not isinstance(data, dict):
+        raise EvaluationParseError("Evaluation must be a JSON object")
+
+    score = data.get('score')
+    if isinstance(score, bool) or not isinstance(score, (int, float)) or score != int(score):
+        raise EvaluationParseError(f"Score must be an integer, got {score!r}")
+    score = int(score)
+    if not 1 <= score <= 5:
+        raise EvaluationParseError(f"Score must be between 1 and 5, got {score}")
+
+    feedback = data.get('feedback')
+    if not isinstance(feedback, str) or not feedback.strip():
+        raise EvaluationParseError("Feedback must be a non-empty string")
+    return score, feedback.strip()
+
+
+def evaluate_answer(question: str, answer: str, llm, fallback: bool = True) -> Tuple[int, str]:
+    """Get score and feedback from a single LLM call.
+
+    Falls back to the two-call path (get_llm_score + get_llm_feedback) only if the
+    combined response cannot be parsed. With fallback=False the parse error is raised.
+    Errors of the call itself (transport, auth, rate limits) are raised as is, so
+    the caller can back off instead of hitting a failing provider two more times.
+    """
+    response = llm.generate_answer(build_evaluation_prompt(question, answer))
+    try:
+        return parse_evaluation(response)
+    except EvaluationParseError as e:
+        if not fallback:
+            raise
+        print(f"Combined evaluation failed, falling back to separate calls: {str(e)}")
+    return get_llm_score(question, answer, llm), get_llm_feedback(question, answer, llm)
+
+
+# Первая строка потокового ответа: "Оценка: N"
+SCORE_HEADER_RE = re.compile(r'^\W*(?:оценка|score)\W*([1-5])\b', re.IGNORECASE)
+MAX_HEADER_LENGTH = 200
+
+
+def build_streaming_evaluation_prompt(question: str, answer: str) -> str:
+    """Prompt whose response starts with the score line followed by free-form feedback"""
+    return f"""Оцени ответ на вопрос интервью по шкале от 1 до 5 и дай краткую обратную связь.
+        Вопрос: {question}
+        Ответ: {answer}
+        
+        Формат ответа: первая строка - "Оценка: <целое число от 1 до 5>",
+        со второй строки - краткая обратная связь."""
+
+
+def stream_llm(prompt: str, llm) -> Iterator[str]:
+    """Stream a completion, or yield it whole for adapters without stream_answer()"""
+    stream_answer = getattr(llm, 'stream_answer', None)
+    if stream_answer is not None:
+        yield from stream_answer(prompt)
+    else:
+        yield llm.generate_answer(prompt) or ""
+
+
+class StreamingEvaluation:
+    """Iterates over feedback chunks while parsing the score from the same stream.
+
+    The score header line is consumed and never yielded. After the iteration is
+    exhausted, score and feedback are set; if the model ignored the header format,
+    the score comes from a separate get_llm_score() call.
+    """
+
+    def __init__(self, question: str, answer: str, llm):
+        self.question = question
+        self.answer = answer
+        self.llm = llm
+        self.score: Optional[int] = None
+        self.feedback = ""
+
+    def __iter__(self) -> Iterator[str]:
+        prompt = build_streaming_evaluation_prompt(self.question, self.answer)
+        header = ""
+        header_done = False
+        parts = []
+        for chunk in stream_llm(prompt, self.llm):
+            if not header_done:
+                header += chunk
+                if '\n' not in header and len(header) < MAX_HEADER_LENGTH:
+                    continue
+                header_done = True
+                first_line, _, rest = header.partition('\n')
+                match = SCORE_HEADER_RE.match(first_line.strip())
+                if match:
+                    self.score = int(match.group(1))
+                    chunk = rest.lstrip()
+                else:
+                    chunk = header
+                if not chunk:
+                    continue
+            parts.append(chunk)
+            yield chunk
+        if not header_done and header:
+            # Поток закончился без перевода строки
+            match = SCORE_HEADER_RE.match(header.strip())
+            if match:
+                self.score = int(match.group(1))
+                rest = header.strip()[match.end():].lstrip(' .:-\n')
+                if rest:
+                    parts.append(rest)
+                    yield rest
+            else:
+                parts.append(header)
+                yield header
+        self.feedback = "".join(parts).strip()
+        if self.score is None:
+            self.score = get_llm_score(self.question, self.answer, self.llm)
+        if not self.feedback:
+            self.feedback = "Не удалось получить обратную связь"
+
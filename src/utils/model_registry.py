@@ -0,0 +1,185 @@
+"""Process-wide registry of shared LLM/STT/TTS provider instances"""
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Примерный объём памяти (МБ), который занимают загруженные веса локальных моделей.
+# Ключ - имя класса провайдера, чтобы не импортировать тяжёлые зависимости заранее.
+WHISPER_MODEL_SIZES_MB = {
+    'tiny': 75,
+    'base': 142,
+    'small': 466,
+    'medium': 1500,
+    'large': 2900,
+}
+
+HEAVY_MODEL_COSTS: Dict[str, Callable[[Dict[str, Any]], float]] = {
+    'WhisperSTT': lambda config: WHISPER_MODEL_SIZES_MB.get(config.get('model_name', 'tiny'), 1500),
+    'VoskSTT': lambda config: 50,
+    'LlamaLLM': lambda config: 13000,
+    'MistralLLM': lambda config: 14000,
+}
+
+DEFAULT_MEMORY_BUDGET_MB = 4096
+
+
+def _freeze(value: Any) -> Any:
+    """Превращает значение конфигурации в хешируемый вид"""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, set):
+        return tuple(sorted(_freeze(v) for v in value))
+    return value
+
+
+class _Entry:
+    def __init__(self, key: Tuple, cost_mb: float):
+        self.key = key
+        self.cost_mb = cost_mb
+        self.instance = None
+        self.refcount = 0
+        self.loaded = threading.Event()
+        self.error: Optional[BaseException] = None
+
+
+class ModelRegistry:
+    """Thread-safe registry that loads each provider configuration once.
+
+    Instances are keyed by provider class plus constructor kwargs and created
+    lazily on first use. Heavy local models (Whisper, Vosk, Llama, Mistral)
+    count against a memory budget; when it is exceeded, the least recently
+    used heavy models that nobody currently holds are evicted.
+    """
+
+    def __init__(self, memory_budget_mb: Optional[float] = None):
+        if memory_budget_mb is None:
+            memory_budget_mb = float(os.getenv("MODEL_MEMORY_BUDGET_MB", DEFAULT_MEMORY_BUDGET_MB))
+        self.memory_budget_mb = memory_budget_mb
+        self._lock = threading.RLock()
+        self._entries: "OrderedDict[Tuple, _Entry]" = OrderedDict()
+
+    @staticmethod
+    def make_key(provider_cls: type, config: Dict[str, Any]) -> Tuple:
+        """Build the registry key for a provider class and its config"""
+        return (provider_cls.__module__, provider_cls.__qualname__, _freeze(config))
+
+    @staticmethod
+    def estimate_cost_mb(provider_cls: type, config: Dict[str, Any]) -> float:
+        """Estimated memory footprint in MB, 0 for lightweight API clients"""
+        estimator = HEAVY_MODEL_COSTS.get(provider_cls.__name__)
+        return float(estimator(config)) if estimator else 0.0
+
+    @property
+    def used_memory_mb(self) -> float:
+        with self._lock:
+            return sum(e.cost_mb for e in self._entries.values() if e.loaded.is_set() and e.error is None)
+
+    def _resolve(self, provider_cls: type, config: Dict[str, Any], pin: bool):
+        key = self.make_key(provider_cls, config)
+        with self._lock:
+            entry = self._entries.get(key)
+            owner = entry is None
+            if owner:
+                entry = _Entry(key, self.estimate_cost_mb(provider_cls, config))
+                self._entries[key] = entry
+                if entry.cost_mb:
+                    self._evict(entry.cost_mb, exclude=key)
+            self._entries.move_to_end(key)
+            if pin:
+                entry.refcount += 1
+
+        if owner:
+            # Загружаем модель вне общей блокировки, чтобы не блокировать другие провайдеры
+            try:
+                entry.instance = provider_cls(**config)
+            except BaseException as e:
+                entry.error = e
+                with self._lock:
+                    if self._entries.get(key) is entry:
+                        del self._entries[key]
+                raise
+            finally:
+                entry.loaded.set()
+        else:
+            entry.loaded.wait()
+            if entry.error is not None:
+                if pin:
+                    with self._lock:
+                        entry.refcount -= 1
+                raise entry.error
+        return entry.instance
+
+    def _evict(self, needed_mb: float, exclude: Tuple):
+        """Вытесняет давно не использованные тяжёлые модели до укладывания в бюджет"""
+        used = sum(e.cost_mb for k, e in self._entries.items() if k != exclude)
+        for key in list(self._entries.keys()):
+            if used + needed_mb <= self.memory_budget_mb:
+                break
+            entry = self._entries[key]
+            if key == exclude or not entry.cost_mb or entry.refcount > 0 or not entry.loaded.is_set():
+                continue
+            del self._entries[key]
+            used -= entry.cost_mb
+            print(f"Evicted model {key[1]} ({entry.cost_mb:.0f} MB) from registry")
+        if used + needed_mb > self.memory_budget_mb:
+            print(f"Model memory budget exceeded: {used + needed_mb:.0f} MB of {self.memory_budget_mb:.0f} MB")
+
+    def get(self, provider_cls: type, **config):
+        """Return a shared instance without pinning it in memory"""
+        return self._resolve(provider_cls, config, pin=False)
+
+    def acquire(self, provider_cls: type, **config):
+        """Return a shared instance and pin it until release() is called"""
+        return self._resolve(provider_cls, config, pin=True)
+
+    def release(self, provider_cls: type, **config) -> None:
+        """Unpin an instance previously obtained with acquire()"""
+        key = self.make_key(provider_cls, config)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.refcount > 0:
+                entry.refcount -= 1
+
+    @contextmanager
+    def lease(self, provider_cls: type, **config):
+        """Context manager around acquire()/release()"""
+        instance = self.acquire(provider_cls, **config)
+        try:
+            yield instance
+        finally:
+            self.release(provider_cls, **config)
+
+    def refcount(self, provider_cls: type, **config) -> int:
+        key = self.make_key(provider_cls, config)
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.refcount if entry else 0
+
+    def is_loaded(self, provider_cls: type, **config) -> bool:
+        key = self.make_key(provider_cls, config)
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry.loaded.is_set() and entry.error is None
+
+    def clear(self) -> None:
+        """Drop every cached instance"""
+        with self._lock:
+            self._entries.clear()
+
+
+_default_registry: Optional[ModelRegistry] = None
+_default_registry_lock = threading.Lock()
+
+
+def get_registry() -> ModelRegistry:
+    """Process-wide registry shared by all Streamlit sessions and reruns"""
+    global _default_registry
+    if _default_registry is None:
+        with _default_registry_lock:
+            if _default_registry is None:
+                _default_registry = ModelRegistry()
+    return _default_registry
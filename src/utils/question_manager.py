@@ -1,131 +1,163 @@
 """Question Manager for Survey System"""
+import csv
+import io
+import json
 import os
-import random
-from typing import List, Optional
+from typing import List, Optional, Tuple, Union
+from sqlalchemy import insert, select
 from src.database.db_handler import DBHandler
 from src.database.models import Test, Question
+from src.utils.catalog_cache import get_catalog_cache
+from src.utils.interview_session import SAMPLING_RANDOM, sample_questions
+
+# Поля, в которых ищется текст вопроса в CSV/JSON/YAML
+QUESTION_FIELDS = ('question', 'text', 'вопрос')
+
+# Форматы файлов для импорта вопросов
+IMPORT_FORMATS = ('csv', 'json', 'yaml', 'yml', 'txt')
+
+
+def _question_from_item(item) -> Optional[str]:
+    if isinstance(item, str):
+        return item
+    if isinstance(item, dict):
+        for field in QUESTION_FIELDS:
+            for key, value in item.items():
+                if str(key).strip().lower() == field and value is not None:
+                    return str(value)
+    return None
+
+
+def _questions_from_data(data) -> List[str]:
+    """Questions from parsed JSON/YAML: a list of strings or of {"question": ...} objects,
+    optionally wrapped in {"questions": [...]}"""
+    if isinstance(data, dict):
+        data = data.get('questions', [])
+    if not isinstance(data, list):
+        raise ValueError("Expected a list of questions")
+    questions = [_question_from_item(item) for item in data]
+    return [question for question in questions if question]
+
+
+def parse_questions(content: Union[str, bytes], filename: str) -> List[str]:
+    """Parse an uploaded question bank; the format is taken from the file extension.
+
+    CSV files use the question/text column if there is a header, otherwise the
+    first column. Plain text files have one question per line.
+    """
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+    extension = filename.rsplit('.', 1)[-1].lower()
+    if extension == 'csv':
+        rows = [row for row in csv.reader(io.StringIO(content)) if row]
+        if not rows:
+            return []
+        header = [cell.strip().lower() for cell in rows[0]]
+        column = next((header.index(field) for field in QUESTION_FIELDS if field in header), None)
+        if column is None:
+            return [row[0] for row in rows]
+        return [row[column] for row in rows[1:] if len(row) > column]
+    if extension == 'json':
+        return _questions_from_data(json.loads(content))
+    if extension in ('yaml', 'yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise RuntimeError("YAML import requires PyYAML (pip install pyyaml)")
+        return _questions_from_data(yaml.safe_load(content))
+    if extension == 'txt':
+        return content.splitlines()
+    raise ValueError(f"Unsupported question file format: {extension}")
+
 
 class QuestionManager:
     def __init__(self, db_handler: DBHandler):
         self.db = db_handler
+        # Общий для процесса кэш: страницы создают QuestionManager заново на каждый rerun
+        self.cache = get_catalog_cache(db_handler)
         
     def get_all_tests(self) -> List[str]:
         """Get all test names from the database"""
-        session = self.db.get_session()
-        try:
-            tests = session.query(Test).all()
-            return [test.name for test in tests]
-        finally:
-            session.close()
+        return self.cache.get_tests(self.db.get_all_tests)
             
     def get_questions_for_test(self, test_name: str) -> List[str]:
         """Get all questions for a specific test"""
-        session = self.db.get_session()
-        try:
-            test = session.query(Test).filter(Test.name == test_name).first()
-            if test:
-                return [q.text for q in test.questions]
-            return []
-        finally:
-            session.close()
+        return self.cache.get_questions(test_name, self._load_questions)
+
+    def _load_questions(self, test_name: str) -> List[str]:
+        return [text for _, text in self.get_question_rows(test_name)]
+
+    def get_question_rows(self, test_name: str) -> List[Tuple[int, str]]:
+        """Get (id, text) of every question of a test, ordered by id"""
+        with self.db.session_scope() as session:
+            rows = session.execute(
+                select(Question.id, Question.text).join(Test, Question.test_id == Test.id)
+                .where(Test.name == test_name).order_by(Question.id)
+            )
+            return [(question_id, text) for question_id, text in rows]
+
+    def _changed(self, changed: bool) -> bool:
+        # Свой процесс видит изменение сразу, остальные - по версии каталога
+        if changed:
+            self.cache.invalidate()
+        return changed
             
     def create_test(self, test_name: str) -> bool:
         """Create a new test"""
-        session = self.db.get_session()
-        try:
-            if session.query(Test).filter(Test.name == test_name).first():
-                return False
-            new_test = Test(name=test_name)
-            session.add(new_test)
-            session.commit()
-            return True
-        except Exception as e:
-            session.rollback()
-            print(f"Error creating test: {str(e)}")
-            return False
-        finally:
-            session.close()
+        return self._changed(self.db.create_test(test_name))
             
     def add_question_to_test(self, test_name: str, question_text: str) -> bool:
         """Add a question to a specific test"""
-        session = self.db.get_session()
+        return self._changed(self.db.add_question_to_test(test_name, question_text))
+            
+    def add_questions_to_test(self, test_name: str, questions: List[str]) -> Optional[int]:
+        """Add many questions to a test in one transaction, return how many were added.
+
+        Blank lines, repeats within questions and questions already in the test
+        are skipped. New questions are written with a single executemany INSERT.
+        None means the database write failed and nothing was added.
+        """
         try:
-            test = session.query(Test).filter(Test.name == test_name).first()
-            if not test:
-                return False
-            question = Question(text=question_text, test=test)
-            session.add(question)
-            session.commit()
-            return True
+            with self.db.session_scope() as session:
+                # id теста и уже имеющиеся вопросы одним запросом
+                rows = session.execute(
+                    select(Test.id, Question.text).outerjoin(Question, Question.test_id == Test.id)
+                    .where(Test.name == test_name)
+                ).all()
+                if not rows:
+                    return 0
+                test_id = rows[0][0]
+                existing = {text for _, text in rows if text is not None}
+                new_questions = []
+                for question in questions:
+                    question = question.strip()
+                    if question and question not in existing:
+                        existing.add(question)
+                        new_questions.append({'test_id': test_id, 'text': question})
+                if new_questions:
+                    session.execute(insert(Question), new_questions)
+                    self.db.bump_catalog_version(session)
         except Exception as e:
-            session.rollback()
-            print(f"Error adding question: {str(e)}")
-            return False
-        finally:
-            session.close()
+            print(f"Error adding questions: {str(e)}")
+            return None
+        self._changed(bool(new_questions))
+        return len(new_questions)
+
+    def import_questions(self, test_name: str, content: Union[str, bytes], filename: str) -> Optional[int]:
+        """Import a CSV/JSON/YAML/TXT question bank into a test, return how many were added (None on error)"""
+        return self.add_questions_to_test(test_name, parse_questions(content, filename))
             
     def update_question(self, test_name: str, old_text: str, new_text: str) -> bool:
         """Update a question in a specific test"""
-        session = self.db.get_session()
-        try:
-            test = session.query(Test).filter(Test.name == test_name).first()
-            if not test:
-                return False
-            question = session.query(Question).filter(
-                Question.test_id == test.id,
-                Question.text == old_text
-            ).first()
-            if question:
-                question.text = new_text
-                session.commit()
-                return True
-            return False
-        except Exception as e:
-            session.rollback()
-            print(f"Error updating question: {str(e)}")
-            return False
-        finally:
-            session.close()
+        return self._changed(self.db.update_question(test_name, old_text, new_text))
             
     def delete_question(self, test_name: str, question_text: str) -> bool:
         """Delete a question from a specific test"""
-        session = self.db.get_session()
-        try:
-            test = session.query(Test).filter(Test.name == test_name).first()
-            if not test:
-                return False
-            question = session.query(Question).filter(
-                Question.test_id == test.id,
-                Question.text == question_text
-            ).first()
-            if question:
-                session.delete(question)
-                session.commit()
-                return True
-            return False
-        except Exception as e:
-            session.rollback()
-            print(f"Error deleting question: {str(e)}")
-            return False
-        finally:
-            session.close()
+        return self._changed(self.db.delete_question(test_name, question_text))
             
     def delete_test(self, test_name: str) -> bool:
         """Delete a test and all its questions"""
-        session = self.db.get_session()
-        try:
-            test = session.query(Test).filter(Test.name == test_name).first()
-            if test:
-                session.delete(test)
-                session.commit()
-                return True
-            return False
-        except Exception as e:
-            session.rollback()
-            print(f"Error deleting test: {str(e)}")
-            return False
-        finally:
-            session.close()
+        return self._changed(self.db.delete_test(test_name))
 
     def get_all_questions(self) -> List[str]:
         """Получает все вопросы из файла"""
@@ -147,10 +179,8 @@ class QuestionManager:
             print(f"Ошибка при сохранении вопросов: {str(e)}")
             raise
     
-    def get_random_questions(self, n: int) -> List[str]:
-        """Получает n случайных вопросов"""
-        questions = self.get_all_questions()
-        if not questions:
-            return []
-        n = min(n, len(questions))
-        return random.sample(questions, n) 
\ No newline at end of file
+    def get_random_questions(self, test_name: str, n: int, seed: Optional[int] = None,
+                             mode: str = SAMPLING_RANDOM) -> List[str]:
+        """Получает n случайных вопросов теста (random или stratified, воспроизводимо по seed)"""
+        rows = sample_questions(self.get_question_rows(test_name), n, seed, mode)
+        return [text for _, text in rows]
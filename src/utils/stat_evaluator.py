@@ -3,6 +3,86 @@ import numpy as np
 import pandas as pd
 from scipy import stats
 from typing import List, Tuple, Dict
+from src.database.aggregates import ScoreMoments, SCORE_LEVELS
+
+
+def moments_normaltest(n, sums) -> Tuple[np.ndarray, np.ndarray]:
+    """D'Agostino-Pearson K² test from counts and power sums Σx..Σx⁴.
+
+    Same statistic as scipy.stats.normaltest on the raw scores, vectorized over
+    the leading axis of n and sums.
+    """
+    n = np.asarray(n, dtype=np.float64)
+    sums = np.asarray(sums, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = sums[..., 0] / n
+        raw2, raw3, raw4 = sums[..., 1] / n, sums[..., 2] / n, sums[..., 3] / n
+        m2 = raw2 - mean ** 2
+        m3 = raw3 - 3 * mean * raw2 + 2 * mean ** 3
+        m4 = raw4 - 4 * mean * raw3 + 6 * mean ** 2 * raw2 - 3 * mean ** 4
+        skew = m3 / m2 ** 1.5
+        kurt = m4 / m2 ** 2
+
+        # Тест асимметрии (scipy.stats.skewtest)
+        y = skew * np.sqrt((n + 1) * (n + 3) / (6.0 * (n - 2)))
+        beta2 = 3.0 * (n ** 2 + 27 * n - 70) * (n + 1) * (n + 3) / ((n - 2.0) * (n + 5) * (n + 7) * (n + 9))
+        w2 = -1 + np.sqrt(2 * (beta2 - 1))
+        delta = 1 / np.sqrt(0.5 * np.log(w2))
+        alpha = np.sqrt(2.0 / (w2 - 1))
+        y = np.where(y == 0, 1, y)
+        z_skew = delta * np.log(y / alpha + np.sqrt((y / alpha) ** 2 + 1))
+
+        # Тест эксцесса (scipy.stats.kurtosistest)
+        expected = 3.0 * (n - 1) / (n + 1)
+        varb2 = 24.0 * n * (n - 2) * (n - 3) / ((n + 1) * (n + 1.0) * (n + 3) * (n + 5))
+        x = (kurt - expected) / np.sqrt(varb2)
+        sqrtbeta1 = 6.0 * (n * n - 5 * n + 2) / ((n + 7) * (n + 9)) * np.sqrt(6.0 * (n + 3) * (n + 5) / (n * (n - 2) * (n - 3)))
+        a = 6.0 + 8.0 / sqrtbeta1 * (2.0 / sqrtbeta1 + np.sqrt(1 + 4.0 / sqrtbeta1 ** 2))
+        term1 = 1 - 2 / (9.0 * a)
+        denom = 1 + x * np.sqrt(2 / (a - 4.0))
+        term2 = np.sign(denom) * np.where(denom == 0.0, np.nan, ((1 - 2.0 / a) / np.abs(denom)) ** (1 / 3.0))
+        z_kurt = (term1 - term2) / np.sqrt(2 / (9.0 * a))
+
+        statistic = z_skew ** 2 + z_kurt ** 2
+    return statistic, stats.chi2.sf(statistic, 2)
+
+
+def histogram_mannwhitney(hist1, hist2) -> Tuple[np.ndarray, np.ndarray]:
+    """Two-sided Mann-Whitney U test from score histograms over the same levels.
+
+    Uses midranks for ties and the tie-corrected normal approximation with
+    continuity correction, like scipy.stats.mannwhitneyu's asymptotic method.
+    Vectorized over all axes but the last.
+    """
+    hist1 = np.asarray(hist1, dtype=np.float64)
+    hist2 = np.asarray(hist2, dtype=np.float64)
+    n1 = hist1.sum(axis=-1)
+    n2 = hist2.sum(axis=-1)
+    ties = hist1 + hist2
+    n = n1 + n2
+    # Средний ранг каждого уровня оценки в объединённой выборке
+    ranks = np.cumsum(ties, axis=-1) - ties + (ties + 1) / 2
+    u1 = (hist1 * ranks).sum(axis=-1) - n1 * (n1 + 1) / 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        tie_term = (ties ** 3 - ties).sum(axis=-1) / (n * (n - 1))
+        sigma = np.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term))
+        u = np.maximum(u1, n1 * n2 - u1)
+        z = (u - n1 * n2 / 2 - 0.5) / sigma
+        p_value = np.clip(2 * stats.norm.sf(z), 0, 1)
+    return u1, p_value
+
+
+def _grouped_moments(groups: np.ndarray, scores: np.ndarray, mask: np.ndarray, size: int):
+    """Per-group ScoreMoments of the masked scores, groups being indices in range(size)"""
+    groups, scores = groups[mask], scores[mask]
+    n = np.bincount(groups, minlength=size)
+    sums = np.stack([np.bincount(groups, weights=scores ** power, minlength=size) for power in range(1, 5)], axis=1)
+    # Гистограмма строится только по целым оценкам 1..5
+    on_scale = np.isin(scores, SCORE_LEVELS)
+    cells = groups[on_scale] * len(SCORE_LEVELS) + (scores[on_scale].astype(np.int64) - 1)
+    hist = np.bincount(cells, minlength=size * len(SCORE_LEVELS)).reshape(size, len(SCORE_LEVELS))
+    return ScoreMoments(n=n, sums=sums, hist=hist)
+
 
 class StatEvaluator:
     def __init__(self):
@@ -67,6 +147,80 @@ class StatEvaluator:
         else:
             test_stat, p_value = 0.0, 1.0
         
+        return self._format_results(test_type, llm_mean, human_mean, llm_std, human_std, test_stat, p_value)
+
+    def evaluate_moments_batch(self, llm, human, question_ids=None) -> pd.DataFrame:
+        """Vectorized evaluate_moments over all groups of two ScoreMoments at once.
+
+        Returns one numeric row per group: sample sizes, means, population std,
+        the chosen test and its statistic/p-value (NaN for "descriptive").
+        Use format_result() to render a row the way evaluate_scores does.
+        """
+        llm_n = np.asarray(llm.n, dtype=np.float64)
+        human_n = np.asarray(human.n, dtype=np.float64)
+        llm_mean, human_mean = llm.mean, human.mean
+        llm_std, human_std = llm.std, human.std
+
+        enough = (llm_n >= self.min_samples) & (human_n >= self.min_samples)
+        _, llm_p = moments_normaltest(llm_n, llm.sums)
+        _, human_p = moments_normaltest(human_n, human.sums)
+        normal = (llm_p > 0.05) & (human_p > 0.05)
+        test_type = np.where(~enough, "descriptive", np.where(normal, "t-test", "mann-whitney"))
+
+        # ttest_ind с equal_var=True ожидает выборочное стандартное отклонение (ddof=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            t_stat, t_p = stats.ttest_ind_from_stats(
+                llm_mean, llm_std * np.sqrt(llm_n / (llm_n - 1)), llm_n,
+                human_mean, human_std * np.sqrt(human_n / (human_n - 1)), human_n
+            )
+        u_stat, u_p = histogram_mannwhitney(llm.hist, human.hist)
+        statistic = np.select([test_type == "t-test", test_type == "mann-whitney"], [t_stat, u_stat], np.nan)
+        p_value = np.select([test_type == "t-test", test_type == "mann-whitney"], [t_p, u_p], np.nan)
+
+        return pd.DataFrame({
+            'question_id': np.arange(len(llm_n)) if question_ids is None else np.asarray(question_ids),
+            'test': test_type,
+            'llm_n': llm_n.astype(np.int64),
+            'human_n': human_n.astype(np.int64),
+            'llm_mean': llm_mean,
+            'human_mean': human_mean,
+            'llm_std': llm_std,
+            'human_std': human_std,
+            'statistic': statistic,
+            'p_value': p_value,
+        })
+
+    def evaluate_batch(self, question_ids, raters, scores) -> pd.DataFrame:
+        """Evaluate all questions from long-format arrays in one vectorized pass.
+
+        question_ids, raters ("llm"/"human") and scores are parallel arrays with
+        one entry per score; rows with a NaN score are ignored. Returns the
+        numeric frame of evaluate_moments_batch, one row per question id.
+        """
+        question_ids = np.asarray(question_ids)
+        raters = np.asarray(raters)
+        scores = np.asarray(scores, dtype=np.float64)
+        keys, groups = np.unique(question_ids, return_inverse=True)
+        moments = {rater: _grouped_moments(groups, scores, (raters == rater) & ~np.isnan(scores), len(keys))
+                   for rater in ("llm", "human")}
+        return self.evaluate_moments_batch(moments["llm"], moments["human"], question_ids=keys)
+
+    def format_result(self, row) -> pd.DataFrame:
+        """Render one row of a batch frame in the layout of evaluate_scores"""
+        return self._format_results(row['test'], row['llm_mean'], row['human_mean'], row['llm_std'],
+                                    row['human_std'], row['statistic'], row['p_value'])
+
+    def evaluate_moments(self, llm, human) -> pd.DataFrame:
+        """Оценивает различия между оценками LLM и человека по агрегатам из БД.
+
+        llm and human are single-group ScoreMoments (see src.database.aggregates);
+        the result has the same layout as evaluate_scores.
+        """
+        return self.format_result(self.evaluate_moments_batch(llm, human).iloc[0])
+
+    def _format_results(self, test_type: str, llm_mean: float, human_mean: float, llm_std: float,
+                        human_std: float, test_stat: float, p_value: float) -> pd.DataFrame:
+        """Формирует таблицу с результатами"""
         # Формируем вывод
         conclusion = self._get_conclusion(test_type, p_value, llm_mean, human_mean)
         
@@ -0,0 +1,85 @@
+import unittest
+from datetime import datetime
+import numpy as np
+from scipy import stats
+from src.database.aggregates import paired_score_counts
+from src.database.db_handler import DBHandler
+from src.database.models import SurveyResult
+from src.utils.agreement import (
+    confusion_matrices, weighted_kappa, icc, spearman, kendall_tau, wilcoxon_signed_rank,
+    bootstrap_samples, bootstrap_ci, agreement_frame
+)
+
+
+class TestAgreement(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.llm = rng.integers(1, 6, 300).astype(float)
+        self.human = np.clip(self.llm + rng.integers(-1, 3, 300), 1, 5)
+        self.confusion = confusion_matrices(np.zeros(300, dtype=int), self.llm, self.human)
+
+    def test_matches_pairwise_formulas(self):
+        rho = stats.spearmanr(self.llm, self.human)
+        tau = stats.kendalltau(self.llm, self.human)
+        wilcoxon = stats.wilcoxon(self.llm, self.human)
+        np.testing.assert_allclose(spearman(self.confusion), [[rho.statistic], [rho.pvalue]])
+        np.testing.assert_allclose(kendall_tau(self.confusion), [[tau.statistic], [tau.pvalue]])
+        np.testing.assert_allclose(wilcoxon_signed_rank(self.confusion), [[wilcoxon.statistic], [wilcoxon.pvalue]])
+
+        # Квадратичная каппа и ICC(2,1) по определению
+        observed = self.confusion[0] / 300
+        weights = 1 - np.subtract.outer(np.arange(5), np.arange(5)) ** 2 / 16
+        expected = np.outer(observed.sum(axis=1), observed.sum(axis=0))
+        kappa = ((weights * observed).sum() - (weights * expected).sum()) / (1 - (weights * expected).sum())
+        self.assertAlmostEqual(weighted_kappa(self.confusion)[0], kappa)
+
+        scores = np.stack([self.llm, self.human], axis=1)
+        grand = scores.mean()
+        ms_rows = 2 * ((scores.mean(axis=1) - grand) ** 2).sum() / 299
+        ms_cols = 300 * ((scores.mean(axis=0) - grand) ** 2).sum()
+        residual = scores - scores.mean(axis=1, keepdims=True) - scores.mean(axis=0, keepdims=True) + grand
+        ms_error = (residual ** 2).sum() / 299
+        expected_icc = (ms_rows - ms_error) / (ms_rows + ms_error + 2 * (ms_cols - ms_error) / 300)
+        self.assertAlmostEqual(icc(self.confusion)[0], expected_icc)
+
+    def test_vectorized_over_groups(self):
+        groups = np.arange(300) % 3
+        confusion = confusion_matrices(groups, self.llm, self.human, size=4)
+        frame = agreement_frame(confusion, ['a', 'b', 'c', 'пусто'], n_boot=200)
+        self.assertEqual(frame['pairs'].tolist(), [100, 100, 100, 0])
+        for group in range(3):
+            mask = groups == group
+            self.assertAlmostEqual(frame['spearman'][group], stats.spearmanr(self.llm[mask], self.human[mask])[0])
+        self.assertTrue(np.isnan(frame['kappa'][3]))
+        self.assertTrue((frame['kappa_low'][:3] <= frame['kappa'][:3]).all())
+        self.assertTrue((frame['kappa'][:3] <= frame['kappa_high'][:3]).all())
+
+    def test_bootstrap_keeps_sample_size(self):
+        samples = bootstrap_samples(self.confusion, n_boot=50, seed=1)
+        self.assertEqual(samples.shape, (50, 1, 5, 5))
+        self.assertTrue((samples.sum(axis=(-2, -1)) == 300).all())
+        low, high = bootstrap_ci(samples, weighted_kappa)
+        self.assertLess(low[0], high[0])
+
+    def test_paired_counts_from_database(self):
+        db = DBHandler(db_url='sqlite:///:memory:')
+        db.create_test('Python')
+        for i, (llm_score, human_score) in enumerate(zip(self.llm, self.human)):
+            db.add_survey_result(SurveyResult(
+                test_name='Python', first_name='Иван', last_name='Иванов', question=f'Вопрос {i % 3}',
+                answer='Ответ', score=0, llm_score=llm_score, timestamp=datetime(2024, 1, 1),
+                # Ответы без человеческой оценки не должны попадать в пары
+                human_score=None if i % 7 == 0 else human_score
+            ))
+        paired = paired_score_counts(db, 'Python')
+        mask = np.arange(300) % 7 != 0
+        self.assertEqual(paired.labels, ['Вопрос 0', 'Вопрос 1', 'Вопрос 2'])
+        np.testing.assert_array_equal(
+            paired.overall().confusion,
+            confusion_matrices(np.zeros(mask.sum(), dtype=int), self.llm[mask], self.human[mask])
+        )
+        self.assertEqual(len(paired_score_counts(db, 'Python', by='test')), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from src.database.aggregates import rollup_scores
+from src.database.async_db_handler import AsyncDBHandler, async_url
+from src.database.db_handler import DBHandler
+from src.database.models import SurveyResult, EVALUATION_DONE
+
+
+class TestAsyncDBHandler(unittest.TestCase):
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.db = DBHandler(db_url=f'sqlite:///{self.db_path}')
+        self.db.create_test('Python')
+
+    def tearDown(self):
+        self.db.writer.stop()
+        self.db.engine.dispose()
+        os.remove(self.db_path)
+
+    def run_async(self, work, **options):
+        async def run():
+            db = AsyncDBHandler(f'sqlite:///{self.db_path}', **options)
+            try:
+                return await work(db)
+            finally:
+                await db.dispose()
+        return asyncio.run(run())
+
+    def test_async_url(self):
+        self.assertEqual(async_url('sqlite:///interview.db'), 'sqlite+aiosqlite:///interview.db')
+        self.assertEqual(async_url('postgresql+psycopg2://u:p@host/db'), 'postgresql+asyncpg://u:p@host/db')
+        with self.assertRaises(ValueError):
+            async_url('mysql://host/db')
+
+    def test_bulk_insert_keeps_rollups(self):
+        results = [SurveyResult(test_name='Python', first_name='Иван', last_name='Иванов', question=f'Вопрос {i % 3}',
+                                answer='Ответ', score=0, llm_score=i % 5 + 1, timestamp=datetime(2024, 1, 1))
+                   for i in range(30)]
+
+        async def work(db):
+            added = await db.add_survey_results(results)
+            return added, await db.count_survey_results('Python'), await db.get_all_tests()
+
+        self.assertEqual(self.run_async(work), (30, 30, ['Python']))
+        self.assertEqual(rollup_scores(self.db, 'Python').answers.sum(), 30)
+
+    def test_concurrent_answers_share_bounded_pool(self):
+        async def answer(db, i):
+            result_id = await db.save_pending_answer('Python', 'Иван', f'Иванов {i}', 'Вопрос', f'Ответ {i}')
+            return result_id
+
+        async def work(db):
+            result_ids = await asyncio.gather(*[answer(db, i) for i in range(40)])
+            completed = await db.complete_evaluations([(result_id, 4, 'Хорошо', EVALUATION_DONE)
+                                                       for result_id in result_ids])
+            results = await db.get_survey_results_by_ids(result_ids)
+            return completed, results, await db.get_pending_results(), db.engine.pool.size()
+
+        completed, results, pending, pool_size = self.run_async(work, pool_size=2, max_overflow=0)
+        self.assertEqual(completed, 40)
+        self.assertEqual([result.answer for result in results], [f'Ответ {i}' for i in range(40)])
+        self.assertEqual({result.llm_score for result in results}, {4})
+        self.assertEqual((pending, pool_size), ([], 2))
+        self.assertEqual(rollup_scores(self.db, 'Python').llm.n.sum(), 40)
+
+
+if __name__ == '__main__':
+    unittest.main()
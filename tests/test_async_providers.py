@@ -0,0 +1,31 @@
+import asyncio
+import threading
+import time
+import unittest
+from src.utils.async_providers import AsyncLLMMixin, AsyncLLMProvider, get_provider_pool
+
+
+class BlockingLLM(AsyncLLMMixin):
+    def __init__(self):
+        self.threads = set()
+
+    def generate_answer(self, prompt: str) -> str:
+        self.threads.add(threading.get_ident())
+        time.sleep(0.01)
+        return prompt.upper()
+
+
+class TestAsyncProviders(unittest.TestCase):
+    def test_blocking_adapter_runs_in_bounded_pool(self):
+        llm = BlockingLLM()
+        self.assertIsInstance(llm, AsyncLLMProvider)
+
+        async def run():
+            return await asyncio.gather(*[llm.agenerate_answer(f"q{i}") for i in range(50)])
+
+        self.assertEqual(asyncio.run(run()), [f"Q{i}" for i in range(50)])
+        self.assertLessEqual(len(llm.threads), get_provider_pool()._max_workers)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import io
+import unittest
+import wave
+from types import SimpleNamespace
+import numpy as np
+from src.utils.audio_buffer import AudioBuffer
+
+
+def make_wav(samples: np.ndarray, sample_rate: int = 16000, channels: int = 1) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(samples.astype('<i2').tobytes())
+    return buffer.getvalue()
+
+
+def make_av_frame(samples: np.ndarray, sample_rate: int, channels: int, planar: bool = False):
+    # Заменитель av.AudioFrame: packed-формат отдаёт (1, сэмплы * каналы), planar - (каналы, сэмплы)
+    interleaved = np.column_stack([samples] * channels)
+    array = interleaved.T.copy() if planar else interleaved.reshape(1, -1)
+    return SimpleNamespace(
+        to_ndarray=lambda: array, sample_rate=sample_rate,
+        format=SimpleNamespace(is_planar=planar), layout=SimpleNamespace(channels=[None] * channels)
+    )
+
+
+class TestAudioBuffer(unittest.TestCase):
+    def setUp(self):
+        self.samples = (np.sin(np.linspace(0, 20, 8000)) * 10000).astype(np.int16)
+
+    def test_wav_is_parsed_in_place(self):
+        data = bytearray(make_wav(self.samples, 22050))
+        audio = AudioBuffer.from_wav(data)
+        self.assertEqual(audio.sample_rate, 22050)
+        np.testing.assert_array_equal(audio.samples, self.samples)
+        # Сэмплы - вид на исходные байты, а не копия
+        self.assertTrue(np.shares_memory(audio.samples, np.frombuffer(data, dtype=np.uint8)))
+
+    def test_stereo_is_mixed_down(self):
+        stereo = np.column_stack([self.samples, self.samples]).reshape(-1)
+        audio = AudioBuffer.from_wav(make_wav(stereo, channels=2))
+        np.testing.assert_array_equal(audio.samples, self.samples)
+
+    def test_coerce(self):
+        pcm = self.samples.tobytes()
+        self.assertEqual(len(AudioBuffer.coerce(pcm)), len(self.samples))
+        self.assertEqual(AudioBuffer.coerce(make_wav(self.samples, 8000)).sample_rate, 8000)
+        audio = AudioBuffer.coerce(self.samples, sample_rate=44100)
+        self.assertTrue(np.shares_memory(audio.samples, self.samples))
+        self.assertIs(AudioBuffer.coerce(audio), audio)
+        with self.assertRaises(ValueError):
+            AudioBuffer.from_wav(b'RIFF\x00\x00\x00\x00WAVE')
+
+    def test_conversions(self):
+        audio = AudioBuffer(self.samples)
+        floats = audio.to_float32()
+        self.assertEqual(floats.dtype, np.float32)
+        self.assertLessEqual(np.abs(floats).max(), 1.0)
+        self.assertIs(audio.to_pcm16(), self.samples)
+        back = AudioBuffer(floats).to_pcm16()
+        self.assertLessEqual(np.abs(back.astype(int) - self.samples).max(), 1)
+
+    def test_resample(self):
+        audio = AudioBuffer(self.samples, 48000).resample(16000)
+        self.assertEqual(audio.sample_rate, 16000)
+        self.assertEqual(len(audio), round(len(self.samples) / 3))
+        self.assertEqual(audio.samples.dtype, np.int16)
+        self.assertAlmostEqual(audio.duration, 8000 / 48000, places=3)
+
+    def test_webrtc_frames_keep_their_rate_and_channels(self):
+        frames = [make_av_frame(self.samples[i:i + 960], 48000, 2) for i in range(0, len(self.samples), 960)]
+        audio = AudioBuffer.from_av_frames(frames)
+        self.assertEqual(audio.sample_rate, 48000)
+        np.testing.assert_array_equal(audio.samples, self.samples)
+        self.assertEqual(len(audio.resample(16000)), round(len(self.samples) / 3))
+
+        planar = AudioBuffer.from_av_frames([make_av_frame(self.samples, 44100, 2, planar=True)])
+        np.testing.assert_array_equal(planar.samples, self.samples)
+
+    def test_pcm16_chunks(self):
+        audio = AudioBuffer.from_frames([self.samples[:5000].tobytes(), self.samples[5000:]])
+        chunks = list(audio.pcm16_chunks(3000))
+        self.assertEqual([len(chunk) for chunk in chunks], [6000, 6000, 4000])
+        self.assertEqual(b''.join(chunks), self.samples.tobytes())
+
+
+if __name__ == '__main__':
+    unittest.main()
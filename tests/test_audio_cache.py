@@ -0,0 +1,102 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+from src.tts.audio_cache import AudioCache
+from src.tts.prerender import QuestionAudioPrerenderer
+
+
+class TestAudioCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.calls = 0
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def synth(self, text):
+        def run():
+            self.calls += 1
+            return f"audio:{text}".encode() * 100
+        return run
+
+    def test_hit_does_not_synthesize(self):
+        cache = AudioCache(self.tmp.name)
+        first = cache.get_or_synthesize('edge', 'ru-RU-DmitryNeural', 'Вопрос 1', self.synth('Вопрос 1'))
+        # Новый экземпляр кэша (другой процесс) читает тот же файл с диска
+        second = AudioCache(self.tmp.name).get_or_synthesize(
+            'edge', 'ru-RU-DmitryNeural', 'Вопрос 1', self.synth('Вопрос 1'))
+        self.assertEqual(first, second)
+        self.assertEqual(self.calls, 1)
+        self.assertIsNone(cache.get('edge', 'other-voice', 'Вопрос 1'))
+
+    def test_failed_synthesis_is_not_cached(self):
+        cache = AudioCache(self.tmp.name)
+        self.assertEqual(cache.get_or_synthesize('edge', 'v', 'q', lambda: b""), b"")
+        self.assertIsNone(cache.get('edge', 'v', 'q'))
+
+    def test_size_bounded_lru_eviction(self):
+        cache = AudioCache(self.tmp.name, max_bytes=2500, memory_max_bytes=0)
+        for i in range(3):
+            cache.put('edge', 'v', f'q{i}', b'x' * 1000)
+            time.sleep(0.01)
+        self.assertIsNone(cache.get('edge', 'v', 'q0'))
+        self.assertIsNotNone(cache.get('edge', 'v', 'q2'))
+        leftovers = [n for _, _, names in os.walk(self.tmp.name) for n in names if n.endswith('.tmp')]
+        self.assertEqual(leftovers, [])
+
+    def test_overwrite_does_not_inflate_disk_size(self):
+        cache = AudioCache(self.tmp.name, max_bytes=2500, memory_max_bytes=0)
+        cache.put('edge', 'v', 'q0', b'x' * 1000)
+        with mock.patch.object(cache, '_evict', wraps=cache._evict) as evict:
+            for _ in range(3):
+                cache.put('edge', 'v', 'q1', b'y' * 1000)
+        self.assertEqual(cache._disk_bytes, 2000)
+        # Кэш в пределах бюджета: обход каталога для вытеснения не нужен
+        evict.assert_not_called()
+        self.assertIsNotNone(cache.get('edge', 'v', 'q0'))
+
+    def test_invalidate(self):
+        cache = AudioCache(self.tmp.name)
+        cache.put('edge', 'v', 'q', b'data')
+        cache.invalidate('edge', 'v', 'q')
+        self.assertIsNone(cache.get('edge', 'v', 'q'))
+
+
+class FakeTTS:
+    PROVIDER = 'fake'
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.cache_voice = 'voice'
+        self.synthesized = []
+
+    def text_to_speech(self, text):
+        return self.cache.get_or_synthesize(self.PROVIDER, self.cache_voice, text, lambda: self._synth(text))
+
+    def _synth(self, text):
+        self.synthesized.append(text)
+        return b'' if text == 'broken' else text.encode()
+
+
+class TestQuestionAudioPrerenderer(unittest.TestCase):
+    def test_prerender_and_invalidate(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tts = FakeTTS(AudioCache(tmp))
+            prerenderer = QuestionAudioPrerenderer(tts)
+            prerenderer.schedule('Тест', ['q1', 'q2', 'broken']).result(timeout=5)
+            progress = prerenderer.progress('Тест')
+            self.assertEqual((progress.total, progress.done, progress.failed, progress.running), (3, 2, 1, False))
+            self.assertTrue(prerenderer.is_rendered('q1'))
+
+            # Отредактированный вопрос: старое аудио удаляется, новое озвучивается, остальные берутся из кэша
+            prerenderer.invalidate('q2')
+            prerenderer.schedule('Тест', ['q1', 'q2 edited']).result(timeout=5)
+            self.assertFalse(prerenderer.is_rendered('q2'))
+            self.assertEqual(tts.synthesized, ['q1', 'q2', 'broken', 'q2 edited'])
+            prerenderer.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,27 @@
+import csv
+import gzip
+import io
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
 import unittest
+import numpy as np
+import pandas as pd
+from scipy import stats
+from sqlalchemy import event, exc, inspect, text
+from datetime import datetime, timedelta
 from src.database.db_handler import DBHandler
+from src.database.models import SurveyResult
+from src.database.aggregates import ScoreMoments, aggregate_scores, rollup_scores
+from src.database.export import EXPORT_COLUMNS, export_results, main as export_main
+from src.database.rollups import rebuild_rollups
+from src.database.migrations import CURRENT_VERSION, get_schema_version
+from src.database.writer import GroupCommitWriter, DURABILITY_BATCHED
+from src.database.engines import PoolSettings, create_db_engine, pool_status
+from src.utils.stat_evaluator import StatEvaluator, moments_normaltest, histogram_mannwhitney
 
 class TestDatabase(unittest.TestCase):
     def test_db_save(self):
@@ -17,5 +39,473 @@ class TestDatabase(unittest.TestCase):
         except:
             self.fail("Database save failed.")
 
+
+BASELINE_SCHEMA = [
+    "CREATE TABLE tests (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL UNIQUE)",
+    "CREATE TABLE questions (id INTEGER PRIMARY KEY, test_id INTEGER REFERENCES tests(id), text VARCHAR NOT NULL)",
+    """CREATE TABLE survey_results (
+        id INTEGER PRIMARY KEY, first_name VARCHAR(50), last_name VARCHAR(50),
+        test_name VARCHAR NOT NULL, question VARCHAR NOT NULL, answer VARCHAR NOT NULL,
+        score INTEGER NOT NULL, feedback VARCHAR, timestamp DATETIME, llm_score FLOAT, human_score FLOAT)""",
+    "INSERT INTO tests (id, name) VALUES (1, 'Python')",
+    "INSERT INTO questions (id, test_id, text) VALUES (1, 1, 'Что такое GIL?')",
+    """INSERT INTO survey_results (first_name, last_name, test_name, question, answer, score, llm_score)
+       VALUES ('Иван', 'Иванов', 'Python', 'Что такое GIL?', 'Блокировка', 4, 4),
+              ('Иван', 'Иванов', 'Python', 'Удалённый вопрос', 'Ответ', 3, 3),
+              ('Анна', 'Петрова', 'Удалённый тест', 'Вопрос', 'Ответ', 5, 5),
+              ('Анна', 'Петрова', 'Удалённый тест', 'Оценён вручную', 'Ответ', 2, 5)""",
+]
+
+
+class TestMigrations(unittest.TestCase):
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        conn = sqlite3.connect(self.db_path)
+        for statement in BASELINE_SCHEMA:
+            conn.execute(statement)
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        os.remove(self.db_path)
+
+    def test_baseline_database_is_migrated(self):
+        db = DBHandler(db_url=f'sqlite:///{self.db_path}')
+        with db.engine.connect() as conn:
+            self.assertEqual(get_schema_version(conn), CURRENT_VERSION)
+            indexes = {index['name'] for index in inspect(conn).get_indexes('survey_results')}
+        db.engine.dispose()
+        self.assertTrue({'ix_survey_results_test_timestamp', 'ix_survey_results_question',
+                         'ix_survey_results_interview'} <= indexes)
+
+        results = {r.question: r for r in db.get_all_survey_results()}
+        self.assertEqual((results['Что такое GIL?'].test_id, results['Что такое GIL?'].question_id), (1, 1))
+        self.assertEqual((results['Удалённый вопрос'].test_id, results['Удалённый вопрос'].question_id), (1, None))
+        self.assertIsNone(results['Вопрос'].test_id)
+        self.assertEqual(results['Что такое GIL?'].candidate_id, results['Удалённый вопрос'].candidate_id)
+        self.assertEqual(len(db.get_survey_results('Python')), 2)
+        self.assertEqual(rollup_scores(db, 'Python').answers.sum(), 2)
+        # Ручная оценка старой вкладки из score переезжает в human_score
+        self.assertEqual(results['Оценён вручную'].human_score, 2)
+        self.assertIsNone(results['Вопрос'].human_score)
+        db.engine.dispose()
+
+        # Повторный запуск миграций ничего не меняет
+        DBHandler(db_url=f'sqlite:///{self.db_path}').engine.dispose()
+
+    def test_rescoring_answers_without_timestamp(self):
+        db = DBHandler(db_url=f'sqlite:///{self.db_path}')
+        results = {r.question: r.id for r in db.get_all_survey_results()}
+        self.assertTrue(db.update_human_score(results['Что такое GIL?'], 5))
+        self.assertTrue(db.complete_evaluation(results['Удалённый вопрос'], 2, 'Слабо'))
+        self.assertEqual(db.save_human_scores({results['Вопрос']: 4}), 1)
+        self.assertEqual(rollup_scores(db, 'Python').human.n.sum(), 1)
+        with db.engine.connect() as conn:
+            days = conn.execute(text("SELECT DISTINCT day FROM score_rollups")).scalars().all()
+        self.assertEqual(days, ['1970-01-01'])
+        db.engine.dispose()
+
+
+def add_results(db, test_name, count, start=datetime(2024, 1, 1), **fields):
+    for i in range(count):
+        db.add_survey_result(SurveyResult(
+            test_name=test_name, first_name='Иван', last_name='Иванов', question=f'Вопрос {i % 3}',
+            answer=f'Ответ {i}', score=0, llm_score=fields.get('llm_score', i % 5 + 1),
+            human_score=fields.get('human_score'),
+            # Часть ответов с одинаковым временем, чтобы проверить курсор по (timestamp, id)
+            timestamp=start + timedelta(minutes=i // 2)
+        ))
+
+
+class TestResultQueries(unittest.TestCase):
+    def setUp(self):
+        self.db = DBHandler(db_url='sqlite:///:memory:')
+        self.db.create_test('Python')
+        self.db.create_test('SQL')
+        add_results(self.db, 'Python', 7)
+        add_results(self.db, 'SQL', 2)
+
+    def test_keyset_pagination(self):
+        seen, cursor = [], None
+        while True:
+            page = self.db.query_survey_results('Python', columns=['answer'], cursor=cursor, limit=3)
+            self.assertTrue(all(set(row) == {'answer'} for row in page.rows))
+            seen.extend(row['answer'] for row in page.rows)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(seen, [f'Ответ {i}' for i in reversed(range(7))])
+        self.assertEqual(self.db.count_survey_results('Python'), 7)
+        self.assertEqual(self.db.count_survey_results('Нет такого'), 0)
+
+    def test_filters(self):
+        page = self.db.query_survey_results('Python', since=datetime(2024, 1, 1, 0, 2), limit=None)
+        self.assertEqual(len(page.rows), 3)
+        self.assertIsNone(page.next_cursor)
+        self.assertEqual(len(self.db.query_survey_results(limit=None).rows), 9)
+
+    def test_pagination_reaches_rows_without_timestamp(self):
+        with self.db.engine.begin() as conn:
+            conn.execute(text("UPDATE survey_results SET timestamp = NULL WHERE answer IN ('Ответ 1', 'Ответ 4')"))
+        seen, cursor = [], None
+        while True:
+            page = self.db.query_survey_results('Python', columns=['answer'], cursor=cursor, limit=2)
+            seen.extend(row['answer'] for row in page.rows)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(seen, ['Ответ 6', 'Ответ 5', 'Ответ 3', 'Ответ 2', 'Ответ 0', 'Ответ 4', 'Ответ 1'])
+
+    def test_new_test_does_not_inherit_deleted_ids(self):
+        self.assertTrue(self.db.delete_test('SQL'))
+        self.assertTrue(self.db.create_test('Go'))
+        self.assertNotEqual(self.db.get_test_id('Go'), 2)
+        self.assertEqual(self.db.get_survey_results('Go'), [])
+        self.assertEqual(rollup_scores(self.db, 'Go').answers.sum(), 0)
+
+
+class TestGradingQueue(unittest.TestCase):
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.db = DBHandler(db_url=f'sqlite:///{self.db_path}')
+        self.db.create_test('Python')
+        add_results(self.db, 'Python', 9)
+        self.db.save_pending_answer('Python', 'Пётр', 'Петров', 'Вопрос 0', 'Ещё не оценён LLM')
+
+    def tearDown(self):
+        self.db.engine.dispose()
+        os.remove(self.db_path)
+
+    def test_graders_get_disjoint_batches(self):
+        self.assertEqual(self.db.count_ungraded('Python'), 9)
+        first = self.db.next_ungraded('Python', 'anna', limit=4)
+        second = self.db.next_ungraded('Python', 'boris', limit=4)
+        self.assertEqual(len(first), 4)
+        self.assertEqual(len(second), 4)
+        self.assertFalse({r['id'] for r in first} & {r['id'] for r in second})
+        # Повторный запрос возвращает свои же ответы
+        self.assertEqual(self.db.next_ungraded('Python', 'anna', limit=4), first)
+
+        self.assertEqual(self.db.release_claims('boris'), 4)
+        third = self.db.next_ungraded('Python', 'vera', limit=10)
+        self.assertEqual(len(third), 5)
+
+    def test_expired_lease_is_reclaimed(self):
+        stale = self.db.next_ungraded('Python', 'anna', limit=3, lease_seconds=-1)
+        fresh = self.db.next_ungraded('Python', 'boris', limit=3)
+        self.assertEqual([r['id'] for r in stale], [r['id'] for r in fresh])
+
+    def test_batch_save(self):
+        batch = self.db.next_ungraded('Python', 'anna', limit=5)
+        other = self.db.next_ungraded('Python', 'boris', limit=1)
+        scores = {result['id']: 4 for result in batch}
+        scores[other[0]['id']] = 1
+        self.assertEqual(self.db.save_human_scores(scores, grader='anna'), 5)
+        self.assertEqual(self.db.count_ungraded('Python'), 4)
+        saved = self.db.get_survey_results_by_ids(list(scores))
+        self.assertEqual([r.human_score for r in saved], [4.0] * 5 + [None])
+        self.assertTrue(all(r.claimed_by is None for r in saved[:5]))
+        self.assertEqual(rollup_scores(self.db, 'Python').human.n.sum(), 5)
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.db = DBHandler(db_url=f'sqlite:///{self.db_path}')
+        self.db.create_test('Python')
+        self.db.create_test('SQL')
+        add_results(self.db, 'Python', 7)
+        add_results(self.db, 'SQL', 3)
+
+    def tearDown(self):
+        self.db.engine.dispose()
+        os.remove(self.db_path)
+
+    def test_csv_in_chunks(self):
+        output = io.BytesIO()
+        count = export_results(self.db, output, 'csv', test_name='Python', chunk_size=2)
+        rows = list(csv.reader(io.StringIO(output.getvalue().decode('utf-8'))))
+        self.assertEqual(count, 7)
+        self.assertEqual(rows[0], list(EXPORT_COLUMNS))
+        self.assertEqual(len(rows), 8)
+        self.assertEqual({row[1] for row in rows[1:]}, {'Python'})
+        self.assertFalse(output.closed)
+
+    def test_gzip_csv(self):
+        output = io.BytesIO()
+        count = export_results(self.db, output, 'csv.gz', since=datetime(2024, 1, 1, 0, 2))
+        text = gzip.decompress(output.getvalue()).decode('utf-8')
+        self.assertEqual(count, 3)
+        self.assertEqual(len(text.splitlines()), 4)
+
+    def test_parquet(self):
+        import pyarrow.parquet as pq
+        output = io.BytesIO()
+        count = export_results(self.db, output, 'parquet', chunk_size=4)
+        table = pq.read_table(io.BytesIO(output.getvalue()))
+        self.assertEqual(count, 10)
+        self.assertEqual(table.num_rows, 10)
+        self.assertEqual(table.column_names, list(EXPORT_COLUMNS))
+
+    def test_cli(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'results.csv')
+            code = export_main(['--db-url', f'sqlite:///{self.db_path}', '--test', 'SQL', '-o', path])
+            with open(path, encoding='utf-8') as f:
+                self.assertEqual(len(f.read().splitlines()), 4)
+        self.assertEqual(code, 0)
+
+
+
+class TestAggregates(unittest.TestCase):
+    def setUp(self):
+        self.db = DBHandler(db_url='sqlite:///:memory:')
+        self.db.create_test('Python')
+        self.db.create_test('SQL')
+        rng = np.random.default_rng(0)
+        self.llm = rng.integers(1, 6, 60)
+        self.human = np.clip(self.llm + rng.integers(-1, 2, 60), 1, 5)
+        for i, (llm_score, human_score) in enumerate(zip(self.llm, self.human)):
+            add_results(self.db, 'Python', 1, start=datetime(2024, 1, 1) + timedelta(days=i),
+                        llm_score=float(llm_score), human_score=None if i % 10 == 0 else float(human_score))
+        add_results(self.db, 'SQL', 5)
+
+    def test_group_by_question(self):
+        aggregates = aggregate_scores(self.db, 'Python')
+        self.assertEqual(aggregates.questions, ['Вопрос 0'])
+        self.assertEqual(aggregates.answers.tolist(), [60])
+        human = self.human[np.arange(60) % 10 != 0]
+        self.assertEqual(aggregates.human.n.tolist(), [len(human)])
+        self.assertAlmostEqual(aggregates.llm.mean[0], self.llm.mean())
+        self.assertAlmostEqual(aggregates.human.var[0], human.var())
+        self.assertEqual(aggregates.llm.hist[0].tolist(), np.bincount(self.llm, minlength=6)[1:].tolist())
+
+        recent = aggregate_scores(self.db, 'Python', since=datetime(2024, 1, 1) + timedelta(days=50))
+        self.assertEqual(recent.answers.tolist(), [10])
+        self.assertEqual(len(aggregate_scores(self.db, 'SQL')), 3)
+        self.assertEqual(len(aggregate_scores(self.db, 'Нет такого')), 0)
+
+    def assertAggregatesEqual(self, first, second):
+        self.assertEqual(first.questions, second.questions)
+        self.assertEqual(first.answers.tolist(), second.answers.tolist())
+        for rater in ('llm', 'human'):
+            self.assertEqual(getattr(first, rater).n.tolist(), getattr(second, rater).n.tolist())
+            np.testing.assert_allclose(getattr(first, rater).sums, getattr(second, rater).sums)
+            self.assertEqual(getattr(first, rater).hist.tolist(), getattr(second, rater).hist.tolist())
+
+    def test_rollups_follow_writes(self):
+        result_id = self.db.save_pending_answer('SQL', 'Пётр', 'Петров', 'Вопрос 1', 'Ответ')
+        self.db.complete_evaluation(result_id, 4, 'Хорошо')
+        self.db.update_human_score(result_id, 2)
+        self.db.update_human_score(result_id, 3)
+        for test_name in ('Python', 'SQL'):
+            self.assertAggregatesEqual(rollup_scores(self.db, test_name), aggregate_scores(self.db, test_name))
+        since = datetime(2024, 1, 1) + timedelta(days=50)
+        self.assertAggregatesEqual(rollup_scores(self.db, 'Python', since), aggregate_scores(self.db, 'Python', since))
+
+        with self.db.engine.begin() as conn:
+            rebuild_rollups(conn)
+        self.assertAggregatesEqual(rollup_scores(self.db, 'SQL'), aggregate_scores(self.db, 'SQL'))
+
+    def test_catalog_deletes_unlink_answers(self):
+        self.db.add_question_to_test('SQL', 'Вопрос 1')
+        add_results(self.db, 'SQL', 3)
+        self.assertTrue(self.db.delete_question('SQL', 'Вопрос 1'))
+        self.assertFalse(any(r.question_id for r in self.db.get_survey_results('SQL')))
+        self.assertAggregatesEqual(rollup_scores(self.db, 'SQL'), aggregate_scores(self.db, 'SQL'))
+
+        self.assertTrue(self.db.delete_test('SQL'))
+        self.assertEqual(self.db.count_survey_results('SQL'), 0)
+        self.assertTrue(self.db.create_test('SQL'))
+        self.assertEqual(rollup_scores(self.db, 'SQL').answers.sum(), 0)
+        # Агрегаты удалённого теста не теряются, а совпадают с пересчитанными с нуля
+        with self.db.engine.connect() as conn:
+            before = conn.execute(text("SELECT test_id, question_id, question, day, rater, answers, n, s1, h1 "
+                                       "FROM score_rollups ORDER BY 1, 2, 3, 4, 5")).all()
+        with self.db.engine.begin() as conn:
+            rebuild_rollups(conn)
+        with self.db.engine.connect() as conn:
+            after = conn.execute(text("SELECT test_id, question_id, question, day, rater, answers, n, s1, h1 "
+                                      "FROM score_rollups ORDER BY 1, 2, 3, 4, 5")).all()
+        self.assertEqual(before, after)
+
+    def test_moments_match_raw_scores(self):
+        aggregates = aggregate_scores(self.db, 'Python').overall()
+        human = self.human[np.arange(60) % 10 != 0]
+        evaluator = StatEvaluator()
+        pd.testing.assert_frame_equal(
+            evaluator.evaluate_moments(aggregates.llm, aggregates.human),
+            evaluator.evaluate_scores(self.llm, human)
+        )
+        statistic, p_value = moments_normaltest(aggregates.llm.n, aggregates.llm.sums)
+        expected = stats.normaltest(self.llm)
+        self.assertAlmostEqual(statistic[0], expected.statistic)
+        self.assertAlmostEqual(p_value[0], expected.pvalue)
+        u, p_value = histogram_mannwhitney(aggregates.llm.hist[0], aggregates.human.hist[0])
+        expected = stats.mannwhitneyu(self.llm, human, alternative='two-sided')
+        self.assertAlmostEqual(u, expected.statistic)
+        self.assertAlmostEqual(p_value, expected.pvalue)
+
+    def test_t_test_from_moments(self):
+        rng = np.random.default_rng(1)
+        llm = np.round(rng.normal(3, 0.8, 200)).clip(1, 5)
+        human = np.round(rng.normal(3.2, 0.8, 200)).clip(1, 5)
+
+        def moments(scores):
+            return ScoreMoments(
+                n=np.array([len(scores)]),
+                sums=np.array([[np.sum(scores ** p) for p in range(1, 5)]]),
+                hist=np.bincount(scores.astype(int), minlength=6)[1:][None, :]
+            )
+
+        evaluator = StatEvaluator()
+        expected = evaluator.evaluate_scores(llm, human)
+        self.assertEqual(expected['Значение'][0], 't-test')
+        pd.testing.assert_frame_equal(evaluator.evaluate_moments(moments(llm), moments(human)), expected)
+
+
+class TestSqliteWrites(unittest.TestCase):
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.db = DBHandler(db_url=f'sqlite:///{self.db_path}')
+        self.db.create_test('Python')
+
+    def tearDown(self):
+        self.db.writer.stop()
+        self.db.engine.dispose()
+        os.remove(self.db_path)
+
+    def test_pragmas_on_connect(self):
+        with self.db.engine.connect() as conn:
+            self.assertEqual(conn.execute(text("PRAGMA journal_mode")).scalar(), 'wal')
+            self.assertEqual(conn.execute(text("PRAGMA synchronous")).scalar(), 1)  # NORMAL
+            self.assertEqual(conn.execute(text("PRAGMA busy_timeout")).scalar(), 5000)
+        self.assertIsNone(DBHandler(db_url='sqlite:///:memory:').writer)
+
+    def test_concurrent_inserts_are_group_committed(self):
+        commits = []
+        event.listen(self.db.engine, 'commit', lambda conn: commits.append(1))
+        barrier = threading.Barrier(20)
+
+        def session(worker):
+            barrier.wait()
+            for i in range(10):
+                self.assertTrue(self.db.add_survey_result(SurveyResult(
+                    test_name='Python', first_name='Иван', last_name=f'Иванов {worker}', question=f'Вопрос {i % 3}',
+                    answer='Ответ', score=0, llm_score=i % 5 + 1, timestamp=datetime(2024, 1, 1)
+                )))
+
+        threads = [threading.Thread(target=session, args=(worker,)) for worker in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.db.count_survey_results('Python'), 200)
+        self.assertEqual(rollup_scores(self.db, 'Python').answers.sum(), 200)
+        self.assertLess(len(commits), 200)
+
+    def test_batched_durability(self):
+        result = SurveyResult(test_name='Python', first_name='Иван', last_name='Иванов', question='Вопрос',
+                              answer='Ответ', score=0, llm_score=4)
+        self.assertTrue(self.db.add_survey_result(result, durability=DURABILITY_BATCHED))
+        self.db.writer.flush()
+        self.assertEqual(self.db.count_survey_results('Python'), 1)
+
+    def test_batched_writes_are_flushed_at_exit(self):
+        script = (
+            "from src.database.db_handler import DBHandler\n"
+            "from src.database.models import SurveyResult\n"
+            "from src.database.writer import DURABILITY_BATCHED\n"
+            f"db = DBHandler(db_url='sqlite:///{self.db_path}')\n"
+            "db.writer.max_delay = 60\n"
+            "for i in range(5):\n"
+            "    db.add_survey_result(SurveyResult(test_name='Python', question='В', answer=str(i), score=0),\n"
+            "                         durability=DURABILITY_BATCHED)\n"
+        )
+        subprocess.run([sys.executable, '-c', script], check=True, timeout=60,
+                       cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        self.assertEqual(self.db.count_survey_results('Python'), 5)
+
+    def test_failed_write_only_fails_itself(self):
+        writer = GroupCommitWriter(self.db.Session.session_factory)
+
+        def broken(session):
+            raise ValueError("Неверная запись")
+
+        futures = [writer.submit(lambda session: session.execute(text("SELECT 1")).scalar(), DURABILITY_BATCHED),
+                   writer.submit(broken, DURABILITY_BATCHED),
+                   writer.submit(lambda session: 2)]
+        self.assertEqual(futures[0].result(5), 1)
+        with self.assertRaises(ValueError):
+            futures[1].result(5)
+        self.assertEqual(futures[2].result(5), 2)
+        writer.stop()
+
+
+class TestReadReplica(unittest.TestCase):
+    def setUp(self):
+        self.paths = []
+        for _ in range(2):
+            fd, path = tempfile.mkstemp(suffix='.db')
+            os.close(fd)
+            self.paths.append(path)
+        primary, replica = self.paths
+        seed = DBHandler(db_url=f'sqlite:///{primary}')
+        seed.create_test('Python')
+        add_results(seed, 'Python', 4)
+        seed.writer.stop()
+        seed.engine.dispose()
+        # Копия базы играет роль реплики на момент репликации
+        source, target = sqlite3.connect(primary), sqlite3.connect(replica)
+        source.backup(target)
+        source.close()
+        target.close()
+        self.db = DBHandler(db_url=f'sqlite:///{primary}', replica_url=f'sqlite:///{replica}')
+
+    def tearDown(self):
+        self.db.writer.stop()
+        self.db.engine.dispose()
+        self.db.read_engine.dispose()
+        for path in self.paths:
+            os.remove(path)
+
+    def test_analytics_reads_go_to_replica(self):
+        result_id = self.db.save_pending_answer('Python', 'Пётр', 'Петров', 'Вопрос 0', 'Ответ')
+        # Кандидат видит свой ответ сразу, аналитика - после репликации
+        self.assertEqual([r.id for r in self.db.get_survey_results_by_ids([result_id])], [result_id])
+        self.assertEqual(self.db.count_survey_results('Python'), 4)
+        self.assertEqual(len(self.db.get_survey_results('Python')), 4)
+        self.assertEqual(rollup_scores(self.db, 'Python').answers.sum(), 4)
+        output = io.BytesIO()
+        self.assertEqual(export_results(self.db, output, 'csv'), 4)
+
+        with self.assertRaises(exc.OperationalError):
+            with self.db.read_engine.begin() as conn:
+                conn.execute(text("DELETE FROM survey_results"))
+
+        metrics = self.db.pool_metrics()
+        self.assertGreater(metrics['primary']['checkouts'], 0)
+        self.assertGreater(metrics['replica']['checkouts'], 0)
+
+    def test_checkout_wait_metrics(self):
+        engine = create_db_engine(f'sqlite:///{self.paths[1]}',
+                                  PoolSettings(pool_size=1, max_overflow=0, pool_timeout=0.1))
+        try:
+            with engine.connect():
+                with self.assertRaises(exc.TimeoutError):
+                    engine.connect()
+            status = pool_status(engine)
+            self.assertEqual((status['size'], status['checkouts'], status['timeouts']), (1, 1, 1))
+            self.assertGreaterEqual(status['wait_max'], 0.1)
+            engine.dispose()
+            self.assertEqual(pool_status(engine)['timeouts'], 1)
+        finally:
+            engine.dispose()
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,89 @@
+import asyncio
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.llm.api_llm import API_LLM
+from src.llm.gigachat_llm import GigachatLLM
+from src.tts.api_tts import API_TTS
+from src.utils.http_transport import HTTPTransport, AsyncHTTPTransport
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        with server.lock:
+            server.requests.append(json.loads(body or b'{}'))
+            server.client_ports.add(self.client_address[1])
+            status = server.statuses.pop(0) if server.statuses else 200
+        payload = json.dumps({"text": "stub answer", "answer": "stub answer"}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestHTTPTransport(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.client_ports = set()
+        self.server.statuses = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/generate"
+        self.transport = HTTPTransport(connect_timeout=1, read_timeout=2, pool_maxsize=2, backoff_base=0.001)
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connections_are_reused(self):
+        llm = API_LLM(self.url, "key", transport=self.transport)
+        for _ in range(5):
+            self.assertEqual(llm.generate_answer("Привет"), "stub answer")
+        self.assertEqual(len(self.server.requests), 5)
+        self.assertEqual(len(self.server.client_ports), 1)
+
+    def test_retries_on_429_and_5xx(self):
+        self.server.statuses = [429, 503]
+        llm = GigachatLLM(self.url, "key", transport=self.transport)
+        self.assertEqual(llm.generate_answer("Привет"), "stub answer")
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_gives_up_after_max_retries(self):
+        self.server.statuses = [500] * 10
+        response = self.transport.post(self.url, json={})
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(len(self.server.requests), self.transport.max_retries + 1)
+
+    def test_async_adapters_share_pooled_clients(self):
+        async_transport = AsyncHTTPTransport(connect_timeout=1, read_timeout=2, pool_maxsize=2,
+                                             backoff_base=0.001)
+        llm = API_LLM(self.url, "key", transport=self.transport, async_transport=async_transport)
+        tts = API_TTS(self.url, "key", transport=self.transport, async_transport=async_transport)
+        self.server.statuses = [503]
+
+        async def run():
+            answers = await asyncio.gather(*[llm.agenerate_answer(f"Вопрос {i}") for i in range(20)])
+            audio = await tts.asynthesize("Привет")
+            await async_transport.aclose()
+            return answers, audio
+
+        answers, audio = asyncio.run(run())
+        self.assertEqual(answers, ["stub answer"] * 20)
+        self.assertTrue(audio.startswith(b'{"text"'))
+        self.assertEqual(len(self.server.requests), 22)
+        self.assertLessEqual(len(self.server.client_ports), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from sqlalchemy import event
+from src.database.db_handler import DBHandler
+from src.database.models import SurveyResult
+from src.utils.interview_session import (
+    InterviewSession, sample_questions, sampling_from_env, SAMPLING_ALL, SAMPLING_STRATIFIED
+)
+from src.utils.question_manager import QuestionManager
+
+
+class TestSampling(unittest.TestCase):
+    def setUp(self):
+        self.rows = [(i, f'Вопрос {i}') for i in range(1, 21)]
+
+    def test_seed_is_reproducible(self):
+        sample = sample_questions(self.rows, 5, seed=7)
+        self.assertEqual(len(set(sample)), 5)
+        self.assertEqual(sample_questions(list(reversed(self.rows)), 5, seed=7), sample)
+        self.assertEqual(len(sample_questions(self.rows, 50, seed=7)), 20)
+
+    def test_stratified_covers_the_bank(self):
+        sample = sample_questions(self.rows, 4, seed=3, mode=SAMPLING_STRATIFIED)
+        self.assertEqual([question_id for question_id, _ in sample], sorted(question_id for question_id, _ in sample))
+        # По одному вопросу из каждой пятёрки
+        self.assertEqual([(question_id - 1) // 5 for question_id, _ in sample], [0, 1, 2, 3])
+        with self.assertRaises(ValueError):
+            sample_questions(self.rows, 4, mode='shuffle')
+
+    def test_invalid_env_settings_fall_back(self):
+        with mock.patch.dict(os.environ, {'INTERVIEW_QUESTIONS': '5', 'INTERVIEW_SAMPLING': 'stratified'}):
+            self.assertEqual(sampling_from_env(), (5, SAMPLING_STRATIFIED))
+        with mock.patch.dict(os.environ, {'INTERVIEW_QUESTIONS': 'пять', 'INTERVIEW_SAMPLING': 'shuffle'}):
+            self.assertEqual(sampling_from_env(), (0, SAMPLING_ALL))
+
+
+class TestInterviewSession(unittest.TestCase):
+    def setUp(self):
+        self.db = DBHandler(db_url='sqlite:///:memory:')
+        self.manager = QuestionManager(self.db)
+        self.manager.create_test('Python')
+        self.manager.add_questions_to_test('Python', ['Что такое GIL?', 'Что такое yield?', 'Что такое декоратор?'])
+
+    def test_snapshot_survives_admin_edits(self):
+        interview = InterviewSession.start(self.manager, 'Python')
+        self.assertEqual(interview.questions, ['Что такое GIL?', 'Что такое yield?', 'Что такое декоратор?'])
+        statements = []
+        event.listen(self.db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+        self.manager.delete_question('Python', 'Что такое GIL?')
+        self.manager.add_question_to_test('Python', 'Что такое asyncio?')
+        statements.clear()
+
+        interview.advance()
+        self.assertEqual((interview.current, interview.question), (1, 'Что такое yield?'))
+        interview.advance()
+        interview.advance()
+        self.assertTrue(interview.finished)
+        self.assertIsNone(interview.question)
+        self.assertEqual(statements, [])
+
+    def test_answers_link_to_snapshot_question(self):
+        interview = InterviewSession.start(self.manager, 'Python', n=2, mode=SAMPLING_STRATIFIED)
+        self.assertEqual(len(interview), 2)
+        self.assertIsNotNone(interview.seed)
+        question_id = interview.question_id
+        self.manager.update_question('Python', interview.question, 'Новый текст')
+        result_id = self.db.save_pending_answer('Python', 'Иван', 'Иванов', interview.question, 'Ответ',
+                                                question_id=question_id)
+        session = self.db.get_session()
+        try:
+            self.assertEqual(session.get(SurveyResult, result_id).question_id, question_id)
+        finally:
+            session.close()
+        self.assertIsNone(InterviewSession.start(self.manager, 'Нет такого'))
+
+    def test_random_questions(self):
+        self.assertEqual(self.manager.get_random_questions('Python', 2, seed=1),
+                         self.manager.get_random_questions('Python', 2, seed=1))
+        self.assertEqual(len(self.manager.get_random_questions('Python', 10)), 3)
+
+
+class TestPersistedInterview(unittest.TestCase):
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.db = DBHandler(db_url=f'sqlite:///{self.db_path}')
+        manager = QuestionManager(self.db)
+        manager.create_test('Python')
+        manager.add_questions_to_test('Python', ['Что такое GIL?', 'Что такое yield?', 'Что такое декоратор?'])
+        self.interview = InterviewSession.start(manager, 'Python', first_name='Иван', last_name='Иванов')
+        self.assertTrue(self.interview.persist(self.db))
+
+    def tearDown(self):
+        self.db.engine.dispose()
+        os.remove(self.db_path)
+
+    def answer(self, db, interview):
+        return db.save_pending_answer(interview.test_name, interview.first_name, interview.last_name,
+                                      interview.question, 'Ответ', question_id=interview.question_id,
+                                      interview_id=interview.interview_id, position=interview.current)
+
+    def test_resume_on_another_replica(self):
+        first_id = self.answer(self.db, self.interview)
+        self.interview.advance()
+        # Другой процесс приложения со своим движком продолжает по токену
+        other = DBHandler(db_url=f'sqlite:///{self.db_path}')
+        try:
+            resumed = InterviewSession.resume(other, self.interview.token)
+            self.assertEqual((resumed.current, resumed.question), (1, 'Что такое yield?'))
+            self.assertEqual(resumed.result_ids, [first_id])
+            self.assertEqual((resumed.first_name, resumed.questions), ('Иван', self.interview.questions))
+            # Старая вкладка отстала: повторный ответ на тот же вопрос отклоняется
+            resumed_id = self.answer(other, resumed)
+            self.assertIsNotNone(resumed_id)
+            self.assertIsNone(self.answer(self.db, self.interview))
+            self.assertEqual(InterviewSession.resume(self.db, self.interview.token).result_ids, [first_id, resumed_id])
+        finally:
+            other.engine.dispose()
+        self.assertIsNone(InterviewSession.resume(self.db, 'нет такого'))
+
+    def test_checkpoint_is_one_extra_statement(self):
+        statements = []
+        event.listen(self.db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+        self.answer(self.db, self.interview)
+        self.assertEqual(len([statement for statement in statements if 'interview_sessions' in statement]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
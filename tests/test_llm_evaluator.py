@@ -0,0 +1,140 @@
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+from src.database.db_handler import DBHandler
+from src.database.models import EVALUATION_DONE
+from src.utils.evaluation_queue import EvaluationQueue
+from src.utils.llm_evaluator import evaluate_answer, parse_evaluation, EvaluationParseError, StreamingEvaluation
+
+
+class ScriptedLLM:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.prompts = []
+
+    def generate_answer(self, prompt: str) -> str:
+        self.prompts.append(prompt)
+        return self.responses.pop(0)
+
+
+class TestLLMEvaluator(unittest.TestCase):
+    def test_single_call_evaluation(self):
+        llm = ScriptedLLM('```json\n{"score": 4, "feedback": "Хороший ответ"}\n```')
+        self.assertEqual(evaluate_answer("Вопрос?", "Ответ", llm), (4, "Хороший ответ"))
+        self.assertEqual(len(llm.prompts), 1)
+
+    def test_strict_parsing(self):
+        for text in ['{"score": 6, "feedback": "x"}', '{"score": "4", "feedback": "x"}',
+                     '{"score": 3.5, "feedback": "x"}', '{"score": 3}', 'Оценка: 4', '[1, 2]']:
+            with self.assertRaises(EvaluationParseError, msg=text):
+                parse_evaluation(text)
+
+    def test_fallback_to_two_calls(self):
+        llm = ScriptedLLM('[Mistral API Error]: timeout', '5', 'Отлично')
+        self.assertEqual(evaluate_answer("Вопрос?", "Ответ", llm), (5, "Отлично"))
+        self.assertEqual(len(llm.prompts), 3)
+
+    def test_provider_errors_do_not_trigger_fallback(self):
+        class FailingLLM(ScriptedLLM):
+            def generate_answer(self, prompt: str) -> str:
+                self.prompts.append(prompt)
+                raise ConnectionError("rate limited")
+
+        llm = FailingLLM()
+        with self.assertRaises(ConnectionError):
+            evaluate_answer("Вопрос?", "Ответ", llm)
+        self.assertEqual(len(llm.prompts), 1)
+
+    def test_no_fallback_raises(self):
+        with self.assertRaises(EvaluationParseError):
+            evaluate_answer("Вопрос?", "Ответ", ScriptedLLM('not json'), fallback=False)
+
+
+class StreamingLLM(ScriptedLLM):
+    def __init__(self, chunks, *responses):
+        super().__init__(*responses)
+        self.chunks = chunks
+
+    def stream_answer(self, prompt: str):
+        self.prompts.append(prompt)
+        yield from self.chunks
+
+
+class TestStreamingEvaluation(unittest.TestCase):
+    def test_score_header_is_parsed_and_not_rendered(self):
+        evaluation = StreamingEvaluation("Вопрос?", "Ответ", StreamingLLM(["Оцен", "ка: 4\nХоро", "ший ответ"]))
+        self.assertEqual(list(evaluation), ["Хоро", "ший ответ"])
+        self.assertEqual((evaluation.score, evaluation.feedback), (4, "Хороший ответ"))
+
+    def test_missing_header_falls_back_to_score_call(self):
+        llm = StreamingLLM(["Хороший ответ"], "2")
+        evaluation = StreamingEvaluation("Вопрос?", "Ответ", llm)
+        self.assertEqual("".join(evaluation), "Хороший ответ")
+        self.assertEqual(evaluation.score, 2)
+        self.assertEqual(len(llm.prompts), 2)
+
+    def test_adapter_without_streaming(self):
+        evaluation = StreamingEvaluation("Вопрос?", "Ответ", ScriptedLLM("Оценка: 5\nОтлично"))
+        self.assertEqual(list(evaluation), ["Отлично"])
+        self.assertEqual(evaluation.score, 5)
+
+
+class TestEvaluationQueue(unittest.TestCase):
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.db = DBHandler(db_url=f'sqlite:///{self.db_path}')
+
+    def tearDown(self):
+        self.db.engine.dispose()
+        os.remove(self.db_path)
+
+    def test_pending_answer_is_evaluated_in_background(self):
+        result_id = self.db.save_pending_answer('Тест', 'Иван', 'Иванов', 'Вопрос?', 'Ответ')
+        queue = EvaluationQueue(self.db, max_workers=2, backoff_base=0.001)
+        llm = ScriptedLLM('not json', '{"score": 5, "feedback": "Отлично"}')
+        self.assertTrue(queue.submit(result_id, 'Вопрос?', 'Ответ', llm).result(timeout=5))
+        queue.shutdown()
+        result = self.db.get_survey_results_by_ids([result_id])[0]
+        self.assertEqual((result.status, result.llm_score, result.feedback), (EVALUATION_DONE, 5, 'Отлично'))
+
+    def test_recover_pending(self):
+        self.db.save_pending_answer('Тест', 'Иван', 'Иванов', 'Вопрос?', 'Ответ')
+        queue = EvaluationQueue(self.db)
+        llm = ScriptedLLM('{"score": 2, "feedback": "Слабо"}')
+        # Свежий ответ ещё оценивает сохранивший его процесс
+        self.assertEqual(queue.recover_pending(llm), 0)
+        self.assertEqual(queue.recover_pending(llm, stale_seconds=-1), 1)
+        queue.shutdown()
+        self.assertEqual(self.db.get_pending_results(), [])
+        self.assertIsNone(self.db.get_all_survey_results()[0].claimed_by)
+
+    def test_pending_timestamps_are_utc(self):
+        # Ответ, сохранённый в поясе UTC-5, не должен сразу считаться брошенным
+        with mock.patch.dict(os.environ, {'TZ': 'America/New_York'}):
+            time.tzset()
+            try:
+                result_id = self.db.save_pending_answer('Тест', 'Иван', 'Иванов', 'Вопрос?', 'Ответ')
+                self.assertEqual(self.db.get_pending_results(stale_seconds=60), [])
+                saved = self.db.get_survey_results_by_ids([result_id])[0].timestamp
+                self.assertLess(abs(saved - datetime.utcnow()), timedelta(minutes=1))
+            finally:
+                time.tzset()
+
+    def test_claimed_answer_is_not_evaluated_twice(self):
+        result_id = self.db.save_pending_answer('Тест', 'Иван', 'Иванов', 'Вопрос?', 'Ответ')
+        self.assertTrue(self.db.claim_evaluation(result_id, 'other-replica'))
+        self.assertEqual(self.db.get_pending_results(stale_seconds=-1), [])
+        llm = ScriptedLLM('{"score": 2, "feedback": "Слабо"}')
+        queue = EvaluationQueue(self.db, evaluator='this-replica')
+        self.assertFalse(queue.submit(result_id, 'Вопрос?', 'Ответ', llm).result(timeout=5))
+        queue.shutdown()
+        self.assertEqual(llm.prompts, [])
+        self.assertEqual(len(self.db.get_pending_results()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import threading
+import time
+import unittest
+from src.utils.model_registry import ModelRegistry, HEAVY_MODEL_COSTS
+
+
+class FakeClient:
+    instances = 0
+
+    def __init__(self, name='default'):
+        time.sleep(0.01)
+        FakeClient.instances += 1
+        self.name = name
+
+
+class FakeHeavyModel:
+    def __init__(self, size=100):
+        self.size = size
+
+
+class TestModelRegistry(unittest.TestCase):
+    def setUp(self):
+        FakeClient.instances = 0
+        HEAVY_MODEL_COSTS['FakeHeavyModel'] = lambda config: config.get('size', 100)
+
+    def tearDown(self):
+        del HEAVY_MODEL_COSTS['FakeHeavyModel']
+
+    def test_same_config_is_loaded_once(self):
+        registry = ModelRegistry()
+        threads = [threading.Thread(target=registry.get, args=(FakeClient,)) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(FakeClient.instances, 1)
+        self.assertIs(registry.get(FakeClient), registry.get(FakeClient))
+        self.assertIsNot(registry.get(FakeClient), registry.get(FakeClient, name='other'))
+
+    def test_lru_eviction_respects_budget_and_refcount(self):
+        registry = ModelRegistry(memory_budget_mb=250)
+        pinned = registry.acquire(FakeHeavyModel, size=100)
+        registry.get(FakeHeavyModel, size=120)
+        # Не помещается: вытесняется только незакреплённая модель
+        registry.get(FakeHeavyModel, size=140)
+        self.assertTrue(registry.is_loaded(FakeHeavyModel, size=100))
+        self.assertFalse(registry.is_loaded(FakeHeavyModel, size=120))
+        self.assertEqual(registry.refcount(FakeHeavyModel, size=100), 1)
+        registry.release(FakeHeavyModel, size=100)
+        registry.get(FakeHeavyModel, size=200)
+        self.assertFalse(registry.is_loaded(FakeHeavyModel, size=100))
+        self.assertEqual(pinned.size, 100)
+
+    def test_failed_load_is_not_cached(self):
+        registry = ModelRegistry()
+        with self.assertRaises(TypeError):
+            registry.get(FakeClient, unknown=1)
+        self.assertFalse(registry.is_loaded(FakeClient, unknown=1))
+
+
+if __name__ == '__main__':
+    unittest.main()
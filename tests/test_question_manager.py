@@ -0,0 +1,150 @@
+import json
+import os
+import tempfile
+import unittest
+from sqlalchemy import event
+from src.database.db_handler import DBHandler, QuestionInfo
+from src.database.query_counter import QueryCounter
+from src.utils.question_manager import QuestionManager, parse_questions
+
+
+class TestBulkQuestions(unittest.TestCase):
+    def setUp(self):
+        self.db = DBHandler(db_url='sqlite:///:memory:')
+        self.manager = QuestionManager(self.db)
+        self.manager.create_test('Python')
+        self.manager.add_question_to_test('Python', 'Что такое GIL?')
+
+    def test_deduplicates(self):
+        added = self.manager.add_questions_to_test(
+            'Python', ['Что такое GIL?', ' Что такое декоратор? ', '', 'Что такое декоратор?', 'Что такое yield?']
+        )
+        self.assertEqual(added, 2)
+        self.assertEqual(self.manager.get_questions_for_test('Python'),
+                         ['Что такое GIL?', 'Что такое декоратор?', 'Что такое yield?'])
+        self.assertEqual(self.manager.add_questions_to_test('Нет такого', ['Вопрос']), 0)
+
+    def test_write_error_is_not_reported_as_repeats(self):
+        with self.db.engine.begin() as conn:
+            conn.exec_driver_sql("CREATE TRIGGER no_inserts BEFORE INSERT ON questions "
+                                 "BEGIN SELECT RAISE(ABORT, 'read only'); END")
+        self.assertIsNone(self.manager.add_questions_to_test('Python', ['Что такое yield?']))
+        self.assertEqual(self.manager.get_questions_for_test('Python'), ['Что такое GIL?'])
+
+    def test_question_bank_is_one_insert(self):
+        statements = []
+        event.listen(self.db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+        content = json.dumps({'questions': [{'question': f'Вопрос {i}'} for i in range(5000)]})
+        self.assertEqual(self.manager.import_questions('Python', content, 'bank.json'), 5000)
+        self.assertEqual(len(self.manager.get_questions_for_test('Python')), 5001)
+        inserts = [statement for statement in statements if statement.startswith('INSERT')]
+        # insertmanyvalues разбивает executemany на пакеты, но коммит один
+        self.assertLessEqual(len(inserts), 10)
+
+    def test_parse_formats(self):
+        self.assertEqual(parse_questions('id,question\n1,Первый\n2,"Второй, с запятой"\n', 'bank.csv'),
+                         ['Первый', 'Второй, с запятой'])
+        self.assertEqual(parse_questions('Первый\nВторой\n'.encode('utf-8-sig'), 'bank.csv'), ['Первый', 'Второй'])
+        self.assertEqual(parse_questions('["Первый", {"text": "Второй"}]', 'bank.json'), ['Первый', 'Второй'])
+        self.assertEqual(parse_questions('questions:\n  - Первый\n  - question: Второй\n', 'bank.yaml'),
+                         ['Первый', 'Второй'])
+        with self.assertRaises(ValueError):
+            parse_questions('', 'bank.xlsx')
+
+
+class TestCatalogCache(unittest.TestCase):
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.db = DBHandler(db_url=f'sqlite:///{self.db_path}')
+        self.manager = QuestionManager(self.db)
+        self.manager.create_test('Python')
+        self.manager.add_questions_to_test('Python', ['Что такое GIL?', 'Что такое yield?'])
+        self.statements = []
+        event.listen(self.db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: self.statements.append(statement))
+
+    def tearDown(self):
+        self.db.engine.dispose()
+        os.remove(self.db_path)
+
+    def test_reruns_do_not_query(self):
+        self.manager.cache.check_interval = 60
+        self.manager.get_all_tests()
+        self.manager.get_questions_for_test('Python')
+        self.statements.clear()
+        for _ in range(10):
+            # Страница создаёт QuestionManager на каждый rerun
+            manager = QuestionManager(self.db)
+            self.assertEqual(manager.get_all_tests(), ['Python'])
+            self.assertEqual(manager.get_questions_for_test('Python'), ['Что такое GIL?', 'Что такое yield?'])
+        self.assertEqual(self.statements, [])
+
+    def test_local_writes_invalidate(self):
+        self.manager.get_questions_for_test('Python')
+        self.manager.update_question('Python', 'Что такое GIL?', 'Зачем нужен GIL?')
+        self.assertEqual(self.manager.get_questions_for_test('Python'), ['Зачем нужен GIL?', 'Что такое yield?'])
+        self.manager.delete_question('Python', 'Что такое yield?')
+        self.assertEqual(self.manager.get_questions_for_test('Python'), ['Зачем нужен GIL?'])
+        self.manager.create_test('SQL')
+        self.assertEqual(self.manager.get_all_tests(), ['Python', 'SQL'])
+
+    def test_other_process_changes_are_seen_via_version(self):
+        self.manager.cache.check_interval = 0
+        self.assertEqual(self.manager.get_all_tests(), ['Python'])
+        # Другая реплика приложения со своим движком и кэшем
+        other = DBHandler(db_url=f'sqlite:///{self.db_path}')
+        QuestionManager(other).create_test('SQL')
+        other.engine.dispose()
+        self.assertEqual(self.manager.get_all_tests(), ['Python', 'SQL'])
+
+
+class TestCatalogRoundTrips(unittest.TestCase):
+    def setUp(self):
+        self.db = DBHandler(db_url='sqlite:///:memory:')
+        self.db.create_test('Python')
+        self.db.add_question_to_test('Python', 'Что такое GIL?')
+
+    def assertQueries(self, expected, operation, *args):
+        with QueryCounter(self.db.engine) as queries:
+            result = operation(*args)
+        self.assertEqual(queries.count, expected, queries.statements)
+        return result
+
+    def test_writes_are_single_statements(self):
+        # Сама операция плюс увеличение версии каталога, только если что-то изменилось
+        self.assertTrue(self.assertQueries(2, self.db.create_test, 'SQL'))
+        self.assertFalse(self.assertQueries(1, self.db.create_test, 'SQL'))
+        self.assertTrue(self.assertQueries(2, self.db.add_question_to_test, 'Python', 'Что такое yield?'))
+        self.assertFalse(self.assertQueries(1, self.db.add_question_to_test, 'Нет такого', 'Вопрос'))
+        self.assertTrue(self.assertQueries(2, self.db.update_question, 'Python', 'Что такое GIL?', 'Зачем GIL?'))
+        self.assertFalse(self.assertQueries(1, self.db.update_question, 'Python', 'Что такое GIL?', 'Зачем GIL?'))
+        # Удаление ещё отвязывает ответы и агрегаты от удаляемых строк
+        self.assertTrue(self.assertQueries(6, self.db.delete_question, 'Python', 'Что такое yield?'))
+        self.assertFalse(self.assertQueries(1, self.db.delete_question, 'Python', 'Что такое yield?'))
+        self.assertEqual(self.assertQueries(1, self.db.get_all_tests), ['Python', 'SQL'])
+
+        self.assertTrue(self.assertQueries(9, self.db.delete_test, 'Python'))
+        self.assertIsNone(self.db.get_test_by_name('Python'))
+        self.assertEqual(QuestionManager(self.db).get_question_rows('Python'), [])
+
+    def test_reads_return_plain_values(self):
+        self.db.add_question_to_test('Python', 'Что такое yield?')
+        self.db.create_test('SQL')
+        test = self.assertQueries(1, self.db.get_test_by_name, 'Python')
+        self.assertEqual((test.id, test.name), (1, 'Python'))
+        self.assertEqual(test.questions, (QuestionInfo(1, 1, 'Что такое GIL?'), QuestionInfo(2, 1, 'Что такое yield?')))
+        self.assertEqual(self.db.get_test_by_name('SQL').questions, ())
+        # Вопросы всех тестов одним selectin-запросом, без N+1
+        tests = self.assertQueries(2, self.db.get_tests_with_questions)
+        self.assertEqual([(test.name, len(test.questions)) for test in tests], [('Python', 2), ('SQL', 0)])
+
+    def test_bulk_add_round_trips(self):
+        manager = QuestionManager(self.db)
+        self.assertEqual(self.assertQueries(3, manager.add_questions_to_test, 'Python',
+                                            ['Что такое GIL?', 'Что такое yield?', 'Что такое asyncio?']), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
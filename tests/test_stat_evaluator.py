@@ -0,0 +1,43 @@
+import unittest
+import numpy as np
+import pandas as pd
+from src.utils.stat_evaluator import StatEvaluator
+
+
+class TestBatchEvaluation(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        self.samples = {
+            # Нормальные оценки (t-test), скошенные (mann-whitney) и малая выборка (descriptive)
+            10: (np.round(rng.normal(3, 0.8, 200)).clip(1, 5), np.round(rng.normal(3.2, 0.8, 200)).clip(1, 5)),
+            20: (rng.integers(1, 6, 40).astype(float), rng.choice([1.0, 5.0], 30)),
+            30: (np.array([4.0, 5.0, 3.0]), np.array([4.0, 4.0])),
+        }
+        question_ids, raters, scores = [], [], []
+        for question_id, (llm, human) in self.samples.items():
+            for rater, values in (('llm', llm), ('human', human)):
+                question_ids += [question_id] * len(values)
+                raters += [rater] * len(values)
+                scores += list(values)
+        # Неоценённые ответы приходят как NaN
+        question_ids.append(20)
+        raters.append('human')
+        scores.append(np.nan)
+        order = rng.permutation(len(scores))
+        self.question_ids = np.array(question_ids)[order]
+        self.raters = np.array(raters)[order]
+        self.scores = np.array(scores)[order]
+
+    def test_batch_matches_per_question_evaluation(self):
+        evaluator = StatEvaluator()
+        frame = evaluator.evaluate_batch(self.question_ids, self.raters, self.scores)
+        self.assertEqual(frame['question_id'].tolist(), [10, 20, 30])
+        self.assertEqual(frame['test'].tolist(), ['t-test', 'mann-whitney', 'descriptive'])
+        self.assertTrue(frame['p_value'].isna().tolist()[2])
+        for (_, row), (llm, human) in zip(frame.iterrows(), self.samples.values()):
+            self.assertEqual((row['llm_n'], row['human_n']), (len(llm), len(human)))
+            pd.testing.assert_frame_equal(evaluator.format_result(row), evaluator.evaluate_scores(llm, human))
+
+
+if __name__ == '__main__':
+    unittest.main()